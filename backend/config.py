@@ -33,8 +33,34 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: str = ""
     OPENAI_MODEL: str = "gpt-4o-mini"
     OPENAI_EMBEDDING_MODEL: str = "text-embedding-ada-002"
+    EMBEDDING_BATCH_MAX_TOKENS: int = 100000  # Per embeddings request (API limit is 300k)
+    EMBEDDING_BATCH_MAX_INPUTS: int = 512  # Per embeddings request (API limit is 2048)
+    EMBEDDING_BATCH_CONCURRENCY: int = 4  # Embeddings requests in flight per batch call
+    EMBEDDING_BACKFILL_PAGE_SIZE: int = 200  # Rows read per page when backfilling
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 5000  # In-process LRU size (~6KB per entry)
+    EMBEDDING_CACHE_PERSISTENT: bool = True  # Also use the embedding_cache table
     ANTHROPIC_API_KEY: str = ""
 
+    # Context indexing
+    CONTEXT_CHUNK_TOKENS: int = 400
+    CONTEXT_CHUNK_OVERLAP_TOKENS: int = 50
+    CONTEXT_INDEX_PAGE_SIZE: int = 200
+
+    # Context retrieval
+    CONTEXT_HYBRID_CANDIDATES: int = 50  # Chunks taken from each of the lexical and vector rankings
+    CONTEXT_RRF_K: int = 60  # Reciprocal-rank fusion constant; higher flattens rank differences
+    CONTEXT_VECTOR_INDEX_ENABLED: bool = False  # Answer retrieval from per-user in-memory indexes
+    CONTEXT_VECTOR_INDEX_MAX_MB: int = 512  # Memory cap across loaded users (~6KB per chunk)
+    CONTEXT_VECTOR_INDEX_MAX_AGE_SECONDS: int = 3600  # Reload in the background to pick up other processes' writes
+    CONTEXT_VECTOR_INDEX_PAGE_SIZE: int = 1000  # Chunks read per page when loading a user
+
+    # Context Q&A answer cache
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_TTL_SECONDS: int = 3600  # Max age of a cached answer
+    ANSWER_CACHE_SIMILARITY: float = 0.95  # Min cosine similarity between questions for a hit
+    ANSWER_CACHE_MAX_ENTRIES_PER_USER: int = 100
+    ANSWER_CACHE_MAX_USERS: int = 1000  # Least recently used users dropped beyond this
+
     # Google OAuth
     GOOGLE_CLIENT_ID: str = ""
     GOOGLE_CLIENT_SECRET: str = ""
@@ -45,17 +71,29 @@ class Settings(BaseSettings):
         "https://www.googleapis.com/auth/gmail.readonly",
         "https://www.googleapis.com/auth/gmail.modify"
     ]
+    GMAIL_FETCH_BATCH_SIZE: int = 50  # Messages per Gmail HTTP batch request
+    GMAIL_FETCH_MAX_RETRIES: int = 4  # Retries for batch sub-requests that were rate limited or failed
 
     # Google Calendar Integration
     CALENDAR_SCOPES: list = [
         "https://www.googleapis.com/auth/calendar.readonly"
     ]
+    CALENDAR_PAGE_SIZE: int = 250  # Events per events.list page
+    CALENDAR_SEED_DAYS_FORWARD: int = 365  # Horizon of the windowed sync that seeds the sync token
+
+    # Google API clients (Gmail + Calendar)
+    GOOGLE_HTTP_TIMEOUT_SECONDS: int = 60
+    GOOGLE_CLIENT_CACHE_MAX_ENTRIES: int = 500  # Idle (user, API) clients kept for reuse
 
     # Linear Integration
     LINEAR_CLIENT_ID: str = ""
     LINEAR_CLIENT_SECRET: str = ""
     LINEAR_REDIRECT_URI: str = "http://localhost:8000/api/v1/linear/oauth/callback"
     LINEAR_SCOPES: list = ["read", "write"]  # Linear OAuth scopes
+    LINEAR_HTTP_MAX_CONNECTIONS: int = 20  # Pooled connections to api.linear.app
+    LINEAR_HTTP_TIMEOUT_SECONDS: float = 30.0
+    LINEAR_REQUEST_RESERVE: int = 5  # Requests left in the window before throttling
+    LINEAR_MAX_THROTTLE_SECONDS: float = 60.0  # Longest single wait for the rate-limit window
 
     # Slack Integration
     SLACK_CLIENT_ID: str = ""
@@ -76,6 +114,19 @@ class Settings(BaseSettings):
         "users:read.email",
         "team:read"
     ]
+    SLACK_HTTP_MAX_CONNECTIONS: int = 20  # Pooled connections to slack.com
+    SLACK_HTTP_TIMEOUT_SECONDS: float = 30.0
+    SLACK_METADATA_TTL_SECONDS: int = 3600  # Channel names and users.list cache
+    SLACK_RATE_LIMIT_BURST: int = 5  # Requests allowed back-to-back per method
+    SLACK_MAX_RETRIES: int = 5  # Attempts per call on HTTP 429
+    SLACK_SYNC_INTERVAL_MINUTES: int = 360  # Gap-filling poll; new messages arrive via events
+    SLACK_SYNC_CHANNEL_CONCURRENCY: int = 5  # Channels synced in parallel per user
+    SLACK_TEAM_CACHE_TTL_SECONDS: int = 300  # team_id -> user_id lookups for events
+    SLACK_EVENT_QUEUE_SIZE: int = 1000  # Events waiting for a worker before dropping
+    SLACK_EVENT_WORKERS: int = 4
+    SLACK_EVENT_DEDUP_TTL_SECONDS: int = 3600  # Remember event_ids to ignore Slack retries
+    SLACK_EVENT_BATCH_SIZE: int = 50  # Message events per slack_messages write
+    SLACK_EVENT_FLUSH_MS: int = 500  # Longest a message event waits to be written
     # Bot token scopes (for Cosos bot to respond)
     SLACK_BOT_SCOPES: list = [
         "app_mentions:read",
@@ -90,6 +141,30 @@ class Settings(BaseSettings):
     NOTION_CLIENT_ID: str = ""
     NOTION_CLIENT_SECRET: str = ""
     NOTION_REDIRECT_URI: str = "http://localhost:8000/api/v1/notion/oauth/callback"
+    NOTION_HTTP_MAX_CONNECTIONS: int = 10  # Pooled connections to api.notion.com
+    NOTION_HTTP_TIMEOUT_SECONDS: float = 30.0
+    NOTION_REQUESTS_PER_SECOND: float = 3.0  # Notion's average rate limit per integration
+    NOTION_MAX_CONCURRENT_REQUESTS: int = 3  # In flight per token (also the bucket burst)
+    NOTION_MAX_RETRIES: int = 5  # Attempts per request on HTTP 429
+    NOTION_BLOCK_PREFETCH: int = 50  # Blocks buffered per prefetched subtree
+    NOTION_SYNC_INTERVAL_MINUTES: int = 30  # Scheduled workspace sync
+    NOTION_SYNC_PAGE_CONCURRENCY: int = 3  # Pages synced in parallel per user
+    NOTION_RECONCILE_INTERVAL_HOURS: int = 24  # Full search to find deleted/unshared pages
+
+    # Credential cache
+    CREDENTIAL_CACHE_TTL_SECONDS: int = 300  # Bounds staleness across worker processes
+    CREDENTIAL_REFRESH_SKEW_SECONDS: int = 300  # Refresh Google tokens this long before expiry
+
+    # Blocking I/O executor (supabase-py, googleapiclient, requests)
+    EXECUTOR_MAX_WORKERS: int = 32
+
+    # Scheduler / background sync
+    SYNC_MAX_CONCURRENT_USERS: int = 10  # Users synced in parallel per run
+    SYNC_GMAIL_CONCURRENCY: int = 5  # Concurrent Gmail syncs across all users
+    SYNC_CALENDAR_CONCURRENCY: int = 5  # Concurrent Calendar syncs across all users
+    SYNC_LINEAR_CONCURRENCY: int = 5  # Concurrent Linear syncs across all users
+    SYNC_SLACK_CONCURRENCY: int = 5  # Concurrent Slack workspace syncs across all users
+    SYNC_NOTION_CONCURRENCY: int = 5  # Concurrent Notion workspace syncs across all users
 
     # Security
     SECRET_KEY: str = "dev-key-change-in-production"
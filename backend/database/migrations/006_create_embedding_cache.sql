@@ -0,0 +1,14 @@
+-- Migration: Create embedding cache table
+-- Date: 2026-10-17
+-- Description: Content-addressed store of embedding vectors shared by all API workers
+
+CREATE TABLE IF NOT EXISTS embedding_cache (
+    model VARCHAR(100) NOT NULL,
+    content_hash VARCHAR(64) NOT NULL, -- SHA-256 of the embedded text
+    embedding vector(1536) NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (model, content_hash)
+);
+
+-- Service-role only: cache entries are not user-scoped
+ALTER TABLE embedding_cache ENABLE ROW LEVEL SECURITY;
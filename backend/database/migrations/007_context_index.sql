@@ -0,0 +1,39 @@
+-- Migration: Context index ingestion support
+-- Date: 2026-10-17
+-- Description: Unique chunk key for upserts into context_embeddings, per-source
+-- indexing watermarks, and row change timestamps on calendar_events and
+-- linear_issues
+
+-- One row per chunk of a source record, so re-indexing upserts in place
+ALTER TABLE context_embeddings
+    ADD CONSTRAINT context_embeddings_source_chunk_key
+    UNIQUE (source_type, source_id, chunk_index);
+
+-- CONTEXT INDEX STATE (How far each source has been indexed per user)
+CREATE TABLE IF NOT EXISTS context_index_state (
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    source_type VARCHAR(50) NOT NULL,
+    last_indexed_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (user_id, source_type)
+);
+ALTER TABLE context_index_state ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Users can access their own index state" ON context_index_state FOR ALL USING (auth.uid() = user_id);
+GRANT SELECT, INSERT, UPDATE, DELETE ON context_index_state TO authenticated;
+CREATE TRIGGER update_context_index_state_updated_at BEFORE UPDATE ON context_index_state FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- calendar_events had no column that changes when an event is updated
+ALTER TABLE calendar_events ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW();
+CREATE INDEX IF NOT EXISTS idx_calendar_events_updated_at ON calendar_events(user_id, updated_at);
+CREATE TRIGGER update_calendar_events_updated_at BEFORE UPDATE ON calendar_events FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- updated_at_linear is Linear's own timestamp, so backfilled issues can be
+-- older than the watermark; track when the row itself last changed
+ALTER TABLE linear_issues ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW();
+CREATE INDEX IF NOT EXISTS idx_linear_issues_row_updated_at ON linear_issues(user_id, updated_at);
+CREATE TRIGGER update_linear_issues_updated_at BEFORE UPDATE ON linear_issues FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- Watermark scans
+CREATE INDEX IF NOT EXISTS idx_context_documents_updated_at ON context_documents(user_id, updated_at);
+CREATE INDEX IF NOT EXISTS idx_emails_created_at ON emails(user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_slack_messages_created_at ON slack_messages(user_id, created_at);
@@ -0,0 +1,6 @@
+-- Migration: Gmail incremental sync state
+-- Date: 2026-10-17
+-- Description: Store the mailbox historyId reached by the last Gmail sync so
+-- the next sync only fetches deltas via users.history.list
+
+ALTER TABLE integrations ADD COLUMN IF NOT EXISTS gmail_history_id VARCHAR(50);
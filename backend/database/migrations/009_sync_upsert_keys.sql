@@ -0,0 +1,31 @@
+-- Migration: Natural-key upserts for synced records
+-- Date: 2026-10-17
+-- Description: Per-user unique keys used as upsert conflict targets by the
+-- sync services, and a sync_hash column for change detection
+
+-- Provider IDs were globally unique, so two users sharing a Linear workspace
+-- or a calendar event collided; scope the keys to the user instead
+ALTER TABLE calendar_events DROP CONSTRAINT IF EXISTS calendar_events_gcal_id_key;
+ALTER TABLE calendar_events
+    ADD CONSTRAINT calendar_events_user_gcal_id_key UNIQUE (user_id, gcal_id);
+
+ALTER TABLE linear_issues DROP CONSTRAINT IF EXISTS linear_issues_linear_id_key;
+ALTER TABLE linear_issues
+    ADD CONSTRAINT linear_issues_user_linear_id_key UNIQUE (user_id, linear_id);
+
+ALTER TABLE linear_projects DROP CONSTRAINT IF EXISTS linear_projects_linear_id_key;
+ALTER TABLE linear_projects
+    ADD CONSTRAINT linear_projects_user_linear_id_key UNIQUE (user_id, linear_id);
+
+ALTER TABLE emails DROP CONSTRAINT IF EXISTS emails_gmail_id_key;
+ALTER TABLE emails
+    ADD CONSTRAINT emails_user_gmail_id_key UNIQUE (user_id, gmail_id);
+
+-- slack_messages already has UNIQUE (user_id, slack_ts, channel_id)
+
+-- SHA-256 of the row as last written by a sync; unchanged rows are skipped
+ALTER TABLE calendar_events ADD COLUMN IF NOT EXISTS sync_hash VARCHAR(64);
+ALTER TABLE linear_issues ADD COLUMN IF NOT EXISTS sync_hash VARCHAR(64);
+ALTER TABLE linear_projects ADD COLUMN IF NOT EXISTS sync_hash VARCHAR(64);
+ALTER TABLE emails ADD COLUMN IF NOT EXISTS sync_hash VARCHAR(64);
+ALTER TABLE slack_messages ADD COLUMN IF NOT EXISTS sync_hash VARCHAR(64);
@@ -0,0 +1,16 @@
+-- Migration: Calendar incremental sync state
+-- Date: 2026-10-17
+-- Description: Store the Calendar API nextSyncToken per user and calendar so
+-- syncs fetch only changed or cancelled events
+
+CREATE TABLE IF NOT EXISTS calendar_sync_state (
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    calendar_id VARCHAR(255) NOT NULL,
+    sync_token TEXT NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (user_id, calendar_id)
+);
+ALTER TABLE calendar_sync_state ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Users can access their own calendar sync state" ON calendar_sync_state FOR ALL USING (auth.uid() = user_id);
+GRANT SELECT, INSERT, UPDATE, DELETE ON calendar_sync_state TO authenticated;
+CREATE TRIGGER update_calendar_sync_state_updated_at BEFORE UPDATE ON calendar_sync_state FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
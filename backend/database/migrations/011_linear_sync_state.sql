@@ -0,0 +1,7 @@
+-- Migration: Linear incremental sync state
+-- Date: 2026-10-17
+-- Description: updatedAt high-water marks for incremental Linear issue and
+-- project syncs
+
+ALTER TABLE integrations ADD COLUMN IF NOT EXISTS linear_issues_synced_through TIMESTAMP WITH TIME ZONE;
+ALTER TABLE integrations ADD COLUMN IF NOT EXISTS linear_projects_synced_through TIMESTAMP WITH TIME ZONE;
@@ -0,0 +1,16 @@
+-- Migration: Slack per-channel sync state
+-- Date: 2026-10-17
+-- Description: Store the newest message ts synced per user and channel so the
+-- workspace sync only requests messages after it
+
+CREATE TABLE IF NOT EXISTS slack_channel_sync_state (
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    channel_id VARCHAR(255) NOT NULL,
+    last_ts VARCHAR(50) NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (user_id, channel_id)
+);
+ALTER TABLE slack_channel_sync_state ENABLE ROW LEVEL SECURITY;
+CREATE POLICY "Users can access their own slack channel sync state" ON slack_channel_sync_state FOR ALL USING (auth.uid() = user_id);
+GRANT SELECT, INSERT, UPDATE, DELETE ON slack_channel_sync_state TO authenticated;
+CREATE TRIGGER update_slack_channel_sync_state_updated_at BEFORE UPDATE ON slack_channel_sync_state FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
@@ -0,0 +1,6 @@
+-- Migration: Slack team lookup index
+-- Date: 2026-10-17
+-- Description: Index knowledge_sources by (type, external_id) so Slack events
+-- resolve their team_id (stored as external_id) without scanning every workspace
+
+CREATE INDEX IF NOT EXISTS idx_knowledge_sources_type_external_id ON knowledge_sources(type, external_id);
@@ -0,0 +1,7 @@
+-- Migration: Notion incremental sync state
+-- Date: 2026-10-17
+-- Description: last_edited_time high-water mark for the scheduled Notion
+-- workspace sync, and when pages were last reconciled against a full search
+
+ALTER TABLE integrations ADD COLUMN IF NOT EXISTS notion_synced_through TIMESTAMP WITH TIME ZONE;
+ALTER TABLE integrations ADD COLUMN IF NOT EXISTS notion_reconciled_at TIMESTAMP WITH TIME ZONE;
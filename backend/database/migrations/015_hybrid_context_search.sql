@@ -0,0 +1,89 @@
+-- Migration: Hybrid context search
+-- Date: 2026-10-17
+-- Description: Full-text index over context_embeddings.chunk_text and a
+-- match_context_hybrid function that runs lexical and vector search in one
+-- call and merges them with reciprocal-rank fusion
+
+-- Kept in step with chunk_text by Postgres, so ingestion needs no changes
+ALTER TABLE context_embeddings
+    ADD COLUMN IF NOT EXISTS chunk_tsv tsvector
+    GENERATED ALWAYS AS (to_tsvector('english', chunk_text)) STORED;
+CREATE INDEX IF NOT EXISTS idx_context_embeddings_chunk_tsv ON context_embeddings USING gin (chunk_tsv);
+
+-- HYBRID SEARCH FUNCTION
+-- Takes the top candidate_count chunks by cosine distance and the top
+-- candidate_count by ts_rank_cd, and scores each chunk as
+-- sum(1 / (rrf_k + rank)) over the lists it appears in. Exact-term matches
+-- (issue titles, customer and channel names) surface even when their
+-- embedding similarity is low, with no similarity threshold to tune.
+CREATE OR REPLACE FUNCTION match_context_hybrid(
+    query_embedding vector(1536),
+    query_text TEXT,
+    match_user_id UUID,
+    match_count INT DEFAULT 10,
+    candidate_count INT DEFAULT 50,
+    rrf_k INT DEFAULT 60
+)
+RETURNS TABLE (
+    id UUID,
+    source_type VARCHAR(50),
+    source_id UUID,
+    chunk_text TEXT,
+    metadata JSONB,
+    similarity FLOAT,
+    lexical_score FLOAT,
+    score FLOAT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH vector_candidates AS (
+        SELECT ce.id, ce.embedding <=> query_embedding AS distance
+        FROM context_embeddings ce
+        WHERE ce.user_id = match_user_id
+        AND ce.embedding IS NOT NULL
+        ORDER BY ce.embedding <=> query_embedding
+        LIMIT candidate_count
+    ),
+    vector_hits AS (
+        SELECT vc.id, 1 - vc.distance AS similarity,
+               row_number() OVER (ORDER BY vc.distance) AS rank
+        FROM vector_candidates vc
+    ),
+    lexical_candidates AS (
+        SELECT ce.id, ts_rank_cd(ce.chunk_tsv, q.query) AS lexical_score
+        FROM context_embeddings ce,
+             websearch_to_tsquery('english', query_text) AS q(query)
+        WHERE ce.user_id = match_user_id
+        AND ce.chunk_tsv @@ q.query
+        ORDER BY lexical_score DESC
+        LIMIT candidate_count
+    ),
+    lexical_hits AS (
+        SELECT lc.id, lc.lexical_score,
+               row_number() OVER (ORDER BY lc.lexical_score DESC) AS rank
+        FROM lexical_candidates lc
+    ),
+    fused AS (
+        SELECT
+            COALESCE(v.id, l.id) AS id,
+            v.similarity,
+            l.lexical_score,
+            COALESCE(1.0 / (rrf_k + v.rank), 0) + COALESCE(1.0 / (rrf_k + l.rank), 0) AS score
+        FROM vector_hits v
+        FULL OUTER JOIN lexical_hits l ON l.id = v.id
+    )
+    SELECT
+        ce.id,
+        ce.source_type,
+        ce.source_id,
+        ce.chunk_text,
+        ce.metadata,
+        f.similarity::FLOAT,
+        f.lexical_score::FLOAT,
+        f.score::FLOAT
+    FROM fused f
+    JOIN context_embeddings ce ON ce.id = f.id
+    ORDER BY f.score DESC
+    LIMIT match_count;
+$$;
@@ -0,0 +1,7 @@
+-- Migration: Notion page content check time
+-- Date: 2026-10-17
+-- Description: When a Notion page's blocks were last read, so sync_page only
+-- trusts an unchanged last_edited_time (rounded to the minute by Notion)
+-- once that minute had passed at the previous read
+
+ALTER TABLE context_documents ADD COLUMN IF NOT EXISTS source_checked_at TIMESTAMP WITH TIME ZONE;
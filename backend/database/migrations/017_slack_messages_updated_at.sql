@@ -0,0 +1,10 @@
+-- Migration: Slack message change timestamps
+-- Date: 2026-10-17
+-- Description: Row change timestamp on slack_messages, so edited messages
+-- written again by the sync or the Events API pass the context indexing
+-- watermark
+
+ALTER TABLE slack_messages ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW();
+UPDATE slack_messages SET updated_at = created_at WHERE created_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_slack_messages_updated_at ON slack_messages(user_id, updated_at);
+CREATE TRIGGER update_slack_messages_updated_at BEFORE UPDATE ON slack_messages FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
@@ -59,6 +59,28 @@ async def lifespan(app: FastAPI):
     scheduler.shutdown()
     logger.info("✅ Scheduler shutdown complete")
 
+    # Finish queued Slack events before closing the clients they use
+    from services.slack_event_queue import get_slack_event_queue
+    from services.slack_message_writer import get_slack_message_writer
+    await get_slack_event_queue().close()
+    await get_slack_message_writer().close()
+
+    # Store conversation turns still being written
+    from services.conversation_writer import get_conversation_writer
+    await get_conversation_writer().close()
+
+    # Close pooled API connections
+    from services.linear_client import get_linear_client
+    from services.slack_client import get_slack_client
+    from services.notion_client import get_notion_client
+    await get_linear_client().close()
+    await get_slack_client().close()
+    await get_notion_client().close()
+
+    # Release blocking I/O worker threads
+    from services.executor_service import get_executor
+    get_executor().shutdown()
+
 app = FastAPI(
     title="COSOS API",
     description="The Engine Room That Runs With You — Proactive AI decision-maker for solopreneurs and early-stage CEOs",
@@ -79,10 +101,37 @@ app.add_middleware(
 @app.get("/health")
 async def health_check():
     """Health check endpoint for monitoring."""
+    from services.executor_service import get_executor
+    from services.embedding_cache import get_embedding_cache
+    from services.linear_client import get_linear_client
+    from services.slack_client import get_slack_client
+    from services.slack_event_queue import get_slack_event_queue
+    from services.slack_message_writer import get_slack_message_writer
+    from services.notion_client import get_notion_client
+    from services.credential_broker import get_credential_broker
+    from services.google_client_factory import get_google_client_factory
+    from services.context_qa_service import qa_latency
+    from services.conversation_writer import get_conversation_writer
+    from services.vector_index import get_vector_index
+    from services.answer_cache import get_answer_cache
+
     return {
         "status": "healthy",
         "service": "cosos-api",
-        "version": "0.1.0"
+        "version": "0.1.0",
+        "executor": get_executor().get_stats(),
+        "embedding_cache": get_embedding_cache().get_stats(),
+        "linear_client": get_linear_client().get_stats(),
+        "slack_client": get_slack_client().get_stats(),
+        "slack_events": get_slack_event_queue().get_stats(),
+        "slack_message_writer": get_slack_message_writer().get_stats(),
+        "notion_client": get_notion_client().get_stats(),
+        "credentials": get_credential_broker().get_stats(),
+        "google_clients": get_google_client_factory().get_stats(),
+        "context_qa": qa_latency.get_stats(),
+        "conversation_writer": get_conversation_writer().get_stats(),
+        "vector_index": get_vector_index().get_stats(),
+        "answer_cache": get_answer_cache().get_stats()
     }
 
 @app.get("/")
@@ -3,7 +3,7 @@
 import logging
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel, HttpUrl
-from openai import OpenAI
+from openai import AsyncOpenAI
 from config import settings
 import httpx
 
@@ -47,7 +47,7 @@ async def analyze_website(request: WebsiteAnalysisRequest):
         text_content = html_content[:5000]
         
         # Use OpenAI to analyze the website
-        client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
         
         prompt = f"""Analyze this website content and write a concise business description (2-3 sentences, max 300 characters).
 Focus on:
@@ -60,7 +60,7 @@ Website content:
 
 Write the description in first person (e.g., "We're building..."). Be specific and avoid buzzwords."""
 
-        completion = client.chat.completions.create(
+        completion = await client.chat.completions.create(
             model=settings.OPENAI_MODEL,
             messages=[
                 {
@@ -7,6 +7,9 @@ from pydantic import BaseModel
 
 from config import settings
 from services.gmail_service import GmailService
+from services.credential_broker import get_credential_broker
+from services.google_client_factory import get_google_client_factory
+from services.executor_service import run_blocking
 
 logger = logging.getLogger(__name__)
 
@@ -92,13 +95,16 @@ async def disconnect_google(user_id: str = Query(..., description="User ID")):
         supabase = get_supabase_client()
         
         # Deactivate integration
-        result = supabase.table("integrations").update({
+        result = await run_blocking(supabase.table("integrations").update({
             "is_active": False
-        }).eq("user_id", user_id).eq("provider", "gmail").execute()
+        }).eq("user_id", user_id).eq("provider", "gmail").execute)
         
         if not result.data:
             raise HTTPException(status_code=404, detail="Integration not found")
         
+        get_credential_broker().invalidate(user_id, "gmail")
+        get_google_client_factory().invalidate(user_id)
+
         logger.info(f"Disconnected Google integration for user {user_id}")
         
         return {"message": "Google integration disconnected successfully"}
@@ -1,12 +1,15 @@
 """Context Q&A routes for business intelligence queries."""
 
+import json
 import logging
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Any, AsyncGenerator, Dict, List, Optional
 from datetime import datetime
 
 from services.context_qa_service import ContextQAService
+from services.executor_service import run_blocking
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/context", tags=["context"])
@@ -28,6 +31,7 @@ class AskResponse(BaseModel):
     sources: List[SourceInfo]
     conversation_id: str
     context_used: int
+    debug: Optional[Dict[str, Any]] = None
 
 
 class ConversationSummary(BaseModel):
@@ -72,8 +76,8 @@ async def retrieve_context(
     """Retrieve relevant context for a query (used by AI SDK route)."""
     try:
         service = ContextQAService()
-        embedding = service.embedding_service.generate_embedding(query)
-        context = await service._retrieve_context(user_id, embedding, limit)
+        embedding = await service.embedding_service.generate_embedding(query)
+        context = await service._retrieve_context(user_id, embedding, query, limit)
 
         return ContextRetrievalResponse(
             context=[
@@ -111,12 +115,52 @@ async def ask_question(
             sources=[SourceInfo(**s) for s in result["sources"]],
             conversation_id=result["conversation_id"],
             context_used=result["context_used"],
+            debug=result.get("debug"),
         )
     except Exception as e:
         logger.error(f"Error answering question: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/ask/stream")
+async def ask_question_stream(
+    request: AskRequest,
+    user_id: str = Query(..., description="User ID"),
+) -> StreamingResponse:
+    """
+    Ask a question about your business context with a streaming answer.
+
+    Streams SSE events:
+    - sources: Retrieved sources {sources, context_used}, before the answer
+    - token: A piece of the answer {content}
+    - done: Answer complete {conversation_id, metrics: {ttft_ms, retrieval_ms, total_ms, timings_ms, cache_hit}}
+    - error: Error occurred
+    """
+    async def generate() -> AsyncGenerator[str, None]:
+        try:
+            service = ContextQAService()
+            async for event in service.ask_stream(
+                user_id=user_id,
+                question=request.question,
+                conversation_id=request.conversation_id,
+            ):
+                yield f"data: {json.dumps(event)}\n\n"
+
+        except Exception as e:
+            logger.error(f"Error streaming answer: {e}")
+            yield f"data: {json.dumps({'type': 'error', 'content': str(e)})}\n\n"
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
 @router.get("/conversations", response_model=List[ConversationSummary])
 async def list_conversations(
     user_id: str = Query(..., description="User ID"),
@@ -125,7 +169,7 @@ async def list_conversations(
     """Get list of user's conversations."""
     try:
         service = ContextQAService()
-        conversations = service.get_conversations(user_id, limit)
+        conversations = await run_blocking(service.get_conversations, user_id, limit)
         return [ConversationSummary(**c) for c in conversations]
     except Exception as e:
         logger.error(f"Error listing conversations: {e}")
@@ -140,7 +184,7 @@ async def get_conversation(
     """Get a specific conversation."""
     try:
         service = ContextQAService()
-        conversation = service.get_conversation(conversation_id)
+        conversation = await run_blocking(service.get_conversation, conversation_id)
 
         if not conversation:
             raise HTTPException(status_code=404, detail="Conversation not found")
@@ -9,6 +9,7 @@ from typing import List, Dict, Any
 from config import settings
 from services.linear_service import LinearService
 from database.client import get_supabase_client
+from services.executor_service import run_blocking
 
 logger = logging.getLogger(__name__)
 
@@ -101,11 +102,9 @@ async def sync_linear(
     try:
         linear_service = LinearService()
         
-        # Sync issues
-        issues = await linear_service.sync_issues(user_id, days_back=30)
-        
-        # Sync projects
-        projects = await linear_service.sync_projects(user_id)
+        # Sync issues and projects
+        synced = await linear_service.sync_workspace(user_id, days_back=30)
+        issues, projects = synced["issues"], synced["projects"]
         
         return SyncResponse(
             success=True,
@@ -144,11 +143,11 @@ async def get_linear_issues(
     try:
         supabase = get_supabase_client()
         
-        result = supabase.table("linear_issues").select("*").eq(
+        result = await run_blocking(supabase.table("linear_issues").select("*").eq(
             "user_id", user_id
         ).eq("is_archived", False).order(
             "updated_at_linear", desc=True
-        ).limit(limit).execute()
+        ).limit(limit).execute)
         
         return result.data
         
@@ -175,11 +174,11 @@ async def get_linear_projects(
     try:
         supabase = get_supabase_client()
         
-        result = supabase.table("linear_projects").select("*").eq(
+        result = await run_blocking(supabase.table("linear_projects").select("*").eq(
             "user_id", user_id
         ).eq("is_archived", False).order(
             "target_date", desc=False
-        ).limit(limit).execute()
+        ).limit(limit).execute)
         
         return result.data
         
@@ -205,9 +204,9 @@ async def get_linear_status(
         supabase = get_supabase_client()
         
         # Get integration
-        integration_result = supabase.table("integrations").select("*").eq(
+        integration_result = await run_blocking(supabase.table("integrations").select("*").eq(
             "user_id", user_id
-        ).eq("provider", "linear").eq("is_active", True).execute()
+        ).eq("provider", "linear").eq("is_active", True).execute)
         
         if not integration_result.data:
             return {
@@ -218,14 +217,14 @@ async def get_linear_status(
         integration = integration_result.data[0]
         
         # Get issue count
-        issues_result = supabase.table("linear_issues").select("id", count="exact").eq(
+        issues_result = await run_blocking(supabase.table("linear_issues").select("id", count="exact").eq(
             "user_id", user_id
-        ).eq("is_archived", False).execute()
+        ).eq("is_archived", False).execute)
         
         # Get project count
-        projects_result = supabase.table("linear_projects").select("id", count="exact").eq(
+        projects_result = await run_blocking(supabase.table("linear_projects").select("id", count="exact").eq(
             "user_id", user_id
-        ).eq("is_archived", False).execute()
+        ).eq("is_archived", False).execute)
         
         return {
             "connected": True,
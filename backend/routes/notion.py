@@ -1,7 +1,7 @@
 """Notion integration routes for OAuth and sync."""
 
 import logging
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query
 from fastapi.responses import RedirectResponse
 from pydantic import BaseModel
 from typing import List, Optional
@@ -9,6 +9,7 @@ from datetime import datetime
 
 from config import settings
 from services.notion_service import NotionService
+from services.context_index_service import ContextIndexService
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/notion", tags=["notion"])
@@ -71,7 +72,7 @@ async def get_notion_status(user_id: str = Query(..., description="User ID")):
     """Get Notion connection status."""
     try:
         service = NotionService()
-        status = service.get_connection_status(user_id)
+        status = await service.get_connection_status(user_id)
         workspace = status.get("workspace", {})
         return ConnectionStatus(
             connected=status.get("connected", False),
@@ -124,11 +125,14 @@ async def search_notion_pages(
 async def sync_notion_page(
     user_id: str = Query(..., description="User ID"),
     page_id: str = Query(..., description="Page ID to sync"),
+    background_tasks: BackgroundTasks = None,
 ):
     """Sync a Notion page to context documents."""
     try:
         service = NotionService()
         result = await service.sync_page(user_id, page_id)
+        if background_tasks and result.get("changed"):
+            background_tasks.add_task(ContextIndexService().index_user, user_id, ["document"])
         return SyncResponse(
             success=True, page_id=page_id, title=result.get("title", "Untitled")
         )
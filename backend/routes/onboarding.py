@@ -82,7 +82,7 @@ async def save_user_context(
         """
         
         embedding_service = EmbeddingService()
-        embedding = embedding_service.generate_embedding(context_text.strip())
+        embedding = await embedding_service.generate_embedding(context_text.strip())
         
         # Prepare data for database
         context_data = {
@@ -4,7 +4,7 @@ import logging
 import hashlib
 import hmac
 import time
-from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, Request, Response
 from fastapi.responses import RedirectResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
@@ -12,6 +12,9 @@ from datetime import datetime
 
 from config import settings
 from services.slack_service import SlackService
+from services.context_index_service import ContextIndexService
+from services.slack_event_queue import DROPPED, get_slack_event_queue
+from services.slack_message_writer import get_slack_message_writer
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/slack", tags=["slack"])
@@ -74,7 +77,7 @@ async def get_slack_status(user_id: str = Query(..., description="User ID")):
     """Get Slack connection status."""
     try:
         service = SlackService()
-        status = service.get_connection_status(user_id)
+        status = await service.get_connection_status(user_id)
         workspace = status.get("workspace", {})
         return ConnectionStatus(
             connected=status.get("connected", False),
@@ -110,11 +113,14 @@ async def get_slack_channels(user_id: str = Query(..., description="User ID")):
 async def sync_slack_channel(
     user_id: str = Query(..., description="User ID"),
     channel_id: str = Query(..., description="Channel ID to sync"),
+    background_tasks: BackgroundTasks = None,
 ):
     """Sync messages from a Slack channel."""
     try:
         service = SlackService()
         count = await service.sync_messages(user_id, channel_id)
+        if background_tasks and count:
+            background_tasks.add_task(ContextIndexService().index_user, user_id, ["slack_message"])
         return SyncResponse(success=True, messages_synced=count, channel_id=channel_id)
     except Exception as e:
         logger.error(f"Error syncing Slack channel: {e}")
@@ -171,11 +177,21 @@ async def slack_events(request: Request):
     if data.get("type") == "url_verification":
         return {"challenge": data.get("challenge")}
 
-    # Handle events
+    # Ack immediately; Slack retries anything not answered within 3s
+    if data.get("type") == "event_callback":
+        if get_slack_event_queue().submit(data, dispatch_slack_event) == DROPPED:
+            # Non-2xx so Slack redelivers the event later
+            return Response(status_code=503)
+
+    return Response(status_code=200)
+
+
+async def dispatch_slack_event(data: Dict[str, Any]):
+    """Process a queued event callback."""
     event = data.get("event", {})
     event_type = event.get("type")
 
-    logger.info(f"Received Slack event: {event_type}")
+    logger.info(f"Processing Slack event: {event_type}")
 
     if event_type == "app_mention":
         # Bot was mentioned in a channel
@@ -184,31 +200,20 @@ async def slack_events(request: Request):
         # Direct message to the bot
         if not event.get("bot_id"):  # Ignore bot's own messages
             await handle_direct_message(event, data.get("team_id"))
-
-    return Response(status_code=200)
+    elif event_type == "message" and event.get("channel_type") in ("channel", "group"):
+        # New, edited or deleted channel message; stored like the polling sync would
+        await handle_channel_message(event, data.get("team_id"))
 
 
 async def handle_app_mention(event: Dict[str, Any], team_id: str):
     """Handle when Cosos bot is mentioned in a channel."""
-    from database.client import get_supabase_client
-
-    supabase = get_supabase_client()
     channel_id = event.get("channel")
     thread_ts = event.get("thread_ts") or event.get("ts")
     text = event.get("text", "")
     user_slack_id = event.get("user")
 
-    # Find user by team_id from knowledge_sources
-    source_result = supabase.table("knowledge_sources").select("user_id, metadata").eq(
-        "type", "slack"
-    ).execute()
-
-    user_id = None
-    for source in source_result.data:
-        metadata = source.get("metadata", {})
-        if metadata.get("team_id") == team_id:
-            user_id = source.get("user_id")
-            break
+    service = SlackService()
+    user_id = await service.get_user_for_team(team_id)
 
     if not user_id:
         logger.warning(f"Could not find user for Slack team {team_id}")
@@ -217,7 +222,6 @@ async def handle_app_mention(event: Dict[str, Any], team_id: str):
     # TODO: Process the message with Cosos AI and respond
     # For now, send a simple acknowledgment
     try:
-        service = SlackService()
         await service.send_message(
             user_id=user_id,
             channel_id=channel_id,
@@ -228,25 +232,51 @@ async def handle_app_mention(event: Dict[str, Any], team_id: str):
         logger.error(f"Failed to respond to mention: {e}")
 
 
+async def handle_channel_message(event: Dict[str, Any], team_id: str):
+    """
+    Apply a channel message event to slack_messages.
+
+    New and edited messages go through the batched writer; deletions remove
+    the row and its context chunks. The polling sync only reads messages
+    newer than each channel's watermark, so edits and deletions of older
+    messages are only seen here.
+    """
+    subtype = event.get("subtype")
+    if subtype == "message_changed":
+        # The edited message is nested; the event's own ts is the edit's
+        message = event.get("message") or {}
+    elif subtype == "message_deleted":
+        if not event.get("deleted_ts"):
+            return
+        message = None
+    else:
+        message = event
+    if message is not None and not message.get("text"):
+        return
+
+    service = SlackService()
+    user_id = await service.get_user_for_team(team_id)
+    if not user_id:
+        logger.warning(f"Could not find user for Slack team {team_id}")
+        return
+
+    writer = get_slack_message_writer()
+    if message is not None:
+        await writer.add(user_id, event["channel"], message)
+        return
+
+    # Write a still-buffered copy first so the delete doesn't miss it
+    await writer.flush()
+    await service.delete_message(user_id, event["channel"], event["deleted_ts"])
+
+
 async def handle_direct_message(event: Dict[str, Any], team_id: str):
     """Handle direct message to Cosos bot."""
-    from database.client import get_supabase_client
-
-    supabase = get_supabase_client()
     channel_id = event.get("channel")
     text = event.get("text", "")
 
-    # Find user by team_id
-    source_result = supabase.table("knowledge_sources").select("user_id, metadata").eq(
-        "type", "slack"
-    ).execute()
-
-    user_id = None
-    for source in source_result.data:
-        metadata = source.get("metadata", {})
-        if metadata.get("team_id") == team_id:
-            user_id = source.get("user_id")
-            break
+    service = SlackService()
+    user_id = await service.get_user_for_team(team_id)
 
     if not user_id:
         logger.warning(f"Could not find user for Slack team {team_id}")
@@ -254,7 +284,6 @@ async def handle_direct_message(event: Dict[str, Any], team_id: str):
 
     # TODO: Process the message with Cosos AI and respond
     try:
-        service = SlackService()
         await service.send_message(
             user_id=user_id,
             channel_id=channel_id,
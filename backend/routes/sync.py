@@ -7,8 +7,8 @@ from pydantic import BaseModel
 
 from services.gmail_service import GmailService
 from services.calendar_service import CalendarService
-from services.embedding_service import EmbeddingService
-from database.client import get_supabase_client
+from services.email_embedding_service import EmailEmbeddingService
+from services.context_index_service import ContextIndexService
 
 logger = logging.getLogger(__name__)
 
@@ -30,32 +30,7 @@ async def generate_email_embeddings(user_id: str):
         user_id: User ID
     """
     try:
-        supabase = get_supabase_client()
-        embedding_service = EmbeddingService()
-        
-        # Get emails without embeddings
-        result = supabase.table("emails").select("*").eq(
-            "user_id", user_id
-        ).is_("content_embedding", "null").execute()
-        
-        emails = result.data
-        logger.info(f"Generating embeddings for {len(emails)} emails")
-        
-        for email in emails:
-            # Generate embedding
-            embedding = embedding_service.embed_email(
-                subject=email.get('subject', ''),
-                body=email.get('body_text', ''),
-                from_email=email.get('from_email', '')
-            )
-            
-            # Update email with embedding
-            supabase.table("emails").update({
-                "content_embedding": embedding
-            }).eq("id", email["id"]).execute()
-        
-        logger.info(f"Generated embeddings for {len(emails)} emails")
-        
+        await EmailEmbeddingService().backfill_user(user_id)
     except Exception as e:
         logger.error(f"Error generating email embeddings: {e}")
 
@@ -92,6 +67,7 @@ async def sync_gmail(
         # Generate embeddings in background
         if background_tasks and synced_emails:
             background_tasks.add_task(generate_email_embeddings, user_id)
+            background_tasks.add_task(ContextIndexService().index_user, user_id, ["email"])
         
         return SyncResponse(
             message=f"Successfully synced {len(synced_emails)} emails",
@@ -110,7 +86,8 @@ async def sync_gmail(
 async def sync_calendar(
     user_id: str = Query(..., description="User ID"),
     days_forward: int = Query(7, description="Number of days forward to sync"),
-    days_back: int = Query(1, description="Number of days back to sync")
+    days_back: int = Query(1, description="Number of days back to sync"),
+    background_tasks: BackgroundTasks = None
 ):
     """
     Sync calendar events from Google Calendar.
@@ -133,6 +110,10 @@ async def sync_calendar(
             days_back=days_back
         )
         
+        # Index events for context Q&A in background
+        if background_tasks and synced_events:
+            background_tasks.add_task(ContextIndexService().index_user, user_id, ["calendar_event"])
+        
         return SyncResponse(
             message=f"Successfully synced {len(synced_events)} calendar events",
             synced_count=len(synced_events),
@@ -174,6 +155,10 @@ async def sync_all(
         # Generate embeddings in background
         if background_tasks and synced_emails:
             background_tasks.add_task(generate_email_embeddings, user_id)
+        if background_tasks and (synced_emails or synced_events):
+            background_tasks.add_task(
+                ContextIndexService().index_user, user_id, ["email", "calendar_event"]
+            )
         
         return {
             "message": "Successfully synced Gmail and Calendar",
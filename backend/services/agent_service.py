@@ -4,11 +4,12 @@ import logging
 import json
 from datetime import datetime, date, timedelta, timezone
 from typing import Dict, Any, List, Optional
-from openai import OpenAI
+from openai import AsyncOpenAI
 
 from config import settings
 from database.client import get_supabase_client
 from services.embedding_service import EmbeddingService
+from services.executor_service import run_blocking
 
 logger = logging.getLogger(__name__)
 
@@ -17,7 +18,7 @@ class AgentService:
     """AI agent for generating personalized daily briefs."""
     
     def __init__(self):
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
         self.supabase = get_supabase_client()
         self.embedding_service = EmbeddingService()
     
@@ -83,16 +84,16 @@ class AgentService:
         }
         
         # Upsert (update if exists for this date, insert if not)
-        existing = self.supabase.table("daily_briefs").select("id").eq(
+        existing = await run_blocking(self.supabase.table("daily_briefs").select("id").eq(
             "user_id", user_id
-        ).eq("brief_date", brief_date.isoformat()).execute()
+        ).eq("brief_date", brief_date.isoformat()).execute)
         
         if existing.data:
-            result = self.supabase.table("daily_briefs").update(brief_data).eq(
+            result = await run_blocking(self.supabase.table("daily_briefs").update(brief_data).eq(
                 "user_id", user_id
-            ).eq("brief_date", brief_date.isoformat()).execute()
+            ).eq("brief_date", brief_date.isoformat()).execute)
         else:
-            result = self.supabase.table("daily_briefs").insert(brief_data).execute()
+            result = await run_blocking(self.supabase.table("daily_briefs").insert(brief_data).execute)
         
         logger.info(f"Brief generated and saved for {user_id}")
         
@@ -100,32 +101,34 @@ class AgentService:
     
     async def _get_user_context(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve user context from database."""
-        result = self.supabase.table("user_context").select("*").eq("user_id", user_id).execute()
+        result = await run_blocking(
+            self.supabase.table("user_context").select("*").eq("user_id", user_id).execute
+        )
         return result.data[0] if result.data else None
 
     async def _get_active_projects(self, user_id: str) -> List[Dict[str, Any]]:
         """Retrieve active projects for the user."""
-        result = self.supabase.table("projects").select("*").eq(
+        result = await run_blocking(self.supabase.table("projects").select("*").eq(
             "user_id", user_id
-        ).eq("status", "active").execute()
+        ).eq("status", "active").execute)
         return result.data if result.data else []
 
     async def _get_active_initiatives(self, user_id: str) -> List[Dict[str, Any]]:
         """Retrieve active initiatives for the user."""
-        result = self.supabase.table("initiatives").select("*").eq(
+        result = await run_blocking(self.supabase.table("initiatives").select("*").eq(
             "user_id", user_id
-        ).eq("status", "active").execute()
+        ).eq("status", "active").execute)
         return result.data if result.data else []
     
     async def _get_recent_emails(self, user_id: str, days_back: int = 1) -> List[Dict[str, Any]]:
         """Get recent emails for analysis."""
         cutoff = datetime.now(timezone.utc) - timedelta(days=days_back)
         
-        result = self.supabase.table("emails").select(
+        result = await run_blocking(self.supabase.table("emails").select(
             "id, subject, from_email, from_name, body_text, received_at, is_read, labels"
         ).eq("user_id", user_id).gte(
             "received_at", cutoff.isoformat()
-        ).order("received_at", desc=True).limit(50).execute()
+        ).order("received_at", desc=True).limit(50).execute)
         
         return result.data or []
     
@@ -134,13 +137,13 @@ class AgentService:
         start_of_day = datetime.combine(target_date, datetime.min.time()).replace(tzinfo=timezone.utc)
         end_of_day = datetime.combine(target_date, datetime.max.time()).replace(tzinfo=timezone.utc)
         
-        result = self.supabase.table("calendar_events").select(
+        result = await run_blocking(self.supabase.table("calendar_events").select(
             "id, title, description, start_time, end_time, attendees, location"
         ).eq("user_id", user_id).gte(
             "start_time", start_of_day.isoformat()
         ).lte(
             "start_time", end_of_day.isoformat()
-        ).order("start_time").execute()
+        ).order("start_time").execute)
         
         return result.data or []
     
@@ -162,7 +165,7 @@ class AgentService:
         prompt = self._build_analysis_prompt(context, projects, initiatives, emails, events, brief_date)
         
         # Call GPT-4o-mini with structured output
-        response = self.client.chat.completions.create(
+        response = await self.client.chat.completions.create(
             model=settings.OPENAI_MODEL,
             messages=[
                 {
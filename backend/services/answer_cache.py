@@ -0,0 +1,225 @@
+"""Per-user semantic cache of Context Q&A answers."""
+
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def context_fingerprint(context: List[Dict[str, Any]]) -> str:
+    """
+    Fingerprint retrieved context by chunk ID and chunk text.
+
+    Re-indexing a changed source rewrites its chunk text, so the text hash
+    acts as the chunk's version.
+
+    Args:
+        context: Retrieved context items
+
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.sha256()
+    for item_id, text in sorted((str(item["id"]), item.get("text") or "") for item in context):
+        digest.update(item_id.encode("utf-8"))
+        digest.update(hashlib.sha1(text.encode("utf-8")).digest())
+    return digest.hexdigest()
+
+
+def _source_keys(context: List[Dict[str, Any]]) -> Set[Tuple[str, str]]:
+    """(source_type, source row ID) of each context item."""
+    return {(item["type"], str(item.get("source_id") or item["id"])) for item in context}
+
+
+class _Entry:
+    __slots__ = ("question", "vector", "fingerprint", "sources", "answer", "answer_sources", "created_at")
+
+    def __init__(self, question, vector, fingerprint, sources, answer, answer_sources):
+        self.question = question
+        self.vector = vector
+        self.fingerprint = fingerprint
+        self.sources = sources
+        self.answer = answer
+        self.answer_sources = answer_sources
+        self.created_at = time.monotonic()
+
+
+class AnswerCache:
+    """
+    Reuses answers to near-duplicate questions over unchanged context.
+
+    An entry matches when the question embedding's cosine similarity to the
+    cached question is at least ANSWER_CACHE_SIMILARITY and the freshly
+    retrieved context has the same fingerprint, so a hit skips only the LLM
+    call and can never serve an answer built from different sources.
+    ContextIndexService also drops entries whose sources it re-indexes or
+    deletes. Entries expire after ANSWER_CACHE_TTL_SECONDS; each user keeps
+    at most ANSWER_CACHE_MAX_ENTRIES_PER_USER and the least recently used
+    users are dropped beyond ANSWER_CACHE_MAX_USERS.
+    """
+
+    def __init__(self, ttl_seconds: float, similarity: float, max_entries_per_user: int, max_users: int):
+        self.ttl = ttl_seconds
+        self.similarity = similarity
+        self.max_entries_per_user = max_entries_per_user
+        self.max_users = max_users
+        self._entries: "OrderedDict[str, List[_Entry]]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def lookup(
+        self, user_id: str, embedding: List[float], context: List[Dict[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Find a cached answer for a question.
+
+        Args:
+            user_id: User ID
+            embedding: Question embedding
+            context: Context retrieved for the question
+
+        Returns:
+            {answer, sources, question} of the matching entry, or None
+        """
+        if not settings.ANSWER_CACHE_ENABLED:
+            return None
+
+        entries = self._live_entries(user_id)
+        fingerprint = context_fingerprint(context)
+        vector = self._normalize(embedding)
+
+        best, best_similarity = None, self.similarity
+        for entry in entries:
+            if entry.fingerprint != fingerprint:
+                continue
+            similarity = float(entry.vector @ vector)
+            if similarity >= best_similarity:
+                best, best_similarity = entry, similarity
+
+        if best is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(user_id)
+        return {"answer": best.answer, "sources": best.answer_sources, "question": best.question}
+
+    def store(
+        self,
+        user_id: str,
+        question: str,
+        embedding: List[float],
+        context: List[Dict[str, Any]],
+        answer: str,
+        sources: List[Dict[str, Any]],
+    ):
+        """
+        Cache an answer.
+
+        Args:
+            user_id: User ID
+            question: The question
+            embedding: Question embedding
+            context: Context the answer was generated from
+            answer: Generated answer
+            sources: Sources shown with the answer
+        """
+        if not settings.ANSWER_CACHE_ENABLED or not answer:
+            return
+
+        entries = self._live_entries(user_id)
+        entries.append(
+            _Entry(question, self._normalize(embedding), context_fingerprint(context), _source_keys(context), answer, sources)
+        )
+        del entries[:-self.max_entries_per_user]
+
+        self._entries[user_id] = entries
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_users:
+            self._entries.popitem(last=False)
+
+    def invalidate_sources(self, source_type: str, source_ids: Iterable[str], user_id: Optional[str] = None):
+        """
+        Drop entries built from any of the given source rows.
+
+        Args:
+            source_type: Source type
+            source_ids: IDs of changed or deleted source rows
+            user_id: Limit to one user's entries (all users if None)
+        """
+        keys = {(source_type, str(source_id)) for source_id in source_ids}
+        if not keys:
+            return
+
+        for uid in [user_id] if user_id is not None else list(self._entries):
+            entries = self._entries.get(uid)
+            if not entries:
+                continue
+            kept = [entry for entry in entries if not (entry.sources & keys)]
+            self.invalidations += len(entries) - len(kept)
+            self._entries[uid] = kept
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters.
+
+        Returns:
+            Dictionary of counters
+        """
+        lookups = self.hits + self.misses
+        return {
+            "enabled": settings.ANSWER_CACHE_ENABLED,
+            "users": len(self._entries),
+            "entries": sum(len(entries) for entries in self._entries.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "ttl_seconds": self.ttl,
+            "similarity_cutoff": self.similarity,
+        }
+
+    def _live_entries(self, user_id: str) -> List[_Entry]:
+        """A user's unexpired entries, pruning expired ones."""
+        cutoff = time.monotonic() - self.ttl
+        entries = [entry for entry in self._entries.get(user_id, []) if entry.created_at > cutoff]
+        if user_id in self._entries:
+            self._entries[user_id] = entries
+        return entries
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+# Global cache instance
+_answer_cache: Optional[AnswerCache] = None
+
+
+def get_answer_cache() -> AnswerCache:
+    """
+    Get the global answer cache instance.
+
+    Returns:
+        AnswerCache instance
+    """
+    global _answer_cache
+    if _answer_cache is None:
+        _answer_cache = AnswerCache(
+            ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+            similarity=settings.ANSWER_CACHE_SIMILARITY,
+            max_entries_per_user=settings.ANSWER_CACHE_MAX_ENTRIES_PER_USER,
+            max_users=settings.ANSWER_CACHE_MAX_USERS,
+        )
+    return _answer_cache
@@ -9,12 +9,13 @@ import logging
 import json
 from datetime import datetime, date
 from typing import Dict, Any, Optional
-from openai import OpenAI
+from openai import AsyncOpenAI
 from uuid import UUID
 
 from config import settings
 from database.client import get_supabase_client
 from models.artifact import ArtifactType, ArtifactCreate, Artifact, ArtifactPhase
+from services.executor_service import run_blocking
 
 logger = logging.getLogger(__name__)
 
@@ -23,7 +24,7 @@ class ArtifactService:
     """Service for generating artifacts from user prompts."""
     
     def __init__(self):
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
         self.supabase = get_supabase_client()
     
     async def generate_artifact(
@@ -96,7 +97,7 @@ class ArtifactService:
             artifact_data["spec"] = spec
             artifact_data["phase"] = phase
 
-        result = self.supabase.table("artifacts").insert(artifact_data).execute()
+        result = await run_blocking(self.supabase.table("artifacts").insert(artifact_data).execute)
 
         if not result.data:
             raise ValueError("Failed to save artifact to database")
@@ -217,7 +218,7 @@ Guidelines:
         })
 
         # Call OpenAI
-        response = self.client.chat.completions.create(
+        response = await self.client.chat.completions.create(
             model="gpt-4o-mini",
             messages=messages,
             temperature=0.7,
@@ -350,7 +351,7 @@ The spec is the blueprint - UI will be generated from it later.
 
         # Stream the OpenAI response
         try:
-            stream = self.client.chat.completions.create(
+            stream = await self.client.chat.completions.create(
                 model="gpt-4o-mini",
                 messages=messages,
                 temperature=0.7,
@@ -361,7 +362,7 @@ The spec is the blueprint - UI will be generated from it later.
             full_content = ""
             yielded_building = False
 
-            for chunk in stream:
+            async for chunk in stream:
                 if chunk.choices[0].delta.content:
                     full_content += chunk.choices[0].delta.content
 
@@ -461,7 +462,7 @@ Guidelines:
 - Keep it focused (3-6 components max)
 """
 
-        response = self.client.chat.completions.create(
+        response = await self.client.chat.completions.create(
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -505,7 +506,7 @@ Guidelines:
         Respond with ONLY the artifact type (e.g., "mrr_tracker"). No explanation.
         """
         
-        response = self.client.chat.completions.create(
+        response = await self.client.chat.completions.create(
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": "You are a classifier. Respond with only the artifact type."},
@@ -635,7 +636,7 @@ Guidelines:
         Generate the MRR Growth Tracker JSON.
         """
 
-        response = self.client.chat.completions.create(
+        response = await self.client.chat.completions.create(
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -814,7 +815,7 @@ Important rules:
         Return ONLY valid JSON, no markdown formatting.
         """
 
-        response = self.client.chat.completions.create(
+        response = await self.client.chat.completions.create(
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -874,15 +875,15 @@ Important rules:
             "was_successful": True
         }
 
-        self.supabase.table("prompts").insert(prompt_data).execute()
+        await run_blocking(self.supabase.table("prompts").insert(prompt_data).execute)
 
     async def get_artifact(self, artifact_id: str, user_id: str) -> Optional[Artifact]:
         """Get an artifact by ID."""
-        result = self.supabase.table("artifacts")\
-            .select("*")\
-            .eq("id", artifact_id)\
-            .eq("user_id", user_id)\
-            .execute()
+        result = await run_blocking(self.supabase.table("artifacts")
+            .select("*")
+            .eq("id", artifact_id)
+            .eq("user_id", user_id)
+            .execute)
 
         if not result.data:
             return None
@@ -896,14 +897,14 @@ Important rules:
         offset: int = 0
     ) -> list[Artifact]:
         """List all artifacts for a user."""
-        result = self.supabase.table("artifacts")\
-            .select("*")\
-            .eq("user_id", user_id)\
-            .eq("status", "active")\
-            .order("created_at", desc=True)\
-            .limit(limit)\
-            .offset(offset)\
-            .execute()
+        result = await run_blocking(self.supabase.table("artifacts")
+            .select("*")
+            .eq("user_id", user_id)
+            .eq("status", "active")
+            .order("created_at", desc=True)
+            .limit(limit)
+            .offset(offset)
+            .execute)
 
         return [Artifact(**item) for item in result.data]
 
@@ -914,11 +915,11 @@ Important rules:
         updates: Dict[str, Any]
     ) -> Artifact:
         """Update an artifact."""
-        result = self.supabase.table("artifacts")\
-            .update(updates)\
-            .eq("id", artifact_id)\
-            .eq("user_id", user_id)\
-            .execute()
+        result = await run_blocking(self.supabase.table("artifacts")
+            .update(updates)
+            .eq("id", artifact_id)
+            .eq("user_id", user_id)
+            .execute)
 
         if not result.data:
             raise ValueError("Artifact not found or update failed")
@@ -943,10 +944,10 @@ Important rules:
             Updated artifact
         """
         # First, get the current artifact
-        result = self.supabase.table("artifacts")\
-            .select("*")\
-            .eq("id", artifact_id)\
-            .execute()
+        result = await run_blocking(self.supabase.table("artifacts")
+            .select("*")
+            .eq("id", artifact_id)
+            .execute)
 
         if not result.data:
             raise ValueError("Artifact not found")
@@ -958,10 +959,10 @@ Important rules:
         content["data"] = data
 
         # Update the artifact
-        update_result = self.supabase.table("artifacts")\
-            .update({"content": content})\
-            .eq("id", artifact_id)\
-            .execute()
+        update_result = await run_blocking(self.supabase.table("artifacts")
+            .update({"content": content})
+            .eq("id", artifact_id)
+            .execute)
 
         if not update_result.data:
             raise ValueError("Failed to update artifact data")
@@ -984,20 +985,20 @@ Important rules:
             ValueError: If artifact not found or user doesn't have permission
         """
         # Verify the artifact exists and belongs to the user
-        result = self.supabase.table("artifacts")\
-            .select("id, user_id")\
-            .eq("id", artifact_id)\
-            .eq("user_id", user_id)\
-            .execute()
+        result = await run_blocking(self.supabase.table("artifacts")
+            .select("id, user_id")
+            .eq("id", artifact_id)
+            .eq("user_id", user_id)
+            .execute)
 
         if not result.data:
             raise ValueError("Artifact not found or you don't have permission to delete it")
 
         # Delete the artifact
-        delete_result = self.supabase.table("artifacts")\
-            .delete()\
-            .eq("id", artifact_id)\
-            .execute()
+        delete_result = await run_blocking(self.supabase.table("artifacts")
+            .delete()
+            .eq("id", artifact_id)
+            .execute)
 
         if not delete_result.data:
             raise ValueError("Failed to delete artifact")
@@ -1022,11 +1023,11 @@ Important rules:
             Dict with assistant_message and updated artifact
         """
         # Get the current artifact
-        result = self.supabase.table("artifacts")\
-            .select("*")\
-            .eq("id", artifact_id)\
-            .eq("user_id", user_id)\
-            .execute()
+        result = await run_blocking(self.supabase.table("artifacts")
+            .select("*")
+            .eq("id", artifact_id)
+            .eq("user_id", user_id)
+            .execute)
 
         if not result.data:
             raise ValueError("Artifact not found or you don't have permission to edit it")
@@ -1074,7 +1075,7 @@ Be conversational and helpful. If the request is unclear, ask for clarification.
         })
 
         # Call OpenAI
-        response = self.client.chat.completions.create(
+        response = await self.client.chat.completions.create(
             model="gpt-4o-mini",
             messages=messages,
             temperature=0.7,
@@ -1085,10 +1086,10 @@ Be conversational and helpful. If the request is unclear, ask for clarification.
 
         # Update the artifact if content was changed
         if "updated_content" in result_json:
-            update_result = self.supabase.table("artifacts")\
-                .update({"content": result_json["updated_content"]})\
-                .eq("id", artifact_id)\
-                .execute()
+            update_result = await run_blocking(self.supabase.table("artifacts")
+                .update({"content": result_json["updated_content"]})
+                .eq("id", artifact_id)
+                .execute)
 
             if not update_result.data:
                 raise ValueError("Failed to update artifact")
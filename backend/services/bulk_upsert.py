@@ -0,0 +1,131 @@
+"""Bulk upsert of synced records keyed on their natural unique keys."""
+
+import hashlib
+import json
+import logging
+from typing import Any, Dict, List, Sequence, Tuple
+
+from database.client import get_supabase_client
+from services.executor_service import run_blocking
+
+logger = logging.getLogger(__name__)
+
+# Column holding a hash of the last written row, used for change detection
+SYNC_HASH_COLUMN = "sync_hash"
+
+# Values per in_ filter, keeps the PostgREST URL within length limits
+IN_FILTER_CHUNK = 200
+
+# Rows per upsert request
+UPSERT_CHUNK = 500
+
+
+def row_hash(row: Dict[str, Any]) -> str:
+    """SHA-256 of a row's canonical JSON form."""
+    return hashlib.sha256(
+        json.dumps(row, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+async def bulk_upsert(
+    table: str,
+    rows: List[Dict[str, Any]],
+    key_columns: Sequence[str],
+) -> List[Dict[str, Any]]:
+    """
+    Upsert rows in bulk and return only the rows that were inserted or changed.
+
+    Each row is stamped with a hash of its contents. The stored hashes for
+    the page are read in one query (per IN_FILTER_CHUNK keys) and only rows
+    whose hash differs are written, in one upsert per UPSERT_CHUNK rows.
+    Unchanged rows are not rewritten, so their updated_at triggers don't
+    fire and downstream watermarks don't move.
+
+    Args:
+        table: Table name
+        rows: Rows to write; must include every key column
+        key_columns: Columns of the table's unique constraint, e.g.
+            ("user_id", "gcal_id")
+
+    Returns:
+        Written rows as returned by the database
+    """
+    if not rows:
+        return []
+
+    supabase = get_supabase_client()
+
+    # Last occurrence wins; Postgres rejects an upsert that hits a key twice
+    pending: Dict[Tuple, Dict[str, Any]] = {}
+    for row in rows:
+        pending[_key(row, key_columns)] = {**row, SYNC_HASH_COLUMN: row_hash(row)}
+
+    stored = await _get_stored_hashes(supabase, table, list(pending), key_columns)
+    changed = [
+        row for key, row in pending.items()
+        if stored.get(key) != row[SYNC_HASH_COLUMN]
+    ]
+
+    written: List[Dict[str, Any]] = []
+    for i in range(0, len(changed), UPSERT_CHUNK):
+        result = await run_blocking(
+            supabase.table(table).upsert(
+                changed[i:i + UPSERT_CHUNK], on_conflict=",".join(key_columns)
+            ).execute
+        )
+        written.extend(result.data or [])
+
+    logger.debug(
+        f"Bulk upsert into {table}: {len(pending)} rows, {len(written)} changed"
+    )
+    return written
+
+
+def _key(row: Dict[str, Any], key_columns: Sequence[str]) -> Tuple:
+    """Natural key of a row as a tuple of strings."""
+    return tuple(str(row[column]) for column in key_columns)
+
+
+async def _get_stored_hashes(
+    supabase, table: str, keys: List[Tuple], key_columns: Sequence[str]
+) -> Dict[Tuple, str]:
+    """
+    Read stored sync hashes for a set of natural keys.
+
+    Key columns with a single value across the page (typically user_id) are
+    filtered with eq; the others with in_. When several columns vary the
+    query returns a superset, which is narrowed to the exact keys here.
+    """
+    varying = [
+        i for i in range(len(key_columns))
+        if len({key[i] for key in keys}) > 1
+    ]
+    # Chunk on the first varying column; constant columns use eq
+    chunk_column = varying[0] if varying else None
+    chunk_values = sorted({key[chunk_column] for key in keys}) if varying else [None]
+
+    wanted = set(keys)
+    stored: Dict[Tuple, str] = {}
+    select = ", ".join([*key_columns, SYNC_HASH_COLUMN])
+
+    for i in range(0, len(chunk_values), IN_FILTER_CHUNK):
+        chunk = chunk_values[i:i + IN_FILTER_CHUNK]
+        chunk_set = set(chunk)
+        query = supabase.table(table).select(select)
+
+        for index, column in enumerate(key_columns):
+            if index == chunk_column:
+                query = query.in_(column, chunk)
+            elif index in varying:
+                values = {key[index] for key in keys if key[chunk_column] in chunk_set}
+                query = query.in_(column, sorted(values))
+            else:
+                query = query.eq(column, keys[0][index])
+
+        result = await run_blocking(query.execute)
+        for row in result.data or []:
+            key = _key(row, key_columns)
+            if key in wanted:
+                stored[key] = row.get(SYNC_HASH_COLUMN)
+
+    return stored
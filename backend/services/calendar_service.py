@@ -4,12 +4,15 @@ import logging
 from datetime import datetime, timedelta, timezone
 from typing import List, Optional, Dict, Any
 
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
 from config import settings
 from database.client import get_supabase_client
+from services.bulk_upsert import bulk_upsert
+from services.credential_broker import get_credential_broker
+from services.context_index_service import ContextIndexService
+from services.executor_service import run_blocking
+from services.google_client_factory import get_google_client_factory
 
 logger = logging.getLogger(__name__)
 
@@ -21,132 +24,161 @@ class CalendarService:
         self.supabase = get_supabase_client()
         self.scopes = settings.CALENDAR_SCOPES
     
-    def _get_credentials(self, user_id: str) -> Optional[Credentials]:
-        """
-        Get Google Calendar credentials for a user.
-        Uses the same OAuth integration as Gmail.
-        
-        Args:
-            user_id: User ID
-            
-        Returns:
-            Google credentials or None
-        """
-        # Fetch integration from database (same as Gmail)
-        result = self.supabase.table("integrations").select("*").eq(
-            "user_id", user_id
-        ).eq("provider", "gmail").eq("is_active", True).execute()
-        
-        if not result.data:
-            logger.warning(f"No Google integration found for user {user_id}")
-            return None
-        
-        integration = result.data[0]
-        
-        # Create credentials object
-        credentials = Credentials(
-            token=integration["access_token"],
-            refresh_token=integration["refresh_token"],
-            token_uri="https://oauth2.googleapis.com/token",
-            client_id=settings.GOOGLE_CLIENT_ID,
-            client_secret=settings.GOOGLE_CLIENT_SECRET,
-            scopes=settings.GMAIL_SCOPES + self.scopes,
-        )
-        
-        # Check if token needs refresh
-        if integration.get("token_expires_at"):
-            expiry = datetime.fromisoformat(integration["token_expires_at"])
-            now = datetime.now(timezone.utc)
-            if expiry <= now:
-                logger.info(f"Refreshing token for user {user_id}")
-                credentials.refresh(None)
-
-                # Update token in database
-                self.supabase.table("integrations").update({
-                    "access_token": credentials.token,
-                    "token_expires_at": credentials.expiry.isoformat() if credentials.expiry else None,
-                    "updated_at": now.isoformat(),
-                }).eq("id", integration["id"]).execute()
-        
-        return credentials
-    
     async def sync_calendar(
         self, 
         user_id: str, 
         days_forward: int = 7,
-        days_back: int = 1
+        days_back: int = 1,
+        calendar_id: str = 'primary'
     ) -> List[Dict[str, Any]]:
         """
         Sync calendar events from Google Calendar.
+
+        After a windowed sync the Calendar API's nextSyncToken is stored per
+        user and calendar; later syncs pass it back and receive only events
+        changed or cancelled since then. Cancelled events are deleted locally.
+        A windowed resync only happens on the first run or when Google
+        rejects the token with 410 Gone. All result pages are followed.
+
+        The sync token only reports changes, so events already inside the
+        windowed sync are the only pre-existing ones ever stored; its
+        horizon is therefore at least CALENDAR_SEED_DAYS_FORWARD, so
+        meetings booked weeks ahead and recurring instances are not lost.
         
         Args:
             user_id: User ID
-            days_forward: Number of days forward to sync
-            days_back: Number of days back to sync
+            days_forward: Minimum number of days forward to sync (windowed sync only)
+            days_back: Number of days back to sync (windowed sync only)
+            calendar_id: Google calendar ID
             
         Returns:
-            List of synced calendar events
+            List of new or changed calendar events
         """
-        credentials = self._get_credentials(user_id)
+        credentials = await get_credential_broker().get_google_credentials(user_id)
         if not credentials:
             raise ValueError(f"No Google credentials found for user {user_id}")
         
-        service = build('calendar', 'v3', credentials=credentials)
-
-        # Calculate time range
-        # Use replace(tzinfo=None) to get naive datetime, then add 'Z' for UTC
-        now = datetime.now(timezone.utc)
-        time_min = (now - timedelta(days=days_back)).replace(tzinfo=None).isoformat() + 'Z'
-        time_max = (now + timedelta(days=days_forward)).replace(tzinfo=None).isoformat() + 'Z'
-        
-        try:
-            # Get events from primary calendar
-            events_result = service.events().list(
-                calendarId='primary',
-                timeMin=time_min,
-                timeMax=time_max,
-                maxResults=100,
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute()
+        async with get_google_client_factory().lease(user_id, 'calendar', credentials) as service:
+            try:
+                sync_token = await self._get_sync_token(user_id, calendar_id)
+            
+                events = None
+                if sync_token:
+                    try:
+                        events, next_sync_token = await self._list_events(
+                            service, calendar_id, syncToken=sync_token
+                        )
+                    except HttpError as error:
+                        if error.resp.status != 410:
+                            raise
+                        logger.info(f"Calendar sync token expired for user {user_id}, resyncing window")
             
-            events = events_result.get('items', [])
-            logger.info(f"Found {len(events)} calendar events for user {user_id}")
+                if events is None:
+                    # Use replace(tzinfo=None) to get naive datetime, then add 'Z' for UTC
+                    now = datetime.now(timezone.utc)
+                    events, next_sync_token = await self._list_events(
+                        service,
+                        calendar_id,
+                        timeMin=(now - timedelta(days=days_back)).replace(tzinfo=None).isoformat() + 'Z',
+                        timeMax=(
+                            now + timedelta(days=max(days_forward, settings.CALENDAR_SEED_DAYS_FORWARD))
+                        ).replace(tzinfo=None).isoformat() + 'Z',
+                    )
             
-            synced_events = []
+                logger.info(f"Found {len(events)} calendar events for user {user_id}")
             
-            for event in events:
-                # Parse event data
-                event_data = self._parse_event(event, user_id)
-                
-                # Check if event already exists
-                existing = self.supabase.table("calendar_events").select("id").eq(
-                    "gcal_id", event_data["gcal_id"]
-                ).execute()
-                
-                if existing.data:
-                    # Update existing event
-                    result = self.supabase.table("calendar_events").update(
-                        event_data
-                    ).eq("id", existing.data[0]["id"]).execute()
-                    logger.debug(f"Updated event: {event_data['title']}")
-                else:
-                    # Insert new event
-                    result = self.supabase.table("calendar_events").insert(
-                        event_data
-                    ).execute()
-                    logger.debug(f"Synced new event: {event_data['title']}")
-                
-                if result.data:
-                    synced_events.append(result.data[0])
+                cancelled_ids = [event['id'] for event in events if event.get('status') == 'cancelled']
+                event_rows = [
+                    self._parse_event(event, user_id)
+                    for event in events if event.get('status') != 'cancelled'
+                ]
             
-            logger.info(f"Synced {len(synced_events)} calendar events for user {user_id}")
+                synced_events = await bulk_upsert(
+                    "calendar_events", event_rows, ("user_id", "gcal_id")
+                )
+                await self._delete_events(user_id, cancelled_ids)
             
-            return synced_events
+                # Only advance the token once this batch of changes is stored
+                if next_sync_token:
+                    await self._set_sync_token(user_id, calendar_id, next_sync_token)
             
-        except HttpError as error:
-            logger.error(f"Calendar API error: {error}")
-            raise
+                logger.info(
+                    f"Synced {len(synced_events)} new or changed calendar events for user {user_id}"
+                    f" ({len(cancelled_ids)} cancelled)"
+                )
+            
+                return synced_events
+            
+            except HttpError as error:
+                logger.error(f"Calendar API error: {error}")
+                raise
+    
+    async def _list_events(self, service, calendar_id: str, **params):
+        """
+        List events following nextPageToken until the last page.
+        
+        Args:
+            service: Calendar API service
+            calendar_id: Google calendar ID
+            **params: Either syncToken or timeMin/timeMax
+            
+        Returns:
+            Tuple of (events, nextSyncToken from the last page or None)
+            
+        Raises:
+            HttpError: 410 if the sync token is no longer valid
+        """
+        events = []
+        page_token = None
+        
+        while True:
+            result = await run_blocking(service.events().list(
+                calendarId=calendar_id,
+                singleEvents=True,
+                maxResults=settings.CALENDAR_PAGE_SIZE,
+                pageToken=page_token,
+                **params
+            ).execute)
+            
+            events.extend(result.get('items', []))
+            
+            page_token = result.get('nextPageToken')
+            if not page_token:
+                return events, result.get('nextSyncToken')
+    
+    async def _delete_events(self, user_id: str, gcal_ids: List[str]):
+        """
+        Delete cancelled events and their context chunks.
+        
+        Args:
+            user_id: User ID
+            gcal_ids: Google event IDs
+        """
+        if not gcal_ids:
+            return
+        
+        deleted = await run_blocking(self.supabase.table("calendar_events").delete().eq(
+            "user_id", user_id
+        ).in_("gcal_id", gcal_ids).execute)
+        
+        await ContextIndexService().delete_sources(
+            "calendar_event", [row["id"] for row in deleted.data or []]
+        )
+    
+    async def _get_sync_token(self, user_id: str, calendar_id: str) -> Optional[str]:
+        """Get the stored sync token for a user's calendar."""
+        result = await run_blocking(self.supabase.table("calendar_sync_state").select(
+            "sync_token"
+        ).eq("user_id", user_id).eq("calendar_id", calendar_id).execute)
+        return result.data[0]["sync_token"] if result.data else None
+    
+    async def _set_sync_token(self, user_id: str, calendar_id: str, sync_token: str):
+        """Store the sync token for a user's calendar."""
+        await run_blocking(self.supabase.table("calendar_sync_state").upsert({
+            "user_id": user_id,
+            "calendar_id": calendar_id,
+            "sync_token": sync_token,
+        }, on_conflict="user_id,calendar_id").execute)
     
     def _parse_event(self, event: Dict[str, Any], user_id: str) -> Dict[str, Any]:
         """
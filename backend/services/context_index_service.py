@@ -0,0 +1,391 @@
+"""Chunk-and-index ingestion of synced data into context_embeddings."""
+
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from config import settings
+from database.client import get_supabase_client
+from services.answer_cache import get_answer_cache
+from services.embedding_service import EmbeddingService, chunk_paragraphs, chunk_text
+from services.executor_service import run_blocking
+
+logger = logging.getLogger(__name__)
+
+# Indexable sources. "cursor" is a row timestamp set on insert (and bumped on
+# update where rows can change), used as the per-user indexing watermark.
+# Provider timestamps like message_at are not used: backfilled rows can be
+# older than the watermark.
+CONTEXT_SOURCES: Dict[str, Dict[str, Any]] = {
+    "document": {
+        "table": "context_documents",
+        "columns": "id, title, type, content, external_url, updated_at",
+        "cursor": "updated_at",
+    },
+    "slack_message": {
+        "table": "slack_messages",
+        "columns": "id, channel_id, channel_name, user_name, user_slack_id, text, thread_ts, message_at, updated_at",
+        "cursor": "updated_at",
+    },
+    "linear_issue": {
+        "table": "linear_issues",
+        "columns": (
+            "id, title, description, state_name, state_type, priority, team_name, "
+            "project_name, completed_at, linear_url, updated_at"
+        ),
+        "cursor": "updated_at",
+    },
+    "email": {
+        "table": "emails",
+        "columns": "id, subject, from_email, from_name, body_text, received_at, created_at",
+        "cursor": "created_at",
+    },
+    "calendar_event": {
+        "table": "calendar_events",
+        "columns": "id, title, description, location, start_time, end_time, attendees, updated_at",
+        "cursor": "updated_at",
+    },
+}
+
+
+# user_id -> sources requested while an index_user run for the user is in
+# progress, shared by all ContextIndexService instances
+_active_runs: Dict[str, Set[str]] = {}
+
+
+class ContextIndexService:
+    """
+    Keeps context_embeddings in sync with the user's synced data.
+
+    Each run picks up rows changed since the per-source watermark in
+    context_index_state, splits them into overlapping token-bounded chunks,
+    embeds the chunks in batches and upserts them on
+    (source_type, source_id, chunk_index). Chunks left over from a longer
+    previous version of a row are deleted.
+    """
+
+    def __init__(self):
+        self.supabase = get_supabase_client()
+        self.embedding_service = EmbeddingService()
+        self.chunk_tokens = settings.CONTEXT_CHUNK_TOKENS
+        self.overlap_tokens = settings.CONTEXT_CHUNK_OVERLAP_TOKENS
+        self.page_size = settings.CONTEXT_INDEX_PAGE_SIZE
+
+    async def index_user(
+        self, user_id: str, source_types: Optional[List[str]] = None
+    ) -> Dict[str, int]:
+        """
+        Index a user's sources incrementally.
+
+        Errors are logged per source so one failing source doesn't block the
+        others; this makes the method safe to run as a background task.
+
+        At most one run per user is in progress at a time, so runs never
+        duplicate embedding work or race on the watermarks. A call made
+        while one is in progress returns at once and the running call
+        indexes its sources again before finishing.
+
+        Args:
+            user_id: User ID
+            source_types: Sources to index (defaults to all of CONTEXT_SOURCES)
+
+        Returns:
+            Number of chunks written per source type (empty if handed off
+            to a run already in progress)
+        """
+        requested = set(source_types or CONTEXT_SOURCES)
+        if user_id in _active_runs:
+            _active_runs[user_id].update(requested)
+            return {}
+
+        _active_runs[user_id] = set()
+        counts: Dict[str, int] = {}
+        try:
+            while requested:
+                for source_type in requested:
+                    try:
+                        written = await self.index_source(user_id, source_type)
+                    except Exception as e:
+                        logger.error(f"Error indexing {source_type} for user {user_id}: {e}")
+                        written = 0
+                    counts[source_type] = counts.get(source_type, 0) + written
+                requested, _active_runs[user_id] = _active_runs[user_id], set()
+        finally:
+            del _active_runs[user_id]
+
+        total = sum(counts.values())
+        if total:
+            logger.info(f"✅ Indexed {total} context chunks for user {user_id}: {counts}")
+        return counts
+
+    async def index_source(self, user_id: str, source_type: str) -> int:
+        """
+        Index rows of one source type changed since its watermark.
+
+        Args:
+            user_id: User ID
+            source_type: Key of CONTEXT_SOURCES
+
+        Returns:
+            Number of chunks written
+        """
+        source = CONTEXT_SOURCES[source_type]
+        cursor = source["cursor"]
+        watermark = await self._get_watermark(user_id, source_type)
+
+        written = 0
+        offset = 0
+        high_water = watermark
+
+        while True:
+            query = self.supabase.table(source["table"]).select(source["columns"]).eq(
+                "user_id", user_id
+            )
+            if source_type == "document":
+                query = query.eq("is_active", True)
+            # gte: rows sharing the watermark timestamp are re-checked, which
+            # is harmless because writes are idempotent upserts
+            if watermark:
+                query = query.gte(cursor, watermark)
+            query = query.order(cursor).order("id").range(offset, offset + self.page_size - 1)
+
+            result = await run_blocking(query.execute)
+            rows = result.data or []
+            if not rows:
+                break
+
+            written += await self.index_rows(user_id, source_type, rows)
+
+            last = rows[-1].get(cursor)
+            if last and (high_water is None or last > high_water):
+                high_water = last
+
+            if len(rows) < self.page_size:
+                break
+            offset += self.page_size
+
+        if high_water and high_water != watermark:
+            await self._set_watermark(user_id, source_type, high_water)
+
+        return written
+
+    async def index_rows(
+        self, user_id: str, source_type: str, rows: List[Dict[str, Any]]
+    ) -> int:
+        """
+        Chunk, embed and upsert a page of source rows.
+
+        New chunks are diffed against the stored ones: a chunk whose text is
+        unchanged at the same index is neither re-embedded nor rewritten, and
+        chunks beyond a row's new chunk count are deleted.
+
+        Args:
+            user_id: User ID
+            source_type: Key of CONTEXT_SOURCES
+            rows: Source rows with the columns listed in CONTEXT_SOURCES
+
+        Returns:
+            Number of chunks written
+        """
+        if not rows:
+            return 0
+
+        existing = await self._get_existing_chunks(source_type, [row["id"] for row in rows])
+
+        chunk_rows = []
+        stale_ids = []
+        changed_sources = set()
+
+        for row in rows:
+            chunks, metadata = self._chunk(source_type, row)
+            stored = existing.get(row["id"], {})
+            written_before = len(chunk_rows)
+
+            for index, chunk in enumerate(chunks):
+                current = stored.get(index)
+                if current and current["chunk_text"] == chunk:
+                    continue
+                chunk_rows.append({
+                    "user_id": user_id,
+                    "source_type": source_type,
+                    "source_id": row["id"],
+                    "chunk_index": index,
+                    "chunk_text": chunk,
+                    "metadata": metadata,
+                })
+
+            stale = [chunk["id"] for index, chunk in stored.items() if index >= len(chunks)]
+            stale_ids.extend(stale)
+            if stale or len(chunk_rows) > written_before:
+                changed_sources.add(row["id"])
+
+        if chunk_rows:
+            embeddings = await self.embedding_service.generate_embeddings_batch(
+                [c["chunk_text"] for c in chunk_rows]
+            )
+            for chunk_row, embedding in zip(chunk_rows, embeddings):
+                chunk_row["embedding"] = embedding
+
+            result = await run_blocking(
+                self.supabase.table("context_embeddings").upsert(
+                    chunk_rows, on_conflict="source_type,source_id,chunk_index"
+                ).execute
+            )
+            if settings.CONTEXT_VECTOR_INDEX_ENABLED:
+                from services.vector_index import get_vector_index
+                get_vector_index().upsert_chunks(user_id, result.data or [])
+
+        if stale_ids:
+            await run_blocking(
+                self.supabase.table("context_embeddings").delete().in_(
+                    "id", stale_ids
+                ).execute
+            )
+            if settings.CONTEXT_VECTOR_INDEX_ENABLED:
+                from services.vector_index import get_vector_index
+                get_vector_index().remove_chunks(user_id, stale_ids)
+
+        # Cached answers built from these rows are stale now
+        get_answer_cache().invalidate_sources(source_type, changed_sources, user_id)
+
+        return len(chunk_rows)
+
+    async def delete_sources(self, source_type: str, source_ids: List[str]):
+        """
+        Remove all chunks for the given source rows.
+
+        Args:
+            source_type: Key of CONTEXT_SOURCES
+            source_ids: IDs of the source rows
+        """
+        if not source_ids:
+            return
+        await run_blocking(
+            self.supabase.table("context_embeddings").delete().eq(
+                "source_type", source_type
+            ).in_("source_id", source_ids).execute
+        )
+        if settings.CONTEXT_VECTOR_INDEX_ENABLED:
+            from services.vector_index import get_vector_index
+            get_vector_index().remove_sources(source_type, source_ids)
+        get_answer_cache().invalidate_sources(source_type, source_ids)
+
+    async def _get_existing_chunks(
+        self, source_type: str, source_ids: List[str]
+    ) -> Dict[str, Dict[int, Dict[str, Any]]]:
+        """
+        Load stored chunks for a set of source rows.
+
+        Returns:
+            Mapping of source_id -> chunk_index -> {id, chunk_text}
+        """
+        result = await run_blocking(
+            self.supabase.table("context_embeddings").select(
+                "id, source_id, chunk_index, chunk_text"
+            ).eq("source_type", source_type).in_("source_id", source_ids).execute
+        )
+
+        existing: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        for chunk in result.data or []:
+            existing.setdefault(chunk["source_id"], {})[chunk["chunk_index"]] = chunk
+        return existing
+
+    def _chunk(self, source_type: str, row: Dict[str, Any]) -> Tuple[List[str], Dict[str, Any]]:
+        """
+        Split a source row into chunk texts.
+
+        Documents are chunked along paragraphs with content-defined
+        boundaries (so edits stay local) and every chunk is prefixed with
+        the title; other sources use overlapping token windows.
+
+        Args:
+            source_type: Key of CONTEXT_SOURCES
+            row: Source row
+
+        Returns:
+            Tuple of (chunk texts, chunk metadata)
+        """
+        text, metadata = self._render(source_type, row)
+        if source_type == "document":
+            title = row.get("title") or "Untitled"
+            chunks = [f"{title}\n{chunk}" for chunk in chunk_paragraphs(text, self.chunk_tokens)]
+            return chunks or [title], metadata
+        return chunk_text(text, self.chunk_tokens, self.overlap_tokens), metadata
+
+    def _render(self, source_type: str, row: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """
+        Render a source row as indexable text plus chunk metadata.
+
+        Args:
+            source_type: Key of CONTEXT_SOURCES
+            row: Source row
+
+        Returns:
+            Tuple of (text, metadata)
+        """
+        if source_type == "document":
+            text = row.get("content") or ""
+            metadata = {"title": row.get("title"), "doc_type": row.get("type"), "url": row.get("external_url")}
+
+        elif source_type == "slack_message":
+            author = row.get("user_name") or row.get("user_slack_id") or "unknown"
+            text = f"[#{row.get('channel_name') or row.get('channel_id')}] {author}: {row.get('text') or ''}"
+            metadata = {"channel": row.get("channel_name"), "thread_ts": row.get("thread_ts"), "message_at": row.get("message_at")}
+
+        elif source_type == "linear_issue":
+            status = f"[{row['state_name']}]" if row.get("state_name") else ""
+            completed = " (Completed)" if row.get("completed_at") else ""
+            project = f" in {row['project_name']}" if row.get("project_name") else ""
+            team = f" ({row['team_name']})" if row.get("team_name") else ""
+            text = f"Linear Issue {status}{completed}: {row.get('title')}{project}{team}\n{row.get('description') or ''}"
+            metadata = {
+                "title": row.get("title"),
+                "state_type": row.get("state_type"),
+                "priority": row.get("priority"),
+                "team": row.get("team_name"),
+                "url": row.get("linear_url"),
+            }
+
+        elif source_type == "email":
+            text = self.embedding_service.format_email_text(
+                subject=row.get("subject"),
+                body=row.get("body_text"),
+                from_email=row.get("from_email"),
+            )
+            metadata = {"subject": row.get("subject"), "from": row.get("from_name") or row.get("from_email"), "received_at": row.get("received_at")}
+
+        elif source_type == "calendar_event":
+            attendees = ", ".join(
+                a.get("name") or a.get("email") or "" for a in row.get("attendees") or []
+            )
+            text = (
+                f"Calendar event: {row.get('title') or '(No Title)'}\n"
+                f"When: {row.get('start_time')} - {row.get('end_time')}\n"
+                f"Location: {row.get('location') or 'N/A'}\n"
+                f"Attendees: {attendees or 'N/A'}\n\n"
+                f"{row.get('description') or ''}"
+            )
+            metadata = {"title": row.get("title"), "start_time": row.get("start_time")}
+
+        else:
+            raise ValueError(f"Unknown context source type: {source_type}")
+
+        return text, metadata
+
+    async def _get_watermark(self, user_id: str, source_type: str) -> Optional[str]:
+        """Get the last indexed cursor value for a user's source."""
+        result = await run_blocking(
+            self.supabase.table("context_index_state").select("last_indexed_at").eq(
+                "user_id", user_id
+            ).eq("source_type", source_type).execute
+        )
+        return result.data[0]["last_indexed_at"] if result.data else None
+
+    async def _set_watermark(self, user_id: str, source_type: str, value: str):
+        """Advance the indexed cursor value for a user's source."""
+        await run_blocking(
+            self.supabase.table("context_index_state").upsert({
+                "user_id": user_id,
+                "source_type": source_type,
+                "last_indexed_at": value,
+            }, on_conflict="user_id,source_type").execute
+        )
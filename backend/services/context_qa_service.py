@@ -1,25 +1,84 @@
 """Context Q&A service for RAG-powered business intelligence queries."""
 
+import asyncio
 import logging
-from datetime import datetime, timezone
-from typing import List, Dict, Any, Optional
-from openai import OpenAI
+import time
+import uuid
+from collections import deque
+from typing import List, Dict, Any, Optional, AsyncGenerator, Awaitable, Tuple, TypeVar
+from openai import AsyncOpenAI
 import json
 
 from config import settings
 from database.client import get_supabase_client
+from services.answer_cache import get_answer_cache
+from services.conversation_writer import get_conversation_writer
 from services.embedding_service import EmbeddingService
+from services.executor_service import run_blocking
 
 logger = logging.getLogger(__name__)
 
 
+class QALatencyStats:
+    """Rolling time-to-first-token and total latency for streamed answers."""
+
+    def __init__(self, window: int = 500):
+        self._ttft_ms: deque = deque(maxlen=window)
+        self._total_ms: deque = deque(maxlen=window)
+
+    def record(self, ttft_ms: float, total_ms: float):
+        self._ttft_ms.append(ttft_ms)
+        self._total_ms.append(total_ms)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get latency percentiles over the window.
+
+        Returns:
+            Dictionary of counters
+        """
+        return {
+            "streamed_answers": len(self._ttft_ms),
+            "ttft_p50_ms": self._percentile(self._ttft_ms, 50),
+            "ttft_p95_ms": self._percentile(self._ttft_ms, 95),
+            "total_p50_ms": self._percentile(self._total_ms, 50),
+            "total_p95_ms": self._percentile(self._total_ms, 95),
+        }
+
+    @staticmethod
+    def _percentile(samples, pct: int) -> Optional[float]:
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return round(ordered[min(len(ordered) - 1, len(ordered) * pct // 100)], 1)
+
+
+# Shared across ContextQAService instances (one per request)
+qa_latency = QALatencyStats()
+
+T = TypeVar("T")
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+async def _timed(timings: Dict[str, float], stage: str, awaitable: Awaitable[T]) -> T:
+    """Await and record how long the stage took, in ms."""
+    started = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        timings[stage] = _elapsed_ms(started)
+
+
 class ContextQAService:
     """Service for answering questions using business context via RAG."""
 
     def __init__(self):
         self.supabase = get_supabase_client()
         self.embedding_service = EmbeddingService()
-        self.openai = OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.openai = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
         self.model = settings.OPENAI_MODEL
 
     async def ask(
@@ -31,155 +90,318 @@ class ContextQAService:
         """
         Answer a question using the user's business context.
 
+        The question embedding and vector search run concurrently with the
+        conversation history read, and the conversation is stored in the
+        background after the answer is returned.
+
         Args:
             user_id: User ID
             question: The question to answer
             conversation_id: Optional conversation ID for context
 
         Returns:
-            Answer with sources and metadata
+            Answer with sources and metadata; debug.timings_ms holds
+            per-stage latencies (embedding, search, history, llm, total)
+            and debug.cache_hit whether the answer came from the answer cache
         """
-        # Generate embedding for the question
-        question_embedding = self.embedding_service.generate_embedding(question)
+        started = time.perf_counter()
+        timings: Dict[str, float] = {}
 
-        # Retrieve relevant context using vector similarity
-        relevant_context = await self._retrieve_context(user_id, question_embedding)
+        is_new = not conversation_id
+        if is_new:
+            conversation_id = str(uuid.uuid4())
 
-        # Get conversation history if continuing
-        history = []
-        if conversation_id:
-            history = self._get_conversation_history(conversation_id)
+        embedding, relevant_context, history = await self._gather_context(
+            user_id, question, None if is_new else conversation_id, timings
+        )
 
-        # Generate answer using LLM
-        answer, sources = await self._generate_answer(question, relevant_context, history)
+        # Follow-ups depend on the conversation, so only standalone
+        # questions go through the answer cache
+        answer_cache = get_answer_cache()
+        cached = None if history else answer_cache.lookup(user_id, embedding, relevant_context)
+        if cached:
+            answer, sources = cached["answer"], cached["sources"]
+        else:
+            # Generate answer using LLM
+            answer, sources = await _timed(
+                timings, "llm", self._generate_answer(question, relevant_context, history)
+            )
+            if not history:
+                answer_cache.store(user_id, question, embedding, relevant_context, answer, sources)
 
-        # Store in conversation
-        conv_id = self._store_conversation(user_id, conversation_id, question, answer, sources)
+        get_conversation_writer().submit(user_id, conversation_id, is_new, question, answer, sources)
+        timings["total"] = _elapsed_ms(started)
 
         return {
             "answer": answer,
             "sources": sources,
-            "conversation_id": conv_id,
+            "conversation_id": conversation_id,
             "context_used": len(relevant_context),
+            "debug": {"timings_ms": timings, "cache_hit": cached is not None},
         }
 
+    async def ask_stream(
+        self,
+        user_id: str,
+        question: str,
+        conversation_id: Optional[str] = None,
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Answer a question, streaming the answer as it is generated.
+
+        Yields events:
+        - sources: {sources, context_used}, sent before the LLM call
+        - token: {content}, answer text as it arrives
+        - done: {conversation_id, metrics}, once the answer is complete
+
+        metrics holds ttft_ms (request start to first answer token, the
+        headline latency), retrieval_ms, total_ms, timings_ms with
+        per-stage latencies and cache_hit. An answer served from the answer
+        cache arrives as a single token event. The conversation is stored
+        in the background.
+
+        Args:
+            user_id: User ID
+            question: The question to answer
+            conversation_id: Optional conversation ID for context
+        """
+        started = time.perf_counter()
+        timings: Dict[str, float] = {}
+
+        is_new = not conversation_id
+        if is_new:
+            conversation_id = str(uuid.uuid4())
+
+        embedding, relevant_context, history = await self._gather_context(
+            user_id, question, None if is_new else conversation_id, timings
+        )
+
+        answer_cache = get_answer_cache()
+        cached = None if history else answer_cache.lookup(user_id, embedding, relevant_context)
+        sources = cached["sources"] if cached else self._extract_sources(relevant_context)
+        retrieval_ms = _elapsed_ms(started)
+        yield {"type": "sources", "sources": sources, "context_used": len(relevant_context)}
+
+        ttft_ms = None
+        if cached:
+            answer = cached["answer"]
+            ttft_ms = _elapsed_ms(started)
+            yield {"type": "token", "content": answer}
+        else:
+            llm_started = time.perf_counter()
+            stream = await self.openai.chat.completions.create(
+                model=self.model,
+                messages=self._build_messages(question, relevant_context, history),
+                temperature=0.7,
+                max_tokens=1000,
+                stream=True,
+            )
+
+            parts: List[str] = []
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                content = chunk.choices[0].delta.content
+                if not content:
+                    continue
+                if ttft_ms is None:
+                    ttft_ms = _elapsed_ms(started)
+                parts.append(content)
+                yield {"type": "token", "content": content}
+            timings["llm"] = _elapsed_ms(llm_started)
+
+            answer = "".join(parts)
+            if not history:
+                answer_cache.store(user_id, question, embedding, relevant_context, answer, sources)
+        get_conversation_writer().submit(user_id, conversation_id, is_new, question, answer, sources)
+
+        total_ms = _elapsed_ms(started)
+        timings["total"] = total_ms
+        if ttft_ms is None:
+            ttft_ms = total_ms
+        qa_latency.record(ttft_ms, total_ms)
+        logger.info(f"⚡ Streamed answer for user {user_id}: TTFT {ttft_ms:.0f}ms, total {total_ms:.0f}ms")
+
+        yield {
+            "type": "done",
+            "conversation_id": conversation_id,
+            "metrics": {
+                "ttft_ms": ttft_ms,
+                "retrieval_ms": retrieval_ms,
+                "total_ms": total_ms,
+                "timings_ms": timings,
+                "cache_hit": cached is not None,
+            },
+        }
+
+    async def _gather_context(
+        self,
+        user_id: str,
+        question: str,
+        conversation_id: Optional[str],
+        timings: Dict[str, float],
+    ) -> Tuple[List[float], List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Run embedding + vector search alongside the history read."""
+        async def _search() -> Tuple[List[float], List[Dict[str, Any]]]:
+            embedding = await _timed(
+                timings, "embedding", self.embedding_service.generate_embedding(question)
+            )
+            context = await _timed(timings, "search", self._retrieve_context(user_id, embedding, question))
+            return embedding, context
+
+        async def _history() -> List[Dict[str, Any]]:
+            if not conversation_id:
+                return []
+            return await _timed(timings, "history", self._get_history(conversation_id))
+
+        (embedding, relevant_context), history = await asyncio.gather(_search(), _history())
+        return embedding, relevant_context, history
+
     async def _retrieve_context(
-        self, user_id: str, embedding: List[float], limit: int = 10
+        self, user_id: str, embedding: List[float], query: str, limit: int = 10
     ) -> List[Dict[str, Any]]:
-        """Retrieve relevant context using vector similarity search."""
-        context_items = []
+        """
+        Retrieve relevant context with hybrid lexical + vector search.
+
+        One match_context_hybrid call ranks chunks by full-text match and by
+        embedding similarity and merges the two lists with reciprocal-rank
+        fusion; similarity is None for chunks found only by text match.
+        With CONTEXT_VECTOR_INDEX_ENABLED, users whose chunks are loaded
+        in memory are answered in-process instead.
+        """
+        if settings.CONTEXT_VECTOR_INDEX_ENABLED:
+            from services.vector_index import get_vector_index
+            context_items = get_vector_index().search(user_id, embedding, query, limit)
+            if context_items is not None:
+                return context_items
 
-        # Search context embeddings using pgvector
-        # Note: This requires the match_context_embeddings function in Supabase
         try:
-            result = self.supabase.rpc(
-                "match_context_embeddings",
+            result = await run_blocking(self.supabase.rpc(
+                "match_context_hybrid",
                 {
                     "query_embedding": embedding,
+                    "query_text": query,
                     "match_user_id": user_id,
                     "match_count": limit,
-                    "match_threshold": 0.7,
+                    "candidate_count": max(limit, settings.CONTEXT_HYBRID_CANDIDATES),
+                    "rrf_k": settings.CONTEXT_RRF_K,
                 },
-            ).execute()
-
-            if result.data:
-                for item in result.data:
-                    context_items.append({
-                        "id": item.get("id"),
-                        "type": item.get("source_type"),
-                        "text": item.get("chunk_text"),
-                        "similarity": item.get("similarity"),
-                        "metadata": item.get("metadata"),
-                    })
+            ).execute)
         except Exception as e:
-            logger.warning(f"Vector search failed, falling back to text search: {e}")
-            # Fallback: get recent documents
-            context_items = await self._fallback_context_retrieval(user_id, limit)
+            logger.warning(f"Hybrid search failed, falling back to recent context: {e}")
+            return await self._fallback_context_retrieval(user_id, limit)
 
-        return context_items
+        return [
+            {
+                "id": item.get("id"),
+                "type": item.get("source_type"),
+                "source_id": item.get("source_id"),
+                "text": item.get("chunk_text"),
+                "similarity": item.get("similarity"),
+                "score": item.get("score"),
+                "metadata": item.get("metadata"),
+            }
+            for item in result.data or []
+        ]
 
     async def _fallback_context_retrieval(
         self, user_id: str, limit: int
     ) -> List[Dict[str, Any]]:
         """Fallback context retrieval without vector search."""
-        context_items = []
+        # The three sources are independent; query them concurrently
+        documents, issues, messages = await asyncio.gather(
+            self._fallback_documents(user_id, limit),
+            self._fallback_linear_issues(user_id, limit),
+            self._fallback_slack_messages(user_id, limit),
+        )
+        return documents + issues + messages
 
-        # Get recent documents
+    async def _fallback_documents(self, user_id: str, limit: int) -> List[Dict[str, Any]]:
+        """Get recent documents."""
         try:
-            docs = (
+            docs = await run_blocking(
                 self.supabase.table("context_documents")
                 .select("id, title, type, content")
                 .eq("user_id", user_id)
                 .eq("is_active", True)
                 .order("updated_at", desc=True)
                 .limit(limit)
-                .execute()
+                .execute
             )
-
-            for doc in docs.data or []:
-                context_items.append({
-                    "id": doc["id"],
-                    "type": "document",
-                    "text": f"{doc['title']}\n\n{doc['content'][:2000]}",
-                    "metadata": {"doc_type": doc["type"]},
-                })
         except Exception as e:
             logger.warning(f"Failed to fetch documents: {e}")
+            return []
 
-        # Get Linear issues
+        return [
+            {
+                "id": doc["id"],
+                "type": "document",
+                "text": f"{doc['title']}\n\n{doc['content'][:2000]}",
+                "metadata": {"doc_type": doc["type"]},
+            }
+            for doc in docs.data or []
+        ]
+
+    async def _fallback_linear_issues(self, user_id: str, limit: int) -> List[Dict[str, Any]]:
+        """Get recently updated Linear issues."""
         try:
-            issues = (
+            issues = await run_blocking(
                 self.supabase.table("linear_issues")
                 .select("id, title, description, state_name, state_type, priority, team_name, project_name, completed_at, updated_at_linear")
                 .eq("user_id", user_id)
                 .eq("is_archived", False)
                 .order("updated_at_linear", desc=True)
                 .limit(limit)
-                .execute()
+                .execute
             )
-
-            for issue in issues.data or []:
-                status = f"[{issue['state_name']}]" if issue.get('state_name') else ""
-                completed = " (Completed)" if issue.get('completed_at') else ""
-                project = f" in {issue['project_name']}" if issue.get('project_name') else ""
-                team = f" ({issue['team_name']})" if issue.get('team_name') else ""
-                desc = issue.get('description', '')[:500] if issue.get('description') else ""
-
-                context_items.append({
-                    "id": issue["id"],
-                    "type": "linear_issue",
-                    "text": f"Linear Issue {status}{completed}: {issue['title']}{project}{team}\n{desc}",
-                    "metadata": {
-                        "state_type": issue.get("state_type"),
-                        "priority": issue.get("priority"),
-                        "team": issue.get("team_name"),
-                    },
-                })
         except Exception as e:
             logger.warning(f"Failed to fetch Linear issues: {e}")
+            return []
 
-        # Get recent Slack messages
+        context_items = []
+        for issue in issues.data or []:
+            status = f"[{issue['state_name']}]" if issue.get('state_name') else ""
+            completed = " (Completed)" if issue.get('completed_at') else ""
+            project = f" in {issue['project_name']}" if issue.get('project_name') else ""
+            team = f" ({issue['team_name']})" if issue.get('team_name') else ""
+            desc = issue.get('description', '')[:500] if issue.get('description') else ""
+
+            context_items.append({
+                "id": issue["id"],
+                "type": "linear_issue",
+                "text": f"Linear Issue {status}{completed}: {issue['title']}{project}{team}\n{desc}",
+                "metadata": {
+                    "state_type": issue.get("state_type"),
+                    "priority": issue.get("priority"),
+                    "team": issue.get("team_name"),
+                },
+            })
+        return context_items
+
+    async def _fallback_slack_messages(self, user_id: str, limit: int) -> List[Dict[str, Any]]:
+        """Get recent Slack messages."""
         try:
-            messages = (
+            messages = await run_blocking(
                 self.supabase.table("slack_messages")
                 .select("id, channel_name, text, user_name, message_at")
                 .eq("user_id", user_id)
                 .order("message_at", desc=True)
                 .limit(limit)
-                .execute()
+                .execute
             )
-
-            for msg in messages.data or []:
-                context_items.append({
-                    "id": msg["id"],
-                    "type": "slack_message",
-                    "text": f"[{msg['channel_name']}] {msg['user_name']}: {msg['text']}",
-                    "metadata": {"channel": msg["channel_name"]},
-                })
         except Exception as e:
             logger.warning(f"Failed to fetch Slack messages: {e}")
+            return []
 
-        return context_items
+        return [
+            {
+                "id": msg["id"],
+                "type": "slack_message",
+                "text": f"[{msg['channel_name']}] {msg['user_name']}: {msg['text']}",
+                "metadata": {"channel": msg["channel_name"]},
+            }
+            for msg in messages.data or []
+        ]
 
     async def _generate_answer(
         self,
@@ -188,6 +410,24 @@ class ContextQAService:
         history: List[Dict[str, str]],
     ) -> tuple[str, List[Dict[str, Any]]]:
         """Generate answer using LLM with retrieved context."""
+        response = await self.openai.chat.completions.create(
+            model=self.model,
+            messages=self._build_messages(question, context, history),
+            temperature=0.7,
+            max_tokens=1000,
+        )
+
+        answer = response.choices[0].message.content
+
+        return answer, self._extract_sources(context)
+
+    def _build_messages(
+        self,
+        question: str,
+        context: List[Dict[str, Any]],
+        history: List[Dict[str, str]],
+    ) -> List[Dict[str, str]]:
+        """Build the chat messages for a question and its retrieved context."""
         # Build context string
         context_str = "\n\n---\n\n".join([
             f"[{item['type']}]: {item['text']}" for item in context
@@ -201,9 +441,9 @@ class ContextQAService:
             }
         ]
 
-        # Add history
+        # Add history (role/content only; stored messages also carry timestamps)
         for msg in history[-6:]:  # Last 3 exchanges
-            messages.append(msg)
+            messages.append({"role": msg["role"], "content": msg["content"]})
 
         # Add context and question
         messages.append({
@@ -218,24 +458,16 @@ QUESTION: {question}
 Provide a clear, actionable answer. If the context doesn't contain enough information, say so.""",
         })
 
-        # Generate response
-        response = self.openai.chat.completions.create(
-            model=self.model,
-            messages=messages,
-            temperature=0.7,
-            max_tokens=1000,
-        )
-
-        answer = response.choices[0].message.content
+        return messages
 
-        # Extract sources
-        sources = [
+    @staticmethod
+    def _extract_sources(context: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Top sources shown alongside the answer."""
+        return [
             {"id": item["id"], "type": item["type"], "preview": item["text"][:100]}
             for item in context[:5]
         ]
 
-        return answer, sources
-
     def _get_system_prompt(self) -> str:
         """Get the system prompt for the Q&A assistant."""
         return """You are Cosos, an AI business intelligence assistant. You help founders and CEOs understand their business context by answering questions based on their connected data sources (Slack, Notion, documents, etc.).
@@ -248,6 +480,21 @@ Your role is to:
 
 Keep responses concise but comprehensive. Use bullet points for clarity when appropriate."""
 
+    async def _get_history(self, conversation_id: str) -> List[Dict[str, Any]]:
+        """Stored history plus turns still queued in the conversation writer."""
+        # Snapshot pending turns first: a write landing during the read
+        # then shows up in the stored history instead of being missed
+        pending = get_conversation_writer().pending_messages(conversation_id)
+        history = await run_blocking(self._get_conversation_history, conversation_id)
+        if not pending:
+            return history
+
+        stored = {(m.get("role"), m.get("timestamp"), m.get("content")) for m in history}
+        return history + [
+            m for m in pending
+            if (m.get("role"), m.get("timestamp"), m.get("content")) not in stored
+        ]
+
     def _get_conversation_history(self, conversation_id: str) -> List[Dict[str, str]]:
         """Get conversation history."""
         result = (
@@ -261,45 +508,6 @@ Keep responses concise but comprehensive. Use bullet points for clarity when app
             return result.data[0].get("messages", [])
         return []
 
-    def _store_conversation(
-        self,
-        user_id: str,
-        conversation_id: Optional[str],
-        question: str,
-        answer: str,
-        sources: List[Dict],
-    ) -> str:
-        """Store conversation in database."""
-        now = datetime.now(timezone.utc).isoformat()
-
-        new_messages = [
-            {"role": "user", "content": question, "timestamp": now},
-            {"role": "assistant", "content": answer, "timestamp": now},
-        ]
-
-        if conversation_id:
-            # Update existing conversation
-            existing = self._get_conversation_history(conversation_id)
-            existing.extend(new_messages)
-
-            self.supabase.table("context_conversations").update({
-                "messages": existing,
-                "context_used": [s["id"] for s in sources],
-                "updated_at": now,
-            }).eq("id", conversation_id).execute()
-
-            return conversation_id
-        else:
-            # Create new conversation
-            result = self.supabase.table("context_conversations").insert({
-                "user_id": user_id,
-                "title": question[:100],
-                "messages": new_messages,
-                "context_used": [s["id"] for s in sources],
-            }).execute()
-
-            return result.data[0]["id"] if result.data else None
-
     def get_conversations(self, user_id: str, limit: int = 20) -> List[Dict[str, Any]]:
         """Get user's conversation history."""
         result = (
@@ -0,0 +1,183 @@
+"""Background writer for Q&A conversation turns."""
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set
+
+from database.client import get_supabase_client
+from services.executor_service import run_blocking
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationWriter:
+    """
+    Persists conversation turns off the request path.
+
+    submit() returns immediately; the write runs as a background task.
+    Writes to the same conversation are serialized so appends land in
+    order, and turns not yet written are exposed via pending_messages()
+    so a follow-up question asked before the write lands still sees them.
+    New conversations get their ID from the caller, so it can be returned
+    before the row exists.
+    """
+
+    def __init__(self):
+        self.supabase = get_supabase_client()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.submitted = 0
+        self.written = 0
+        self.failed = 0
+
+    def submit(
+        self,
+        user_id: str,
+        conversation_id: str,
+        is_new: bool,
+        question: str,
+        answer: str,
+        sources: List[Dict[str, Any]],
+    ):
+        """
+        Queue one question/answer turn for storage.
+
+        Args:
+            user_id: User ID
+            conversation_id: Conversation ID (generated by the caller if new)
+            is_new: Whether to create the conversation
+            question: The user's question
+            answer: The generated answer
+            sources: Sources shown with the answer
+        """
+        now = datetime.now(timezone.utc).isoformat()
+        messages = [
+            {"role": "user", "content": question, "timestamp": now},
+            {"role": "assistant", "content": answer, "timestamp": now},
+        ]
+
+        self.submitted += 1
+        self._pending.setdefault(conversation_id, []).extend(messages)
+        task = asyncio.create_task(
+            self._write(user_id, conversation_id, is_new, question, messages, sources)
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def pending_messages(self, conversation_id: str) -> List[Dict[str, Any]]:
+        """
+        Get turns submitted for a conversation but not yet written.
+
+        Args:
+            conversation_id: Conversation ID
+
+        Returns:
+            Messages in submission order
+        """
+        return list(self._pending.get(conversation_id, []))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get write counters.
+
+        Returns:
+            Dictionary of counters
+        """
+        return {
+            "submitted": self.submitted,
+            "written": self.written,
+            "failed": self.failed,
+            "in_flight": len(self._tasks),
+        }
+
+    async def close(self):
+        """Wait for outstanding writes."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        logger.info("✅ Conversation writer closed")
+
+    async def _write(
+        self,
+        user_id: str,
+        conversation_id: str,
+        is_new: bool,
+        question: str,
+        messages: List[Dict[str, Any]],
+        sources: List[Dict[str, Any]],
+    ):
+        """Store one turn, after any earlier writes to the same conversation."""
+        lock = self._locks.setdefault(conversation_id, asyncio.Lock())
+        try:
+            async with lock:
+                await run_blocking(
+                    self._store, user_id, conversation_id, is_new, question, messages, sources
+                )
+            self.written += 1
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"❌ Failed to store conversation {conversation_id}: {e}")
+        finally:
+            written = {id(message) for message in messages}
+            remaining = [m for m in self._pending.get(conversation_id, []) if id(m) not in written]
+            if remaining:
+                self._pending[conversation_id] = remaining
+            else:
+                # Nothing else queued for this conversation
+                self._pending.pop(conversation_id, None)
+                self._locks.pop(conversation_id, None)
+
+    def _store(
+        self,
+        user_id: str,
+        conversation_id: str,
+        is_new: bool,
+        question: str,
+        messages: List[Dict[str, Any]],
+        sources: List[Dict[str, Any]],
+    ):
+        """Insert or append to a conversation (blocking; run via run_blocking)."""
+        context_used = [s["id"] for s in sources]
+
+        if is_new:
+            self.supabase.table("context_conversations").insert({
+                "id": conversation_id,
+                "user_id": user_id,
+                "title": question[:100],
+                "messages": messages,
+                "context_used": context_used,
+            }).execute()
+            return
+
+        result = (
+            self.supabase.table("context_conversations")
+            .select("messages")
+            .eq("id", conversation_id)
+            .execute()
+        )
+        existing = result.data[0].get("messages", []) if result.data else []
+
+        self.supabase.table("context_conversations").update({
+            "messages": existing + messages,
+            "context_used": context_used,
+            "updated_at": messages[-1]["timestamp"],
+        }).eq("id", conversation_id).execute()
+
+
+# Global writer instance
+_conversation_writer: Optional[ConversationWriter] = None
+
+
+def get_conversation_writer() -> ConversationWriter:
+    """
+    Get the global conversation writer instance.
+
+    Returns:
+        ConversationWriter instance
+    """
+    global _conversation_writer
+    if _conversation_writer is None:
+        _conversation_writer = ConversationWriter()
+    return _conversation_writer
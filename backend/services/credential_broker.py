@@ -0,0 +1,233 @@
+"""In-process cache of integration credentials shared by all services."""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+
+from config import settings
+from database.client import get_supabase_client
+from services.executor_service import run_blocking
+
+logger = logging.getLogger(__name__)
+
+# Only credential columns are cached; sync state stored on the same row
+# (history IDs, high-water marks, last_sync_at) is always read fresh
+INTEGRATION_COLUMNS = (
+    "id, user_id, provider, access_token, refresh_token, token_expires_at, "
+    "scope, account_email, is_active"
+)
+
+GOOGLE_TOKEN_URI = "https://oauth2.googleapis.com/token"
+
+
+class CredentialBroker:
+    """
+    Single source of integration rows and Google credentials.
+
+    Active integration rows are cached per (user, provider) for
+    CREDENTIAL_CACHE_TTL_SECONDS, or until CREDENTIAL_REFRESH_SKEW_SECONDS
+    before the stored token expires, whichever is sooner; misses are cached
+    too. Google Credentials objects are kept alive and refreshed shortly
+    before expiry. Loads and refreshes for the same key are single-flight,
+    so concurrent Gmail and Calendar syncs for a user share one DB read and
+    at most one token refresh. Connect/disconnect paths call invalidate().
+    """
+
+    def __init__(self, ttl_seconds: float, refresh_skew_seconds: float):
+        self.supabase = get_supabase_client()
+        self.ttl = ttl_seconds
+        self.refresh_skew = timedelta(seconds=refresh_skew_seconds)
+
+        # (user_id, provider) -> (expires_at, row or None)
+        self._integrations: Dict[Tuple[str, str], Tuple[float, Optional[Dict[str, Any]]]] = {}
+        self._credentials: Dict[Tuple[str, str], Credentials] = {}
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    async def get_integration(self, user_id: str, provider: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a user's active integration row (credential columns only).
+
+        Args:
+            user_id: User ID
+            provider: Integration provider, e.g. "gmail", "slack"
+
+        Returns:
+            Integration row or None if not connected
+        """
+        key = (user_id, provider)
+        entry = self._integrations.get(key)
+        if entry and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+
+        async with self._lock(key):
+            # Another caller may have loaded it while we waited
+            entry = self._integrations.get(key)
+            if entry and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+
+            self.misses += 1
+            result = await run_blocking(
+                self.supabase.table("integrations")
+                .select(INTEGRATION_COLUMNS)
+                .eq("user_id", user_id)
+                .eq("provider", provider)
+                .eq("is_active", True)
+                .execute
+            )
+            integration = result.data[0] if result.data else None
+            self._remember(key, integration)
+            return integration
+
+    async def get_google_credentials(self, user_id: str) -> Optional[Credentials]:
+        """
+        Get live Google credentials for a user's Gmail/Calendar integration.
+
+        The token is refreshed (once, however many callers are waiting) if
+        it expires within CREDENTIAL_REFRESH_SKEW_SECONDS, and the new token
+        is written back to the integration.
+
+        Args:
+            user_id: User ID
+
+        Returns:
+            Google credentials or None if not connected
+        """
+        key = (user_id, "gmail")
+        credentials = self._credentials.get(key)
+        if credentials is not None and not self._expiring(credentials):
+            self.hits += 1
+            return credentials
+
+        integration = await self.get_integration(user_id, "gmail")
+        if not integration:
+            return None
+
+        async with self._lock(key):
+            credentials = self._credentials.get(key)
+            if credentials is None or credentials.token != integration["access_token"]:
+                credentials = Credentials(
+                    token=integration["access_token"],
+                    refresh_token=integration["refresh_token"],
+                    token_uri=GOOGLE_TOKEN_URI,
+                    client_id=settings.GOOGLE_CLIENT_ID,
+                    client_secret=settings.GOOGLE_CLIENT_SECRET,
+                    scopes=settings.GMAIL_SCOPES + settings.CALENDAR_SCOPES,
+                    expiry=self._naive_utc(integration.get("token_expires_at")),
+                )
+
+            if self._expiring(credentials):
+                logger.info(f"Refreshing Google token for user {user_id}")
+                await run_blocking(credentials.refresh, Request())
+                self.refreshes += 1
+
+                token_expires_at = (
+                    credentials.expiry.replace(tzinfo=timezone.utc).isoformat()
+                    if credentials.expiry else None
+                )
+                await run_blocking(
+                    self.supabase.table("integrations").update({
+                        "access_token": credentials.token,
+                        "token_expires_at": token_expires_at,
+                        "updated_at": datetime.now(timezone.utc).isoformat(),
+                    }).eq("id", integration["id"]).execute
+                )
+                self._remember(
+                    key,
+                    {**integration, "access_token": credentials.token, "token_expires_at": token_expires_at},
+                )
+
+            self._credentials[key] = credentials
+            return credentials
+
+    def invalidate(self, user_id: str, provider: Optional[str] = None):
+        """
+        Drop cached rows and credentials after a connect or disconnect.
+
+        Args:
+            user_id: User ID
+            provider: Provider to drop, or None for all of the user's
+        """
+        for cache in (self._integrations, self._credentials):
+            for key in [k for k in cache if k[0] == user_id and provider in (None, k[1])]:
+                del cache[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters.
+
+        Returns:
+            Dictionary of counters
+        """
+        lookups = self.hits + self.misses
+        return {
+            "cached_integrations": len(self._integrations),
+            "cached_credentials": len(self._credentials),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "refreshes": self.refreshes,
+        }
+
+    def _remember(self, key: Tuple[str, str], integration: Optional[Dict[str, Any]]):
+        """Cache a row until the TTL or shortly before its token expires."""
+        expires_at = time.monotonic() + self.ttl
+        token_expiry = self._naive_utc((integration or {}).get("token_expires_at"))
+        if token_expiry is not None:
+            remaining = (token_expiry - self.refresh_skew - datetime.utcnow()).total_seconds()
+            expires_at = min(expires_at, time.monotonic() + max(remaining, 0))
+        self._integrations[key] = (expires_at, integration)
+
+    def _expiring(self, credentials: Credentials) -> bool:
+        """Whether the token expires within the refresh skew."""
+        if not credentials.token:
+            return True
+        if credentials.expiry is None:
+            return False
+        return credentials.expiry - self.refresh_skew <= datetime.utcnow()
+
+    def _lock(self, key: Tuple[str, str]) -> asyncio.Lock:
+        return self._locks.setdefault(key, asyncio.Lock())
+
+    @staticmethod
+    def _naive_utc(value: Optional[str]) -> Optional[datetime]:
+        """Parse a timestamptz into the naive UTC datetime google-auth expects."""
+        if not value:
+            return None
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed
+
+
+# Global broker instance
+_credential_broker: Optional[CredentialBroker] = None
+
+
+def get_credential_broker() -> CredentialBroker:
+    """
+    Get the global credential broker instance.
+
+    Returns:
+        CredentialBroker instance
+    """
+    global _credential_broker
+    if _credential_broker is None:
+        _credential_broker = CredentialBroker(
+            ttl_seconds=settings.CREDENTIAL_CACHE_TTL_SECONDS,
+            refresh_skew_seconds=settings.CREDENTIAL_REFRESH_SKEW_SECONDS,
+        )
+    return _credential_broker
@@ -0,0 +1,112 @@
+"""Batched embedding backfill for synced emails."""
+
+import logging
+from typing import List, Dict, Any
+
+from config import settings
+from database.client import get_supabase_client
+from services.embedding_service import EmbeddingService
+from services.executor_service import run_blocking
+
+logger = logging.getLogger(__name__)
+
+# Only the columns needed to build the embedding text and write it back
+EMAIL_EMBEDDING_COLUMNS = "id, user_id, gmail_id, subject, body_text, from_email"
+
+
+class EmailEmbeddingService:
+    """
+    Fills in missing email embeddings.
+
+    Emails are read in keyset-paginated pages, embedded with one
+    generate_embeddings_batch call per page, and written back with a single
+    bulk upsert per page.
+    """
+
+    def __init__(self):
+        self.supabase = get_supabase_client()
+        self.embedding_service = EmbeddingService()
+        self.page_size = settings.EMBEDDING_BACKFILL_PAGE_SIZE
+
+    async def backfill_user(self, user_id: str) -> int:
+        """
+        Generate embeddings for all of a user's emails that don't have one.
+
+        Args:
+            user_id: User ID
+
+        Returns:
+            Number of emails embedded
+        """
+        total = 0
+        last_id = None
+
+        while True:
+            query = self.supabase.table("emails").select(EMAIL_EMBEDDING_COLUMNS).eq(
+                "user_id", user_id
+            ).is_("content_embedding", "null").order("id").limit(self.page_size)
+
+            # Keyset pagination so rows that fail to embed are not re-read forever
+            if last_id:
+                query = query.gt("id", last_id)
+
+            result = await run_blocking(query.execute)
+            emails = result.data or []
+
+            if not emails:
+                break
+
+            last_id = emails[-1]["id"]
+            total += await self._embed_page(emails)
+
+            if len(emails) < self.page_size:
+                break
+
+        if total:
+            logger.info(f"✅ Generated embeddings for {total} emails (user {user_id})")
+
+        return total
+
+    async def _embed_page(self, emails: List[Dict[str, Any]]) -> int:
+        """
+        Embed one page of emails and write the vectors back in bulk.
+
+        Args:
+            emails: Email rows (EMAIL_EMBEDDING_COLUMNS)
+
+        Returns:
+            Number of emails embedded
+        """
+        texts = [
+            self.embedding_service.format_email_text(
+                subject=email.get("subject"),
+                body=email.get("body_text"),
+                from_email=email.get("from_email"),
+            )
+            for email in emails
+        ]
+
+        try:
+            # One call; EmbeddingService splits it into request-sized batches
+            embeddings = await self.embedding_service.generate_embeddings_batch(texts)
+        except Exception as e:
+            logger.error(f"Error generating embeddings for {len(emails)} emails: {e}")
+            return 0
+
+        # user_id/gmail_id satisfy NOT NULL on the insert side of the upsert
+        rows = [
+            {
+                "id": email["id"],
+                "user_id": email["user_id"],
+                "gmail_id": email["gmail_id"],
+                "content_embedding": embedding,
+            }
+            for email, embedding in zip(emails, embeddings)
+        ]
+
+        if rows:
+            await run_blocking(
+                self.supabase.table("emails").upsert(rows, on_conflict="id").execute
+            )
+
+        return len(rows)
@@ -0,0 +1,198 @@
+"""Content-addressed cache for embedding vectors."""
+
+import asyncio
+import hashlib
+import json
+import logging
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set
+
+from config import settings
+from database.client import get_supabase_client
+from services.bulk_upsert import IN_FILTER_CHUNK
+from services.executor_service import run_blocking
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 of the exact text that would be sent to the embeddings API."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache keyed by (model, sha256(text)).
+
+    The first tier is an in-process LRU holding float32 arrays; the second is
+    the embedding_cache table, shared by every worker. Persistent-tier
+    failures (e.g. the migration hasn't been run) are logged and treated as
+    misses so embedding never fails because of the cache.
+    """
+
+    def __init__(self, max_entries: int, persistent: bool = True):
+        self.max_entries = max_entries
+        self.persistent = persistent
+        self._entries: "OrderedDict[tuple, array]" = OrderedDict()
+        self._pending_writes: Set[asyncio.Task] = set()
+
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    async def get_many(self, model: str, texts: List[str]) -> Dict[str, List[float]]:
+        """
+        Look up embeddings for texts.
+
+        Args:
+            model: Embedding model name
+            texts: Texts to look up (duplicates allowed)
+
+        Returns:
+            Mapping of text -> embedding for every text found in either tier
+        """
+        found: Dict[str, List[float]] = {}
+        missing: Dict[str, str] = {}  # hash -> text
+
+        for text in dict.fromkeys(texts):
+            key = (model, content_hash(text))
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                found[text] = vector.tolist()
+                self.memory_hits += 1
+            else:
+                missing[key[1]] = text
+
+        if missing and self.persistent:
+            for hash_, embedding in (await self._read_persistent(model, list(missing))).items():
+                text = missing.pop(hash_)
+                found[text] = embedding
+                self._remember((model, hash_), embedding)
+                self.persistent_hits += 1
+
+        self.misses += len(missing)
+        return found
+
+    async def get(self, model: str, text: str) -> Optional[List[float]]:
+        """Look up a single embedding."""
+        return (await self.get_many(model, [text])).get(text)
+
+    def put_many(self, model: str, texts: List[str], embeddings: List[List[float]]):
+        """
+        Store freshly generated embeddings.
+
+        The LRU is updated immediately; the persistent write runs in the
+        background so it never adds latency to the caller.
+
+        Args:
+            model: Embedding model name
+            texts: Texts that were embedded
+            embeddings: Embeddings aligned with texts
+        """
+        rows = []
+        for text, embedding in zip(texts, embeddings):
+            hash_ = content_hash(text)
+            self._remember((model, hash_), embedding)
+            rows.append({"model": model, "content_hash": hash_, "embedding": embedding})
+
+        if rows and self.persistent:
+            task = asyncio.create_task(self._write_persistent(rows))
+            self._pending_writes.add(task)
+            task.add_done_callback(self._pending_writes.discard)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache hit/miss counters.
+
+        Returns:
+            Dictionary of counters; hits are embedding API inputs saved
+        """
+        hits = self.memory_hits + self.persistent_hits
+        lookups = hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+    def _remember(self, key: tuple, embedding: List[float]):
+        """Insert into the LRU, evicting the least recently used entry."""
+        self._entries[key] = array("f", embedding)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _read_persistent(self, model: str, hashes: List[str]) -> Dict[str, List[float]]:
+        """Fetch embeddings by hash from the embedding_cache table."""
+        # One in_ filter per IN_FILTER_CHUNK hashes keeps each request URL
+        # within PostgREST limits on large backfills
+        chunks = await asyncio.gather(*(
+            self._read_persistent_chunk(model, hashes[i:i + IN_FILTER_CHUNK])
+            for i in range(0, len(hashes), IN_FILTER_CHUNK)
+        ))
+
+        found = {}
+        for chunk in chunks:
+            found.update(chunk)
+        return found
+
+    async def _read_persistent_chunk(self, model: str, hashes: List[str]) -> Dict[str, List[float]]:
+        """Fetch one in_ filter's worth of hashes; failures count as misses."""
+        try:
+            supabase = get_supabase_client()
+            result = await run_blocking(
+                supabase.table("embedding_cache")
+                .select("content_hash, embedding")
+                .eq("model", model)
+                .in_("content_hash", hashes)
+                .execute
+            )
+        except Exception as e:
+            logger.warning(f"Embedding cache read failed: {e}")
+            return {}
+
+        found = {}
+        for row in result.data or []:
+            embedding = row["embedding"]
+            # pgvector columns come back from PostgREST as "[0.1,0.2,...]"
+            if isinstance(embedding, str):
+                embedding = json.loads(embedding)
+            found[row["content_hash"]] = embedding
+        return found
+
+    async def _write_persistent(self, rows: List[Dict[str, Any]]):
+        """Upsert embeddings into the embedding_cache table."""
+        try:
+            supabase = get_supabase_client()
+            await run_blocking(
+                supabase.table("embedding_cache").upsert(
+                    rows, on_conflict="model,content_hash", ignore_duplicates=True
+                ).execute
+            )
+        except Exception as e:
+            logger.warning(f"Embedding cache write failed: {e}")
+
+
+# Global cache instance
+_embedding_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """
+    Get the global embedding cache instance.
+
+    Returns:
+        EmbeddingCache instance
+    """
+    global _embedding_cache
+    if _embedding_cache is None:
+        _embedding_cache = EmbeddingCache(
+            max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+            persistent=settings.EMBEDDING_CACHE_PERSISTENT,
+        )
+    return _embedding_cache
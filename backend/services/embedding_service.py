@@ -1,22 +1,171 @@
 """Embedding service for generating vector embeddings using OpenAI."""
 
+import asyncio
+import hashlib
 import logging
-from typing import List, Optional
-from openai import OpenAI
+from typing import Dict, List, Optional, Tuple
+from openai import AsyncOpenAI
 
 from config import settings
+from services.embedding_cache import get_embedding_cache
 
 logger = logging.getLogger(__name__)
 
+EMBEDDING_DIMENSIONS = 1536  # ada-002 / text-embedding-3-small
+MAX_INPUT_TOKENS = 8191  # Per-input limit of the embeddings API
+
+# Lazily loaded tiktoken encoding; False means unavailable (use heuristic)
+_encoding = None
+
+
+def _get_encoding():
+    """Load the cl100k_base tokenizer once, or return None if unavailable."""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            logger.warning(f"tiktoken unavailable, estimating tokens from length: {e}")
+            _encoding = False
+    return _encoding or None
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a text without calling the API.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Token count (exact with tiktoken, ~4 chars/token otherwise)
+    """
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def chunk_text(text: str, max_tokens: int, overlap_tokens: int = 0) -> List[str]:
+    """
+    Split text into chunks of at most max_tokens tokens.
+
+    Consecutive chunks share overlap_tokens tokens so that a sentence cut at
+    a boundary is still fully contained in one of them.
+
+    Args:
+        text: Text to split
+        max_tokens: Maximum tokens per chunk
+        overlap_tokens: Tokens repeated at the start of the next chunk
+
+    Returns:
+        List of chunk texts (empty for blank input)
+    """
+    if not text or not text.strip():
+        return []
+
+    step = max(max_tokens - overlap_tokens, 1)
+    encoding = _get_encoding()
+
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return [text]
+        return [
+            encoding.decode(tokens[start:start + max_tokens])
+            for start in range(0, len(tokens) - overlap_tokens, step)
+        ]
+
+    # Heuristic fallback: ~4 chars per token, break on whitespace when possible
+    max_chars, step_chars = max_tokens * 4, step * 4
+    if len(text) <= max_chars:
+        return [text]
+
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + max_chars, len(text))
+        if end < len(text):
+            space = text.rfind(" ", start + step_chars, end)
+            if space != -1:
+                end = space
+        chunks.append(text[start:end])
+        if end >= len(text):
+            break
+        next_start = max(end - (max_chars - step_chars), start + 1)
+        space = text.find(" ", next_start, end)
+        start = space + 1 if space != -1 else next_start
+    return chunks
+
+
+def chunk_paragraphs(text: str, max_tokens: int) -> List[str]:
+    """
+    Split text into chunks along line boundaries.
+
+    Chunk boundaries are content-defined: besides the size limit, a chunk is
+    closed after any line whose hash matches a fixed pattern. An edit to one
+    paragraph therefore only changes the chunk(s) around it instead of
+    shifting every later boundary, so unchanged chunks keep identical text
+    and need no re-embedding.
+
+    Args:
+        text: Text to split (typically a rendered document)
+        max_tokens: Maximum tokens per chunk
+
+    Returns:
+        List of chunk texts (empty for blank input)
+    """
+    if not text or not text.strip():
+        return []
+
+    min_tokens = max_tokens // 4
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+
+    def close():
+        nonlocal current, current_tokens
+        if current:
+            chunks.append("\n".join(current))
+        current, current_tokens = [], 0
+
+    for line in text.split("\n"):
+        if not line.strip():
+            continue
+
+        line_tokens = estimate_tokens(line)
+        if line_tokens > max_tokens:
+            # An oversized paragraph becomes its own run of chunks
+            close()
+            chunks.extend(chunk_text(line, max_tokens))
+            continue
+
+        if current_tokens + line_tokens > max_tokens:
+            close()
+        current.append(line)
+        current_tokens += line_tokens
+
+        boundary = int(hashlib.sha1(line.encode("utf-8")).hexdigest()[:8], 16) % 4 == 0
+        if boundary and current_tokens >= min_tokens:
+            close()
+
+    close()
+    return chunks
+
 
 class EmbeddingService:
     """Service for generating embeddings using OpenAI."""
     
     def __init__(self):
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
         self.model = settings.OPENAI_EMBEDDING_MODEL
+        self.max_batch_tokens = settings.EMBEDDING_BATCH_MAX_TOKENS
+        self.max_batch_inputs = settings.EMBEDDING_BATCH_MAX_INPUTS
+        self.batch_concurrency = settings.EMBEDDING_BATCH_CONCURRENCY
+        self.cache = get_embedding_cache()
     
-    def generate_embedding(self, text: str) -> List[float]:
+    async def generate_embedding(self, text: str) -> List[float]:
         """
         Generate embedding for a single text.
         
@@ -28,10 +177,14 @@ class EmbeddingService:
         """
         if not text or not text.strip():
             logger.warning("Empty text provided for embedding")
-            return [0.0] * 1536  # Return zero vector
+            return [0.0] * EMBEDDING_DIMENSIONS  # Return zero vector
+        
+        cached = await self.cache.get(self.model, text)
+        if cached is not None:
+            return cached
         
         try:
-            response = self.client.embeddings.create(
+            response = await self.client.embeddings.create(
                 model=self.model,
                 input=text
             )
@@ -39,48 +192,132 @@ class EmbeddingService:
             embedding = response.data[0].embedding
             logger.debug(f"Generated embedding for text (length: {len(text)})")
             
+            self.cache.put_many(self.model, [text], [embedding])
             return embedding
             
         except Exception as e:
             logger.error(f"Error generating embedding: {e}")
             raise
     
-    def generate_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
+    async def generate_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
         """
         Generate embeddings for multiple texts in batch.
+
+        The result is aligned with the input: result[i] is the embedding of
+        texts[i], and empty texts get a zero vector. Cached texts are served
+        from the embedding cache and duplicates are embedded once. The rest
+        are split into sub-batches by token budget and the sub-batches run
+        concurrently (at most EMBEDDING_BATCH_CONCURRENCY requests in flight).
         
         Args:
             texts: List of texts to embed
             
         Returns:
-            List of embedding vectors
+            List of embedding vectors, one per input text
         """
         if not texts:
             return []
+
+        embeddings: List[Optional[List[float]]] = [
+            None if t and t.strip() else [0.0] * EMBEDDING_DIMENSIONS
+            for t in texts
+        ]
+        valid_indices = [i for i, e in enumerate(embeddings) if e is None]
         
-        # Filter out empty texts
-        valid_texts = [t for t in texts if t and t.strip()]
-        
-        if not valid_texts:
+        if not valid_indices:
             logger.warning("No valid texts provided for batch embedding")
-            return [[0.0] * 1536] * len(texts)
+            return embeddings
         
-        try:
-            response = self.client.embeddings.create(
-                model=self.model,
-                input=valid_texts
-            )
-            
-            embeddings = [item.embedding for item in response.data]
-            logger.info(f"Generated {len(embeddings)} embeddings in batch")
-            
+        # Serve what we can from the cache; embed each distinct miss once
+        cached = await self.cache.get_many(self.model, [texts[i] for i in valid_indices])
+        pending: Dict[str, List[int]] = {}
+        for i in valid_indices:
+            if texts[i] in cached:
+                embeddings[i] = cached[texts[i]]
+            else:
+                pending.setdefault(texts[i], []).append(i)
+
+        if not pending:
             return embeddings
-            
+
+        miss_texts = list(pending)
+        request_texts = list(miss_texts)  # _pack_batches may truncate in place
+        miss_embeddings: List[Optional[List[float]]] = [None] * len(miss_texts)
+        batches = self._pack_batches(request_texts)
+        semaphore = asyncio.Semaphore(self.batch_concurrency)
+
+        async def embed_range(start: int, end: int):
+            async with semaphore:
+                response = await self.client.embeddings.create(
+                    model=self.model,
+                    input=request_texts[start:end]
+                )
+            # The API reports each vector's input position explicitly
+            for item in response.data:
+                miss_embeddings[start + item.index] = item.embedding
+
+        try:
+            await asyncio.gather(*(embed_range(start, end) for start, end in batches))
         except Exception as e:
             logger.error(f"Error generating batch embeddings: {e}")
             raise
+
+        for text, embedding in zip(miss_texts, miss_embeddings):
+            for i in pending[text]:
+                embeddings[i] = embedding
+        self.cache.put_many(self.model, miss_texts, miss_embeddings)
+
+        logger.info(
+            f"Generated {len(miss_texts)} embeddings in {len(batches)} batch request(s) "
+            f"({len(valid_indices) - sum(len(v) for v in pending.values())} served from cache)"
+        )
+        
+        return embeddings
+
+    def _pack_batches(self, texts: List[str]) -> List[Tuple[int, int]]:
+        """
+        Split texts into contiguous ranges that fit one embeddings request.
+
+        Texts longer than the per-input limit are truncated in place.
+
+        Args:
+            texts: Non-empty texts to embed
+
+        Returns:
+            List of (start, end) index ranges
+        """
+        batches = []
+        start = 0
+        batch_tokens = 0
+
+        for i, text in enumerate(texts):
+            tokens = estimate_tokens(text)
+            if tokens > MAX_INPUT_TOKENS:
+                texts[i] = self._truncate_to_tokens(text, MAX_INPUT_TOKENS)
+                tokens = MAX_INPUT_TOKENS
+
+            if i > start and (
+                batch_tokens + tokens > self.max_batch_tokens
+                or i - start >= self.max_batch_inputs
+            ):
+                batches.append((start, i))
+                start = i
+                batch_tokens = 0
+            batch_tokens += tokens
+
+        if start < len(texts):
+            batches.append((start, len(texts)))
+
+        return batches
+
+    def _truncate_to_tokens(self, text: str, max_tokens: int) -> str:
+        """Truncate text to at most max_tokens tokens."""
+        encoding = _get_encoding()
+        if encoding is not None:
+            return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+        return text[:max_tokens * 4]
     
-    def embed_email(self, subject: str, body: str, from_email: str = "") -> List[float]:
+    async def embed_email(self, subject: str, body: str, from_email: str = "") -> List[float]:
         """
         Generate embedding for an email.
         Combines subject, body, and sender for context.
@@ -93,18 +330,34 @@ class EmbeddingService:
         Returns:
             Embedding vector
         """
+        text = self.format_email_text(subject, body, from_email)
+        return await self.generate_embedding(text)
+
+    @staticmethod
+    def format_email_text(subject: str, body: str, from_email: str = "") -> str:
+        """
+        Build the text that represents an email in embedding space.
+
+        Args:
+            subject: Email subject
+            body: Email body
+            from_email: Sender email
+
+        Returns:
+            Combined text, truncated to fit the model's input limit
+        """
         # Combine email components
-        text = f"From: {from_email}\nSubject: {subject}\n\n{body}"
+        text = f"From: {from_email or ''}\nSubject: {subject or ''}\n\n{body or ''}"
         
         # Truncate if too long (max ~8000 tokens for ada-002)
         max_chars = 30000  # Rough estimate
         if len(text) > max_chars:
-            text = text[:max_chars] + "..."
             logger.debug(f"Truncated email text from {len(text)} to {max_chars} chars")
+            text = text[:max_chars] + "..."
         
-        return self.generate_embedding(text)
+        return text
     
-    def embed_user_context(self, context_dict: dict) -> List[float]:
+    async def embed_user_context(self, context_dict: dict) -> List[float]:
         """
         Generate embedding for user context.
         
@@ -149,7 +402,7 @@ class EmbeddingService:
         
         if not text:
             logger.warning("Empty user context provided for embedding")
-            return [0.0] * 1536
+            return [0.0] * EMBEDDING_DIMENSIONS
         
-        return self.generate_embedding(text)
+        return await self.generate_embedding(text)
 
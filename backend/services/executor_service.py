@@ -0,0 +1,135 @@
+"""Shared thread pool for running blocking I/O off the event loop."""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ExecutorService:
+    """
+    Sized thread pool for blocking SDK calls (supabase-py, googleapiclient,
+    requests, Google auth refresh).
+
+    Tracks how many calls are waiting for a worker and how long they waited,
+    so pool saturation shows up in metrics instead of as tail latency.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="cosos-io"
+        )
+
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._total_wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Run a blocking callable in the pool and await its result.
+
+        Args:
+            func: Blocking callable
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            Whatever func returns (exceptions are re-raised in the caller)
+        """
+        loop = asyncio.get_running_loop()
+        submitted_at = time.perf_counter()
+        # Set under the lock by whichever of _call and the cancellation
+        # path gets there first; only that one leaves the queue count
+        dequeued = [False]
+
+        with self._lock:
+            self._queued += 1
+
+        def _call() -> T:
+            wait = time.perf_counter() - submitted_at
+            with self._lock:
+                if not dequeued[0]:
+                    dequeued[0] = True
+                    self._queued -= 1
+                self._running += 1
+                self._total_wait_seconds += wait
+                self._max_wait_seconds = max(self._max_wait_seconds, wait)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+
+        try:
+            return await loop.run_in_executor(self.executor, _call)
+        except asyncio.CancelledError:
+            # A call cancelled before a worker picked it up never runs _call
+            with self._lock:
+                if not dequeued[0]:
+                    dequeued[0] = True
+                    self._queued -= 1
+            raise
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get pool utilisation metrics.
+
+        Returns:
+            Dictionary with queue depth, in-flight calls and wait times
+        """
+        with self._lock:
+            started = self._completed + self._running
+            return {
+                "max_workers": self.max_workers,
+                "queue_depth": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "avg_wait_ms": (self._total_wait_seconds / started * 1000) if started else 0.0,
+                "max_wait_ms": self._max_wait_seconds * 1000,
+            }
+
+    def shutdown(self):
+        """Stop accepting work and release worker threads."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        logger.info("✅ Executor shutdown complete")
+
+
+# Global executor instance
+_executor: Optional[ExecutorService] = None
+
+
+def get_executor() -> ExecutorService:
+    """
+    Get the global executor instance.
+
+    Returns:
+        ExecutorService instance
+    """
+    global _executor
+    if _executor is None:
+        _executor = ExecutorService(max_workers=settings.EXECUTOR_MAX_WORKERS)
+    return _executor
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run a blocking call on the shared executor.
+
+    Typical use is offloading a supabase-py query:
+        result = await run_blocking(supabase.table("emails").select("id").execute)
+    """
+    return await get_executor().run(func, *args, **kwargs)
@@ -1,23 +1,30 @@
 """Gmail service for OAuth and email syncing."""
 
+import asyncio
 import logging
 import base64
 from datetime import datetime, timedelta, timezone
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from uuid import UUID
 
-from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
 from config import settings
 from database.client import get_supabase_client
 from models.email import EmailCreate
 from models.integration import IntegrationCreate
+from services.bulk_upsert import bulk_upsert
+from services.credential_broker import get_credential_broker
+from services.executor_service import run_blocking
+from services.google_client_factory import get_google_client_factory
 
 logger = logging.getLogger(__name__)
 
+# Messages with any of these labels are not synced. Search queries exclude
+# spam and trash by default, but history.list reports every added message.
+EXCLUDED_LABELS = frozenset({"SPAM", "TRASH", "DRAFT"})
+
 
 class GmailService:
     """Service for Gmail OAuth and email syncing."""
@@ -91,13 +98,13 @@ class GmailService:
         )
 
         flow.redirect_uri = settings.GOOGLE_REDIRECT_URI
-        flow.fetch_token(code=code)
+        await run_blocking(flow.fetch_token, code=code)
         
         credentials = flow.credentials
         
         # Get user's email from Gmail API
-        service = build('gmail', 'v1', credentials=credentials)
-        profile = service.users().getProfile(userId='me').execute()
+        service = await run_blocking(get_google_client_factory().build, 'gmail', credentials)
+        profile = await run_blocking(service.users().getProfile(userId='me').execute)
         email_address = profile.get('emailAddress')
         
         # Calculate token expiry
@@ -121,63 +128,17 @@ class GmailService:
         }
         
         # Upsert integration (update if exists, insert if not)
-        result = self.supabase.table("integrations").upsert(
+        result = await run_blocking(self.supabase.table("integrations").upsert(
             integration_data,
             on_conflict="user_id,provider"
-        ).execute()
+        ).execute)
+        get_credential_broker().invalidate(user_id, "gmail")
+        get_google_client_factory().invalidate(user_id)
         
         logger.info(f"Gmail integration created for user {user_id}")
         
         return result.data[0] if result.data else integration_data
     
-    def _get_credentials(self, user_id: str) -> Optional[Credentials]:
-        """
-        Get Gmail credentials for a user.
-        
-        Args:
-            user_id: User ID
-            
-        Returns:
-            Google credentials or None
-        """
-        # Fetch integration from database
-        result = self.supabase.table("integrations").select("*").eq(
-            "user_id", user_id
-        ).eq("provider", "gmail").eq("is_active", True).execute()
-        
-        if not result.data:
-            logger.warning(f"No Gmail integration found for user {user_id}")
-            return None
-        
-        integration = result.data[0]
-        
-        # Create credentials object
-        credentials = Credentials(
-            token=integration["access_token"],
-            refresh_token=integration["refresh_token"],
-            token_uri="https://oauth2.googleapis.com/token",
-            client_id=settings.GOOGLE_CLIENT_ID,
-            client_secret=settings.GOOGLE_CLIENT_SECRET,
-            scopes=self.scopes,
-        )
-        
-        # Check if token needs refresh
-        if integration.get("token_expires_at"):
-            expiry = datetime.fromisoformat(integration["token_expires_at"])
-            now = datetime.now(timezone.utc)
-            if expiry <= now:
-                logger.info(f"Refreshing token for user {user_id}")
-                credentials.refresh(None)
-
-                # Update token in database
-                self.supabase.table("integrations").update({
-                    "access_token": credentials.token,
-                    "token_expires_at": credentials.expiry.isoformat() if credentials.expiry else None,
-                    "updated_at": now.isoformat(),
-                }).eq("id", integration["id"]).execute()
-        
-        return credentials
-    
     async def sync_emails(
         self, 
         user_id: str, 
@@ -186,77 +147,245 @@ class GmailService:
     ) -> List[Dict[str, Any]]:
         """
         Sync emails from Gmail for a user.
+
+        Once a sync has completed, the mailbox historyId is stored on the
+        integration and later syncs fetch only messages added since then via
+        users.history.list. The first sync (or one whose historyId has
+        expired) lists every message from the last days_back days, following
+        nextPageToken. New messages are fetched with batched HTTP requests and
+        inserted with one bulk upsert.
         
         Args:
             user_id: User ID
-            days_back: Number of days to sync back
-            max_results: Maximum number of emails to fetch
+            days_back: Number of days to sync back (full sync only)
+            max_results: Page size for message listing (full sync only)
             
         Returns:
             List of synced email data
         """
-        credentials = self._get_credentials(user_id)
+        credentials = await get_credential_broker().get_google_credentials(user_id)
         if not credentials:
             raise ValueError(f"No Gmail credentials found for user {user_id}")
         
-        service = build('gmail', 'v1', credentials=credentials)
-
-        # Calculate date filter
-        after_date = datetime.now(timezone.utc) - timedelta(days=days_back)
-        query = f"after:{int(after_date.timestamp())}"
+        async with get_google_client_factory().lease(user_id, 'gmail', credentials) as service:
+            try:
+                state = await run_blocking(self.supabase.table("integrations").select(
+                    "gmail_history_id"
+                ).eq("user_id", user_id).eq("provider", "gmail").execute)
+                history_id = state.data[0].get("gmail_history_id") if state.data else None
+            
+                message_ids = None
+                if history_id:
+                    try:
+                        message_ids, new_history_id = await self._list_history_message_ids(
+                            service, history_id
+                        )
+                    except HttpError as error:
+                        if error.resp.status != 404:
+                            raise
+                        # historyId too old (Gmail keeps about a week); start over
+                        logger.info(f"Gmail history expired for user {user_id}, running full sync")
+            
+                if message_ids is None:
+                    # Read historyId first so nothing arriving during the listing is lost
+                    profile = await run_blocking(service.users().getProfile(userId='me').execute)
+                    new_history_id = profile.get('historyId')
+                
+                    after_date = datetime.now(timezone.utc) - timedelta(days=days_back)
+                    message_ids = await self._list_message_ids(
+                        service, f"after:{int(after_date.timestamp())}", max_results
+                    )
+            
+                logger.info(f"Found {len(message_ids)} emails for user {user_id}")
+            
+                new_ids = await self._filter_new_message_ids(user_id, message_ids)
+                messages, failed_ids = await self._batch_get_messages(service, new_ids)
+            
+                email_rows = []
+                for message in messages:
+                    if EXCLUDED_LABELS.intersection(message.get('labelIds', [])):
+                        continue
+                    try:
+                        email_rows.append(self._parse_email(message, user_id))
+                    except Exception as e:
+                        logger.warning(f"Could not parse Gmail message {message.get('id')}: {e}")
+            
+                synced_emails = await bulk_upsert("emails", email_rows, ("user_id", "gmail_id"))
+            
+                # Update last sync time and incremental sync position. If any
+                # message couldn't be fetched, keep the old historyId so the
+                # next sync lists (and retries) it again
+                if failed_ids:
+                    logger.warning(
+                        f"⚠️  {len(failed_ids)} Gmail messages could not be fetched for user {user_id}, "
+                        f"not advancing history"
+                    )
+                    new_history_id = None
+                await run_blocking(self.supabase.table("integrations").update({
+                    "last_sync_at": datetime.now(timezone.utc).isoformat(),
+                    "gmail_history_id": str(new_history_id) if new_history_id else history_id,
+                }).eq("user_id", user_id).eq("provider", "gmail").execute)
+            
+                logger.info(f"Synced {len(synced_emails)} new emails for user {user_id}")
+            
+                return synced_emails
+            
+            except HttpError as error:
+                logger.error(f"Gmail API error: {error}")
+                raise
+    
+    async def _list_message_ids(self, service, query: str, page_size: int) -> List[str]:
+        """
+        List all message IDs matching a search query.
         
-        try:
-            # List messages
-            results = service.users().messages().list(
+        Args:
+            service: Gmail API service
+            query: Gmail search query
+            page_size: Messages per list page
+            
+        Returns:
+            Message IDs, newest first
+        """
+        message_ids = []
+        page_token = None
+        
+        while True:
+            results = await run_blocking(service.users().messages().list(
                 userId='me',
                 q=query,
-                maxResults=max_results
-            ).execute()
+                maxResults=page_size,
+                pageToken=page_token
+            ).execute)
             
-            messages = results.get('messages', [])
-            logger.info(f"Found {len(messages)} emails for user {user_id}")
+            message_ids.extend(msg['id'] for msg in results.get('messages', []))
             
-            synced_emails = []
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                return message_ids
+    
+    async def _list_history_message_ids(self, service, start_history_id: str):
+        """
+        List IDs of messages added since a mailbox historyId.
+
+        Spam, trashed and draft messages (EXCLUDED_LABELS) are skipped.
+        
+        Args:
+            service: Gmail API service
+            start_history_id: historyId stored by the previous sync
             
-            for msg in messages:
-                # Get full message details
-                message = service.users().messages().get(
-                    userId='me',
-                    id=msg['id'],
-                    format='full'
-                ).execute()
-                
-                # Parse email data
-                email_data = self._parse_email(message, user_id)
-                
-                # Check if email already exists
-                existing = self.supabase.table("emails").select("id").eq(
-                    "gmail_id", email_data["gmail_id"]
-                ).execute()
-                
-                if existing.data:
-                    logger.debug(f"Email {email_data['gmail_id']} already exists, skipping")
-                    continue
-                
-                # Insert email into database
-                result = self.supabase.table("emails").insert(email_data).execute()
-                
-                if result.data:
-                    synced_emails.append(result.data[0])
-                    logger.debug(f"Synced email: {email_data['subject']}")
+        Returns:
+            Tuple of (message IDs, latest historyId)
+            
+        Raises:
+            HttpError: 404 if start_history_id is too old
+        """
+        message_ids: Dict[str, None] = {}
+        latest_history_id = start_history_id
+        page_token = None
+        
+        while True:
+            results = await run_blocking(service.users().history().list(
+                userId='me',
+                startHistoryId=start_history_id,
+                historyTypes=['messageAdded'],
+                pageToken=page_token
+            ).execute)
             
-            # Update last sync time
-            self.supabase.table("integrations").update({
-                "last_sync_at": datetime.now(timezone.utc).isoformat()
-            }).eq("user_id", user_id).eq("provider", "gmail").execute()
+            for record in results.get('history', []):
+                for added in record.get('messagesAdded', []):
+                    if EXCLUDED_LABELS.intersection(added['message'].get('labelIds', [])):
+                        continue
+                    message_ids[added['message']['id']] = None
             
-            logger.info(f"Synced {len(synced_emails)} new emails for user {user_id}")
+            latest_history_id = results.get('historyId', latest_history_id)
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                return list(message_ids), latest_history_id
+    
+    async def _filter_new_message_ids(self, user_id: str, message_ids: List[str]) -> List[str]:
+        """
+        Drop message IDs that are already stored.
+        
+        Args:
+            user_id: User ID
+            message_ids: Gmail message IDs
             
-            return synced_emails
+        Returns:
+            IDs not yet in the emails table, in input order
+        """
+        existing = set()
+        # Chunked so the in_ filter stays within URL length limits
+        for i in range(0, len(message_ids), 200):
+            result = await run_blocking(self.supabase.table("emails").select("gmail_id").eq(
+                "user_id", user_id
+            ).in_("gmail_id", message_ids[i:i + 200]).execute)
+            existing.update(row["gmail_id"] for row in result.data or [])
+        
+        return [message_id for message_id in message_ids if message_id not in existing]
+    
+    async def _batch_get_messages(
+        self, service, message_ids: List[str]
+    ) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        Fetch full messages using Gmail HTTP batch requests.
+
+        Sub-requests that fail with a retryable error (Gmail often answers
+        429 rateLimitExceeded inside batches) are retried with exponential
+        backoff, up to GMAIL_FETCH_MAX_RETRIES times. Messages that no longer
+        exist (404) are dropped.
+        
+        Args:
+            service: Gmail API service
+            message_ids: Gmail message IDs
             
-        except HttpError as error:
-            logger.error(f"Gmail API error: {error}")
-            raise
+        Returns:
+            Tuple of (message objects in input order, IDs still failing
+            after all retries)
+        """
+        messages: Dict[str, Dict[str, Any]] = {}
+        failed: Dict[str, Exception] = {}
+        
+        def _callback(request_id, response, exception):
+            if exception is not None:
+                if isinstance(exception, HttpError) and exception.resp.status == 404:
+                    logger.debug(f"Gmail message {request_id} no longer exists")
+                    return
+                failed[request_id] = exception
+                return
+            messages[request_id] = response
+        
+        pending = list(message_ids)
+        batch_size = settings.GMAIL_FETCH_BATCH_SIZE
+        for attempt in range(settings.GMAIL_FETCH_MAX_RETRIES + 1):
+            if attempt:
+                delay = 2 ** attempt
+                logger.info(
+                    f"Retrying {len(pending)} Gmail messages in {delay}s "
+                    f"(attempt {attempt}/{settings.GMAIL_FETCH_MAX_RETRIES})"
+                )
+                await asyncio.sleep(delay)
+            failed.clear()
+
+            for i in range(0, len(pending), batch_size):
+                batch = service.new_batch_http_request(callback=_callback)
+                for message_id in pending[i:i + batch_size]:
+                    batch.add(
+                        service.users().messages().get(userId='me', id=message_id, format='full'),
+                        request_id=message_id
+                    )
+                await run_blocking(batch.execute)
+
+            pending = [message_id for message_id in pending if message_id in failed]
+            if not pending:
+                break
+
+        for message_id in pending:
+            logger.warning(f"Failed to fetch Gmail message {message_id}: {failed[message_id]}")
+        
+        return (
+            [messages[message_id] for message_id in message_ids if message_id in messages],
+            pending,
+        )
     
     def _parse_email(self, message: Dict[str, Any], user_id: str) -> Dict[str, Any]:
         """
@@ -0,0 +1,154 @@
+"""Cached construction of Google API clients (Gmail, Calendar)."""
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+import httplib2
+from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+
+from config import settings
+from services.executor_service import run_blocking
+
+logger = logging.getLogger(__name__)
+
+# API name -> version used by this app
+GOOGLE_API_VERSIONS = {"gmail": "v1", "calendar": "v3"}
+
+
+class GoogleClientFactory:
+    """
+    Builds Gmail/Calendar API clients without per-call discovery cost.
+
+    Discovery documents come from the copy bundled with
+    google-api-python-client and are parsed once per process. Built
+    clients are kept per (user, API) together with their authorized
+    httplib2 transport, so later syncs reuse both the client and its open
+    connections. httplib2 isn't thread-safe, so a client is leased to one
+    caller at a time; a concurrent caller for the same key gets a fresh
+    client. At most GOOGLE_CLIENT_CACHE_MAX_ENTRIES idle clients are kept.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._documents: Dict[str, Dict[str, Any]] = {}
+        self._documents_lock = threading.Lock()
+        # (user_id, api) -> (credentials, client), least recently used first
+        self._idle: "OrderedDict[Tuple[str, str], Tuple[Credentials, Any]]" = OrderedDict()
+
+        self.leases = 0
+        self.builds = 0
+        self.setup_seconds = 0.0
+
+    @asynccontextmanager
+    async def lease(self, user_id: str, api: str, credentials: Credentials) -> AsyncIterator[Any]:
+        """
+        Borrow a client for one user and API.
+
+        A cached client is reused if it was built for the same Credentials
+        object (the credential broker keeps one per user and refreshes it
+        in place); otherwise a new one is built.
+
+        Args:
+            user_id: User ID
+            api: "gmail" or "calendar"
+            credentials: Google credentials
+        """
+        key = (user_id, api)
+        started = time.perf_counter()
+
+        entry = self._idle.pop(key, None)
+        if entry is not None and entry[0] is credentials:
+            client = entry[1]
+        else:
+            client = await run_blocking(self.build, api, credentials)
+
+        self.leases += 1
+        self.setup_seconds += time.perf_counter() - started
+        try:
+            yield client
+        finally:
+            self._idle[key] = (credentials, client)
+            self._idle.move_to_end(key)
+            while len(self._idle) > self.max_entries:
+                self._idle.popitem(last=False)
+
+    def build(self, api: str, credentials: Credentials) -> Any:
+        """
+        Build an uncached client (blocking; run via run_blocking).
+
+        Args:
+            api: "gmail" or "calendar"
+            credentials: Google credentials
+
+        Returns:
+            googleapiclient Resource
+        """
+        self.builds += 1
+        http = AuthorizedHttp(
+            credentials, http=httplib2.Http(timeout=settings.GOOGLE_HTTP_TIMEOUT_SECONDS)
+        )
+        document = self._get_document(api)
+        if document is None:
+            logger.warning(f"⚠️  No bundled discovery document for {api}, fetching it")
+            return build(api, GOOGLE_API_VERSIONS[api], http=http, static_discovery=False)
+        return build_from_document(document, http=http)
+
+    def invalidate(self, user_id: str):
+        """Drop a user's cached clients (e.g. after disconnect)."""
+        for key in [k for k in self._idle if k[0] == user_id]:
+            del self._idle[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get build and reuse counters.
+
+        Returns:
+            Dictionary of counters
+        """
+        return {
+            "cached_clients": len(self._idle),
+            "leases": self.leases,
+            "builds": self.builds,
+            "reuse_rate": 1 - self.builds / self.leases if self.leases else 0.0,
+            "setup_seconds": round(self.setup_seconds, 3),
+        }
+
+    def _get_document(self, api: str) -> Optional[Dict[str, Any]]:
+        """Load and parse the bundled discovery document once."""
+        document = self._documents.get(api)
+        if document is None:
+            with self._documents_lock:
+                document = self._documents.get(api)
+                if document is None:
+                    raw = get_static_doc(api, GOOGLE_API_VERSIONS[api])
+                    if raw is None:
+                        return None
+                    document = self._documents[api] = json.loads(raw)
+        return document
+
+
+# Global factory instance
+_google_client_factory: Optional[GoogleClientFactory] = None
+
+
+def get_google_client_factory() -> GoogleClientFactory:
+    """
+    Get the global Google client factory instance.
+
+    Returns:
+        GoogleClientFactory instance
+    """
+    global _google_client_factory
+    if _google_client_factory is None:
+        _google_client_factory = GoogleClientFactory(
+            max_entries=settings.GOOGLE_CLIENT_CACHE_MAX_ENTRIES
+        )
+    return _google_client_factory
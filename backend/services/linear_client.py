@@ -0,0 +1,233 @@
+"""Shared async GraphQL client for the Linear API."""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import httpx
+
+from config import settings
+from services.rate_limiter import token_key
+
+logger = logging.getLogger(__name__)
+
+LINEAR_API_URL = "https://api.linear.app"
+LINEAR_GRAPHQL_URL = f"{LINEAR_API_URL}/graphql"
+
+
+@dataclass
+class RateBudget:
+    """Remaining Linear rate-limit budget for one access token."""
+
+    requests_remaining: Optional[int] = None
+    requests_reset_at: float = 0.0  # epoch seconds
+    complexity_remaining: Optional[int] = None
+    complexity_reset_at: float = 0.0
+    last_complexity: int = 0  # cost of the previous query, used as the estimate
+
+
+class LinearClient:
+    """
+    Pooled HTTP/2 client for Linear's GraphQL API.
+
+    One keep-alive connection pool is shared by every sync. Linear reports
+    the remaining request and complexity budget in response headers; the
+    client records them per token and waits for the window to reset before
+    a request would exceed it, instead of running into 429s.
+    """
+
+    def __init__(self):
+        self.http = httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(settings.LINEAR_HTTP_TIMEOUT_SECONDS),
+            limits=httpx.Limits(
+                max_connections=settings.LINEAR_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LINEAR_HTTP_MAX_CONNECTIONS,
+            ),
+        )
+        self._budgets: Dict[str, RateBudget] = {}
+
+        self.requests = 0
+        self.throttled = 0
+        self.throttle_seconds = 0.0
+
+    async def execute(
+        self,
+        access_token: str,
+        query: str,
+        variables: Optional[Dict[str, Any]] = None,
+        max_retries: int = 3,
+    ) -> Dict[str, Any]:
+        """
+        Run a GraphQL query.
+
+        Args:
+            access_token: Linear access token
+            query: GraphQL document
+            variables: Query variables
+            max_retries: Attempts on rate limiting before giving up
+
+        Returns:
+            The response's data object
+
+        Raises:
+            httpx.HTTPStatusError: On non-rate-limit HTTP errors
+            ValueError: If the response contains GraphQL errors
+        """
+        budget = self._budgets.setdefault(token_key(access_token), RateBudget())
+        payload: Dict[str, Any] = {"query": query}
+        if variables is not None:
+            payload["variables"] = variables
+
+        for attempt in range(max_retries):
+            await self._wait_for_budget(budget)
+
+            response = await self.http.post(
+                LINEAR_GRAPHQL_URL,
+                json=payload,
+                headers={"Authorization": access_token, "Content-Type": "application/json"},
+            )
+            self.requests += 1
+            self._record_budget(budget, response.headers)
+
+            try:
+                body = response.json()
+            except ValueError:
+                body = {}
+            if response.status_code == 429 or self._is_rate_limited(body):
+                reset_at = max(budget.requests_reset_at, budget.complexity_reset_at)
+                wait = max(reset_at - time.time(), 2 ** attempt)
+                logger.warning(
+                    f"Linear rate limit hit (attempt {attempt + 1}/{max_retries}), "
+                    f"retrying in {wait:.1f}s"
+                )
+                await self._sleep(min(wait, settings.LINEAR_MAX_THROTTLE_SECONDS))
+                continue
+
+            if response.status_code != 200:
+                logger.error(f"Linear API error response: {response.text}")
+            response.raise_for_status()
+
+            if "errors" in body:
+                logger.error(f"Linear API errors: {body['errors']}")
+                raise ValueError(f"Linear API error: {body['errors']}")
+
+            return body["data"]
+
+        raise ValueError("Linear API rate limit exceeded")
+
+    async def post_form(self, url: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        POST form-encoded data (used for the OAuth token exchange).
+
+        Args:
+            url: Endpoint URL
+            data: Form fields
+
+        Returns:
+            Parsed JSON response
+        """
+        response = await self.http.post(url, data=data)
+        response.raise_for_status()
+        return response.json()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get request and throttling counters.
+
+        Returns:
+            Dictionary of counters
+        """
+        return {
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "throttle_seconds": round(self.throttle_seconds, 3),
+            "tracked_tokens": len(self._budgets),
+        }
+
+    async def close(self):
+        """Close pooled connections."""
+        await self.http.aclose()
+        logger.info("✅ Linear client closed")
+
+    async def _wait_for_budget(self, budget: RateBudget):
+        """Sleep until the window resets if this request would exceed it."""
+        now = time.time()
+        reserve = settings.LINEAR_REQUEST_RESERVE
+        wait = 0.0
+
+        if budget.requests_remaining is not None and budget.requests_remaining <= reserve:
+            wait = max(wait, budget.requests_reset_at - now)
+        if (
+            budget.complexity_remaining is not None
+            and budget.complexity_remaining < budget.last_complexity
+        ):
+            wait = max(wait, budget.complexity_reset_at - now)
+
+        if wait > 0:
+            logger.info(f"Linear budget low, waiting {wait:.1f}s for the window to reset")
+            await self._sleep(min(wait, settings.LINEAR_MAX_THROTTLE_SECONDS))
+
+        # Optimistic decrement so concurrent callers on one token see it
+        if budget.requests_remaining is not None:
+            budget.requests_remaining -= 1
+        if budget.complexity_remaining is not None:
+            budget.complexity_remaining -= budget.last_complexity
+
+    async def _sleep(self, seconds: float):
+        """Sleep and count it as throttling."""
+        self.throttled += 1
+        self.throttle_seconds += seconds
+        await asyncio.sleep(seconds)
+
+    @staticmethod
+    def _record_budget(budget: RateBudget, headers: httpx.Headers):
+        """Update the budget from Linear's rate-limit headers."""
+
+        def _int(name: str) -> Optional[int]:
+            value = headers.get(name)
+            try:
+                return int(value) if value is not None else None
+            except ValueError:
+                return None
+
+        requests_remaining = _int("x-ratelimit-requests-remaining")
+        if requests_remaining is not None:
+            budget.requests_remaining = requests_remaining
+            budget.requests_reset_at = (_int("x-ratelimit-requests-reset") or 0) / 1000
+
+        complexity_remaining = _int("x-ratelimit-complexity-remaining")
+        if complexity_remaining is not None:
+            budget.complexity_remaining = complexity_remaining
+            budget.complexity_reset_at = (_int("x-ratelimit-complexity-reset") or 0) / 1000
+
+        complexity = _int("x-complexity")
+        if complexity is not None:
+            budget.last_complexity = complexity
+
+    @staticmethod
+    def _is_rate_limited(body: Dict[str, Any]) -> bool:
+        """Linear also reports rate limiting as a GraphQL error."""
+        return any(
+            error.get("extensions", {}).get("code") == "RATELIMITED"
+            for error in body.get("errors") or []
+        )
+
+
+# Global client instance
+_linear_client: Optional[LinearClient] = None
+
+
+def get_linear_client() -> LinearClient:
+    """
+    Get the global Linear client instance.
+
+    Returns:
+        LinearClient instance
+    """
+    global _linear_client
+    if _linear_client is None:
+        _linear_client = LinearClient()
+    return _linear_client
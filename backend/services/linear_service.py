@@ -1,16 +1,107 @@
 """Linear service for OAuth and issue/project syncing."""
 
 import logging
-import requests
+import httpx
 from datetime import datetime, timedelta, timezone
 from typing import List, Optional, Dict, Any
 from uuid import UUID
 
 from config import settings
 from database.client import get_supabase_client
+from services.bulk_upsert import bulk_upsert
+from services.credential_broker import get_credential_broker
+from services.executor_service import run_blocking
+from services.linear_client import LINEAR_API_URL, get_linear_client
 
 logger = logging.getLogger(__name__)
 
+# Issues and projects in one document; @include drops a connection once it
+# has no more pages. Only the fields _parse_issue/_parse_project persist.
+SYNC_QUERY = """
+query(
+    $includeIssues: Boolean!,
+    $issuesFirst: Int!,
+    $issuesAfter: String,
+    $issuesFilter: IssueFilter,
+    $includeProjects: Boolean!,
+    $projectsFirst: Int!,
+    $projectsAfter: String,
+    $projectsFilter: ProjectFilter
+) {
+    viewer @include(if: $includeIssues) {
+        assignedIssues(first: $issuesFirst, after: $issuesAfter, filter: $issuesFilter, orderBy: updatedAt) {
+            nodes {
+                id
+                title
+                description
+                priority
+                url
+                state {
+                    id
+                    name
+                    type
+                }
+                assignee {
+                    id
+                    name
+                }
+                team {
+                    id
+                    name
+                }
+                project {
+                    id
+                    name
+                }
+                createdAt
+                updatedAt
+                completedAt
+                canceledAt
+                dueDate
+                archivedAt
+                labels {
+                    nodes {
+                        id
+                        name
+                        color
+                    }
+                }
+            }
+            pageInfo {
+                hasNextPage
+                endCursor
+            }
+        }
+    }
+    projects(first: $projectsFirst, after: $projectsAfter, filter: $projectsFilter, orderBy: updatedAt) @include(if: $includeProjects) {
+        nodes {
+            id
+            name
+            description
+            url
+            state
+            startDate
+            targetDate
+            completedAt
+            canceledAt
+            progress
+            archivedAt
+            updatedAt
+            teams(first: 1) {
+                nodes {
+                    id
+                    name
+                }
+            }
+        }
+        pageInfo {
+            hasNextPage
+            endCursor
+        }
+    }
+}
+"""
+
 
 class LinearService:
     """Service for Linear OAuth and syncing."""
@@ -18,8 +109,7 @@ class LinearService:
     def __init__(self):
         self.supabase = get_supabase_client()
         self.scopes = settings.LINEAR_SCOPES
-        self.api_url = "https://api.linear.app"
-        self.graphql_url = f"{self.api_url}/graphql"
+        self.api_url = LINEAR_API_URL
     
     def get_oauth_url(self, user_id: str) -> str:
         """
@@ -70,9 +160,7 @@ class LinearService:
         }
 
         # Linear expects form-encoded data, not JSON
-        response = requests.post(token_url, data=payload)
-        response.raise_for_status()
-        token_data = response.json()
+        token_data = await get_linear_client().post_form(token_url, payload)
 
         logger.info(f"Linear OAuth token response: {token_data}")
 
@@ -90,7 +178,7 @@ class LinearService:
             token_expires_at = expiry_time.isoformat(timespec='microseconds')
         
         # Get user info from Linear API
-        user_info = self._get_viewer_info(access_token)
+        user_info = await self._get_viewer_info(access_token)
         account_email = user_info.get("email")
         
         # Store integration in database
@@ -106,15 +194,16 @@ class LinearService:
         }
         
         # Upsert integration (update if exists, insert if not)
-        result = self.supabase.table("integrations").upsert(
+        result = await run_blocking(self.supabase.table("integrations").upsert(
             integration_data,
             on_conflict="user_id,provider"
-        ).execute()
+        ).execute)
+        get_credential_broker().invalidate(user_id, "linear")
         
         logger.info(f"Linear OAuth successful for user {user_id}")
         return result.data[0]
     
-    def _get_viewer_info(self, access_token: str) -> Dict[str, Any]:
+    async def _get_viewer_info(self, access_token: str) -> Dict[str, Any]:
         """
         Get viewer (current user) info from Linear API.
         
@@ -134,22 +223,10 @@ class LinearService:
         }
         """
         
-        headers = {
-            "Authorization": access_token,
-            "Content-Type": "application/json",
-        }
-        
-        response = requests.post(
-            self.graphql_url,
-            json={"query": query},
-            headers=headers
-        )
-        response.raise_for_status()
-        data = response.json()
-        
-        return data["data"]["viewer"]
+        data = await get_linear_client().execute(access_token, query)
+        return data["viewer"]
     
-    def _get_access_token(self, user_id: str) -> Optional[str]:
+    async def _get_access_token(self, user_id: str) -> Optional[str]:
         """
         Get Linear access token for a user.
         
@@ -159,17 +236,12 @@ class LinearService:
         Returns:
             Access token or None
         """
-        # Fetch integration from database
-        result = self.supabase.table("integrations").select("*").eq(
-            "user_id", user_id
-        ).eq("provider", "linear").eq("is_active", True).execute()
+        integration = await get_credential_broker().get_integration(user_id, "linear")
         
-        if not result.data:
+        if not integration:
             logger.warning(f"No Linear integration found for user {user_id}")
             return None
         
-        integration = result.data[0]
-        
         # Linear uses long-lived tokens, no refresh needed
         # But check if token is expired
         if integration.get("token_expires_at"):
@@ -186,7 +258,7 @@ class LinearService:
     async def sync_issues(
         self, 
         user_id: str, 
-        days_back: int = 7,
+        days_back: Optional[int] = None,
         max_results: int = 100
     ) -> List[Dict[str, Any]]:
         """
@@ -194,135 +266,168 @@ class LinearService:
         
         Args:
             user_id: User ID
-            days_back: Number of days to sync back
-            max_results: Maximum number of issues to fetch
+            days_back: Window for the first sync (None syncs all issues)
+            max_results: Issues per page
             
         Returns:
-            List of synced issue data
+            List of new or changed issue data
         """
-        access_token = self._get_access_token(user_id)
+        result = await self.sync_workspace(
+            user_id, days_back=days_back, issues_page_size=max_results, include_projects=False
+        )
+        return result["issues"]
+
+    async def sync_projects(
+        self,
+        user_id: str,
+        max_results: int = 50
+    ) -> List[Dict[str, Any]]:
+        """
+        Sync projects from Linear for a user.
+
+        Args:
+            user_id: User ID
+            max_results: Projects per page
+
+        Returns:
+            List of new or changed project data
+        """
+        result = await self.sync_workspace(
+            user_id, projects_page_size=max_results, include_issues=False
+        )
+        return result["projects"]
+
+    async def sync_workspace(
+        self,
+        user_id: str,
+        days_back: Optional[int] = None,
+        issues_page_size: int = 100,
+        projects_page_size: int = 50,
+        include_issues: bool = True,
+        include_projects: bool = True
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Sync issues and projects from Linear in shared round-trips.
+
+        Both connections are fetched by one GraphQL document per page, each
+        filtered on updatedAt since its stored high-water mark and paginated
+        by pageInfo.endCursor. A quiet workspace costs one small query.
+
+        Args:
+            user_id: User ID
+            days_back: Window for the first issue sync (None syncs all issues)
+            issues_page_size: Issues per page
+            projects_page_size: Projects per page
+            include_issues: Sync assigned issues
+            include_projects: Sync projects
+
+        Returns:
+            {"issues": [...], "projects": [...]} with new or changed rows
+        """
+        access_token = await self._get_access_token(user_id)
         if not access_token:
             raise ValueError(f"No Linear access token found for user {user_id}")
-        
-        # GraphQL query to fetch issues assigned to the user
-        # Note: Removed date filter for now to test basic query
-        query = """
-        query($first: Int!) {
-            viewer {
-                assignedIssues(first: $first) {
-                    nodes {
-                        id
-                        title
-                        description
-                        priority
-                        url
-                        state {
-                            id
-                            name
-                            type
-                        }
-                        assignee {
-                            id
-                            name
-                        }
-                        team {
-                            id
-                            name
-                        }
-                        project {
-                            id
-                            name
-                        }
-                        createdAt
-                        updatedAt
-                        completedAt
-                        canceledAt
-                        dueDate
-                        archivedAt
-                        labels {
-                            nodes {
-                                id
-                                name
-                                color
-                            }
-                        }
-                    }
-                }
-            }
-        }
-        """
-        
-        variables = {
-            "first": max_results
-        }
-        
-        headers = {
-            "Authorization": access_token,
-            "Content-Type": "application/json",
-        }
-        
+
         try:
-            response = requests.post(
-                self.graphql_url,
-                json={"query": query, "variables": variables},
-                headers=headers
+            marks = await self._get_high_water(user_id, days_back)
+            variables: Dict[str, Any] = {
+                "includeIssues": include_issues,
+                "issuesFirst": issues_page_size,
+                "issuesAfter": None,
+                "includeProjects": include_projects,
+                "projectsFirst": projects_page_size,
+                "projectsAfter": None,
+            }
+            # gte: nodes sharing the mark's timestamp aren't missed; bulk_upsert
+            # skips the ones already stored unchanged
+            if marks["issues"]:
+                variables["issuesFilter"] = {"updatedAt": {"gte": marks["issues"]}}
+            if marks["projects"]:
+                variables["projectsFilter"] = {"updatedAt": {"gte": marks["projects"]}}
+
+            issues: List[Dict[str, Any]] = []
+            projects: List[Dict[str, Any]] = []
+            client = get_linear_client()
+
+            while variables["includeIssues"] or variables["includeProjects"]:
+                data = await client.execute(access_token, SYNC_QUERY, variables)
+
+                if variables["includeIssues"]:
+                    connection = data["viewer"]["assignedIssues"]
+                    issues.extend(connection["nodes"])
+                    variables["includeIssues"] = connection["pageInfo"]["hasNextPage"]
+                    variables["issuesAfter"] = connection["pageInfo"]["endCursor"]
+
+                if variables["includeProjects"]:
+                    connection = data["projects"]
+                    projects.extend(connection["nodes"])
+                    variables["includeProjects"] = connection["pageInfo"]["hasNextPage"]
+                    variables["projectsAfter"] = connection["pageInfo"]["endCursor"]
+
+            logger.info(
+                f"Found {len(issues)} issues and {len(projects)} projects updated "
+                f"since the last sync for user {user_id}"
             )
 
-            # Log response for debugging
-            logger.info(f"Linear API response status: {response.status_code}")
-            if response.status_code != 200:
-                logger.error(f"Linear API error response: {response.text}")
+            synced_issues = await bulk_upsert(
+                "linear_issues",
+                [self._parse_issue(issue, user_id) for issue in issues],
+                ("user_id", "linear_id")
+            )
+            synced_projects = await bulk_upsert(
+                "linear_projects",
+                [self._parse_project(project, user_id) for project in projects],
+                ("user_id", "linear_id")
+            )
 
-            response.raise_for_status()
-            data = response.json()
+            # Update last sync time and high-water marks
+            sync_update: Dict[str, Any] = {}
+            if include_issues:
+                sync_update["last_sync_at"] = datetime.now(timezone.utc).isoformat(timespec='microseconds')
+            if issues:
+                sync_update["linear_issues_synced_through"] = max(issue["updatedAt"] for issue in issues)
+            if projects:
+                sync_update["linear_projects_synced_through"] = max(project["updatedAt"] for project in projects)
+            if sync_update:
+                await run_blocking(self.supabase.table("integrations").update(sync_update).eq(
+                    "user_id", user_id
+                ).eq("provider", "linear").execute)
+
+            logger.info(
+                f"Synced {len(synced_issues)} new or changed Linear issues and "
+                f"{len(synced_projects)} projects for user {user_id}"
+            )
 
-            if "errors" in data:
-                logger.error(f"Linear API errors: {data['errors']}")
-                raise ValueError(f"Linear API error: {data['errors']}")
-            
-            issues = data["data"]["viewer"]["assignedIssues"]["nodes"]
-            logger.info(f"Found {len(issues)} issues for user {user_id}")
-            
-            synced_issues = []
-            
-            for issue in issues:
-                # Parse issue data
-                issue_data = self._parse_issue(issue, user_id)
-                
-                # Check if issue already exists
-                existing = self.supabase.table("linear_issues").select("id").eq(
-                    "linear_id", issue_data["linear_id"]
-                ).execute()
-                
-                if existing.data:
-                    # Update existing issue
-                    result = self.supabase.table("linear_issues").update(
-                        issue_data
-                    ).eq("id", existing.data[0]["id"]).execute()
-                    logger.debug(f"Updated issue: {issue_data['title']}")
-                else:
-                    # Insert new issue
-                    result = self.supabase.table("linear_issues").insert(
-                        issue_data
-                    ).execute()
-                    logger.debug(f"Synced new issue: {issue_data['title']}")
-                
-                if result.data:
-                    synced_issues.append(result.data[0])
-            
-            # Update last sync time
-            self.supabase.table("integrations").update({
-                "last_sync_at": datetime.now(timezone.utc).isoformat(timespec='microseconds')
-            }).eq("user_id", user_id).eq("provider", "linear").execute()
-            
-            logger.info(f"Synced {len(synced_issues)} Linear issues for user {user_id}")
-            
-            return synced_issues
-            
-        except requests.exceptions.RequestException as error:
+            return {"issues": synced_issues, "projects": synced_projects}
+
+        except httpx.HTTPError as error:
             logger.error(f"Linear API error: {error}")
             raise
 
+    async def _get_high_water(
+        self, user_id: str, days_back: Optional[int] = None
+    ) -> Dict[str, Optional[str]]:
+        """
+        Get the updatedAt high-water marks stored on the integration.
+
+        Args:
+            user_id: User ID
+            days_back: Issue window to use when there is no mark yet
+
+        Returns:
+            {"issues": ..., "projects": ...} ISO timestamps, None for everything
+        """
+        result = await run_blocking(self.supabase.table("integrations").select(
+            "linear_issues_synced_through, linear_projects_synced_through"
+        ).eq("user_id", user_id).eq("provider", "linear").execute)
+        row = result.data[0] if result.data else {}
+
+        issues_mark = row.get("linear_issues_synced_through")
+        if not issues_mark and days_back is not None:
+            issues_mark = (datetime.now(timezone.utc) - timedelta(days=days_back)).isoformat()
+
+        return {"issues": issues_mark, "projects": row.get("linear_projects_synced_through")}
+
     def _normalize_timestamp(self, timestamp: str) -> str:
         """
         Normalize Linear timestamp to ensure 6 digits of microseconds.
@@ -399,119 +504,6 @@ class LinearService:
             "labels": labels,
         }
 
-    async def sync_projects(
-        self,
-        user_id: str,
-        max_results: int = 50
-    ) -> List[Dict[str, Any]]:
-        """
-        Sync projects from Linear for a user.
-
-        Args:
-            user_id: User ID
-            max_results: Maximum number of projects to fetch
-
-        Returns:
-            List of synced project data
-        """
-        access_token = self._get_access_token(user_id)
-        if not access_token:
-            raise ValueError(f"No Linear access token found for user {user_id}")
-
-        # GraphQL query to fetch projects
-        # Note: Removed state filter for now - will fetch all projects
-        query = """
-        query($first: Int!) {
-            projects(first: $first) {
-                nodes {
-                    id
-                    name
-                    description
-                    url
-                    state
-                    startDate
-                    targetDate
-                    completedAt
-                    canceledAt
-                    progress
-                    archivedAt
-                    teams {
-                        nodes {
-                            id
-                            name
-                        }
-                    }
-                }
-            }
-        }
-        """
-
-        variables = {
-            "first": max_results
-        }
-
-        headers = {
-            "Authorization": access_token,
-            "Content-Type": "application/json",
-        }
-
-        try:
-            response = requests.post(
-                self.graphql_url,
-                json={"query": query, "variables": variables},
-                headers=headers
-            )
-
-            # Log response for debugging
-            logger.info(f"Linear API response status: {response.status_code}")
-            if response.status_code != 200:
-                logger.error(f"Linear API error response: {response.text}")
-
-            response.raise_for_status()
-            data = response.json()
-
-            if "errors" in data:
-                logger.error(f"Linear API errors: {data['errors']}")
-                raise ValueError(f"Linear API error: {data['errors']}")
-
-            projects = data["data"]["projects"]["nodes"]
-            logger.info(f"Found {len(projects)} projects for user {user_id}")
-
-            synced_projects = []
-
-            for project in projects:
-                # Parse project data
-                project_data = self._parse_project(project, user_id)
-
-                # Check if project already exists
-                existing = self.supabase.table("linear_projects").select("id").eq(
-                    "linear_id", project_data["linear_id"]
-                ).execute()
-
-                if existing.data:
-                    # Update existing project
-                    result = self.supabase.table("linear_projects").update(
-                        project_data
-                    ).eq("id", existing.data[0]["id"]).execute()
-                    logger.debug(f"Updated project: {project_data['name']}")
-                else:
-                    # Insert new project
-                    result = self.supabase.table("linear_projects").insert(
-                        project_data
-                    ).execute()
-                    logger.debug(f"Synced new project: {project_data['name']}")
-
-                if result.data:
-                    synced_projects.append(result.data[0])
-
-            logger.info(f"Synced {len(synced_projects)} Linear projects for user {user_id}")
-
-            return synced_projects
-
-        except requests.exceptions.RequestException as error:
-            logger.error(f"Linear API error: {error}")
-            raise
-
     def _parse_project(self, project: Dict[str, Any], user_id: str) -> Dict[str, Any]:
         """
         Parse Linear project into database format.
@@ -0,0 +1,236 @@
+"""Shared async client for the Notion API with rate limiting."""
+
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+import httpx
+
+from config import settings
+from services.rate_limiter import TokenBucket, token_key
+
+logger = logging.getLogger(__name__)
+
+NOTION_API_URL = "https://api.notion.com/v1"
+NOTION_VERSION = "2022-06-28"
+
+# Blocks whose children are separate pages, synced on their own
+NOTION_SKIP_CHILDREN_TYPES = {"child_page", "child_database"}
+
+_END = object()  # end-of-subtree marker for prefetch queues
+
+
+class NotionClient:
+    """
+    Pooled client for the Notion API.
+
+    Requests are paced per integration token with a token bucket at
+    NOTION_REQUESTS_PER_SECOND (Notion allows an average of ~3/s) and at
+    most NOTION_MAX_CONCURRENT_REQUESTS are in flight per token; 429s are
+    retried after Retry-After.
+    """
+
+    def __init__(self):
+        self.http = httpx.AsyncClient(
+            base_url=NOTION_API_URL,
+            http2=True,
+            timeout=httpx.Timeout(settings.NOTION_HTTP_TIMEOUT_SECONDS),
+            limits=httpx.Limits(
+                max_connections=settings.NOTION_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.NOTION_HTTP_MAX_CONNECTIONS,
+            ),
+            headers={"Notion-Version": NOTION_VERSION},
+        )
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._in_flight: Dict[str, asyncio.Semaphore] = {}
+
+        self.requests = 0
+        self.rate_limited = 0
+        self.throttle_seconds = 0.0
+
+    async def request(
+        self,
+        access_token: str,
+        method: str,
+        path: str,
+        json: Optional[Dict[str, Any]] = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Call a Notion API endpoint.
+
+        Args:
+            access_token: Notion integration token
+            method: HTTP method
+            path: Path under /v1, e.g. "/search"
+            json: JSON body
+            params: Query parameters
+
+        Returns:
+            Parsed response body
+
+        Raises:
+            ValueError: If Notion returns an error response
+        """
+        key = token_key(access_token)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(
+                settings.NOTION_REQUESTS_PER_SECOND, burst=settings.NOTION_MAX_CONCURRENT_REQUESTS
+            )
+        in_flight = self._in_flight.setdefault(
+            key, asyncio.Semaphore(settings.NOTION_MAX_CONCURRENT_REQUESTS)
+        )
+
+        for attempt in range(settings.NOTION_MAX_RETRIES):
+            async with in_flight:
+                self.throttle_seconds += await bucket.acquire()
+                response = await self.http.request(
+                    method,
+                    path,
+                    json=json,
+                    params=params,
+                    headers={"Authorization": f"Bearer {access_token}"},
+                )
+            self.requests += 1
+
+            if response.status_code == 429:
+                self.rate_limited += 1
+                retry_after = float(response.headers.get("Retry-After", 2 ** attempt))
+                logger.warning(
+                    f"Notion rate limited (attempt {attempt + 1}/{settings.NOTION_MAX_RETRIES}), "
+                    f"retrying in {retry_after:.0f}s"
+                )
+                bucket.block_for(retry_after)
+                continue
+
+            data = response.json()
+            if response.status_code >= 400:
+                raise ValueError(f"Notion API error ({data.get('code')}): {data.get('message')}")
+            return data
+
+        raise ValueError("Notion API rate limit exceeded")
+
+    async def post_oauth_token(self, credentials: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Exchange an OAuth code (Basic auth, no integration token).
+
+        Args:
+            credentials: Base64 client_id:client_secret
+            body: Token request body
+
+        Returns:
+            Parsed response body
+        """
+        response = await self.http.post(
+            "/oauth/token",
+            json=body,
+            headers={"Authorization": f"Basic {credentials}"},
+        )
+        self.requests += 1
+        return response.json()
+
+    async def walk_blocks(
+        self, access_token: str, block_id: str, depth: int = 0
+    ) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Yield every block under block_id in document order, with its depth.
+
+        All pages of each children list are followed. Subtrees of sibling
+        blocks are fetched concurrently, each into a bounded queue, so the
+        walk overlaps requests without holding the whole tree in memory;
+        the token bucket keeps the overall rate within Notion's limit.
+        Child pages and databases aren't descended into.
+
+        Args:
+            access_token: Notion integration token
+            block_id: Page or block ID
+            depth: Nesting depth of block_id's children
+        """
+        params: Dict[str, Any] = {"page_size": 100}
+        while True:
+            data = await self.request(
+                access_token, "GET", f"/blocks/{block_id}/children", params=params
+            )
+            blocks = data.get("results", [])
+
+            subtrees = [
+                self._prefetch(access_token, block["id"], depth + 1)
+                if block.get("has_children") and block.get("type") not in NOTION_SKIP_CHILDREN_TYPES
+                else None
+                for block in blocks
+            ]
+            try:
+                for block, subtree in zip(blocks, subtrees):
+                    yield depth, block
+                    if subtree is not None:
+                        queue, _ = subtree
+                        while True:
+                            item = await queue.get()
+                            if item is _END:
+                                break
+                            if isinstance(item, BaseException):
+                                raise item
+                            yield item
+            finally:
+                for subtree in subtrees:
+                    if subtree is not None:
+                        subtree[1].cancel()
+
+            if not data.get("has_more"):
+                return
+            params["start_cursor"] = data["next_cursor"]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get request and throttling counters.
+
+        Returns:
+            Dictionary of counters
+        """
+        return {
+            "requests": self.requests,
+            "rate_limited": self.rate_limited,
+            "throttle_seconds": round(self.throttle_seconds, 3),
+            "tracked_tokens": len(self._buckets),
+        }
+
+    async def close(self):
+        """Close pooled connections."""
+        await self.http.aclose()
+        logger.info("✅ Notion client closed")
+
+    def _prefetch(
+        self, access_token: str, block_id: str, depth: int
+    ) -> Tuple[asyncio.Queue, asyncio.Task]:
+        """Start walking a subtree in the background into a bounded queue."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.NOTION_BLOCK_PREFETCH)
+
+        async def _produce():
+            try:
+                async for item in self.walk_blocks(access_token, block_id, depth):
+                    await queue.put(item)
+                await queue.put(_END)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await queue.put(e)
+
+        return queue, asyncio.create_task(_produce())
+
+
+# Global client instance
+_notion_client: Optional[NotionClient] = None
+
+
+def get_notion_client() -> NotionClient:
+    """
+    Get the global Notion client instance.
+
+    Returns:
+        NotionClient instance
+    """
+    global _notion_client
+    if _notion_client is None:
+        _notion_client = NotionClient()
+    return _notion_client
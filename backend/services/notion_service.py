@@ -1,15 +1,20 @@
 """Notion integration service for OAuth and content sync."""
 
+import asyncio
 import logging
-import httpx
 import hashlib
-from datetime import datetime, timezone
-from typing import Optional, Dict, Any, List
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, List, AsyncIterator, Tuple
 from urllib.parse import urlencode
 import base64
 
 from config import settings
 from database.client import get_supabase_client
+from services.bulk_upsert import IN_FILTER_CHUNK
+from services.context_index_service import ContextIndexService
+from services.credential_broker import get_credential_broker
+from services.executor_service import run_blocking
+from services.notion_client import get_notion_client
 
 logger = logging.getLogger(__name__)
 
@@ -41,20 +46,14 @@ class NotionService:
             f"{self.client_id}:{self.client_secret}".encode()
         ).decode()
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.notion.com/v1/oauth/token",
-                headers={
-                    "Authorization": f"Basic {credentials}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "grant_type": "authorization_code",
-                    "code": code,
-                    "redirect_uri": self.redirect_uri,
-                },
-            )
-            data = response.json()
+        data = await get_notion_client().post_oauth_token(
+            credentials,
+            {
+                "grant_type": "authorization_code",
+                "code": code,
+                "redirect_uri": self.redirect_uri,
+            },
+        )
 
         if "error" in data:
             error = data.get("error", "Unknown error")
@@ -77,17 +76,18 @@ class NotionService:
             "is_active": True,
         }
 
-        result = self.supabase.table("integrations").upsert(
+        result = await run_blocking(self.supabase.table("integrations").upsert(
             integration_data, on_conflict="user_id,provider"
-        ).execute()
+        ).execute)
 
         # Store as knowledge source
-        self._store_notion_workspace(user_id, workspace_id, workspace_info)
+        await self._store_notion_workspace(user_id, workspace_id, workspace_info)
+        get_credential_broker().invalidate(user_id, "notion")
 
         logger.info(f"Notion OAuth successful for user {user_id}")
         return result.data[0]
 
-    def _store_notion_workspace(self, user_id: str, workspace_id: str, name: str):
+    async def _store_notion_workspace(self, user_id: str, workspace_id: str, name: str):
         """Store Notion workspace as a knowledge source."""
         source_data = {
             "user_id": user_id,
@@ -97,91 +97,314 @@ class NotionService:
             "status": "active",
             "metadata": {"workspace_name": name, "workspace_id": workspace_id},
         }
-        self.supabase.table("knowledge_sources").upsert(
+        await run_blocking(self.supabase.table("knowledge_sources").upsert(
             source_data, on_conflict="user_id,external_id"
-        ).execute()
+        ).execute)
 
     async def search_pages(
         self, user_id: str, query: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """Search for pages in Notion workspace."""
-        integration = self._get_integration(user_id)
+        integration = await get_credential_broker().get_integration(user_id, "notion")
         if not integration:
             raise Exception("Notion not connected")
 
-        async with httpx.AsyncClient() as client:
-            body = {"page_size": 100}
-            if query:
-                body["query"] = query
-
-            response = await client.post(
-                "https://api.notion.com/v1/search",
-                headers={
-                    "Authorization": f"Bearer {integration['access_token']}",
-                    "Notion-Version": "2022-06-28",
-                },
-                json=body,
-            )
-            data = response.json()
+        body = {"page_size": 100}
+        if query:
+            body["query"] = query
 
-        if "error" in data:
-            raise Exception(f"Failed to search Notion: {data.get('message')}")
+        try:
+            data = await get_notion_client().request(
+                integration["access_token"], "POST", "/search", json=body
+            )
+        except ValueError as e:
+            raise Exception(f"Failed to search Notion: {e}")
 
         return data.get("results", [])
 
-    async def get_page_content(self, user_id: str, page_id: str) -> Dict[str, Any]:
-        """Get content of a Notion page."""
-        integration = self._get_integration(user_id)
+    async def sync_workspace(self, user_id: str) -> Dict[str, Any]:
+        """
+        Sync every page edited since the last run.
+
+        /search is read newest-edit first and stops at the stored
+        notion_synced_through mark, so an idle workspace costs one request.
+        The edited pages are synced NOTION_SYNC_PAGE_CONCURRENCY at a time,
+        reusing the page objects from search. The mark only advances when
+        every page synced, and is compared inclusively because Notion
+        rounds last_edited_time to the minute (sync_page re-reads a page
+        until its edit minute had passed at a previous read).
+
+        Deleted or unshared pages never show up as edits, so every
+        NOTION_RECONCILE_INTERVAL_HOURS the search runs to the end instead
+        and active documents missing from it are marked is_active=false and
+        dropped from the context index. Pages found by that full search
+        whose document is missing or inactive are synced too, so re-shared
+        pages come back without needing a new edit.
+
+        Args:
+            user_id: User ID
+
+        Returns:
+            {"pages_checked", "pages_changed", "pages_failed", "pages_deactivated"}
+        """
+        integration = await get_credential_broker().get_integration(user_id, "notion")
         if not integration:
             raise Exception("Notion not connected")
 
-        async with httpx.AsyncClient() as client:
-            # Get page metadata
-            page_resp = await client.get(
-                f"https://api.notion.com/v1/pages/{page_id}",
-                headers={
-                    "Authorization": f"Bearer {integration['access_token']}",
-                    "Notion-Version": "2022-06-28",
-                },
+        state = await run_blocking(
+            self.supabase.table("integrations")
+            .select("notion_synced_through, notion_reconciled_at")
+            .eq("id", integration["id"])
+            .execute
+        )
+        state = state.data[0] if state.data else {}
+
+        access_token = integration["access_token"]
+        synced_through = self._parse_time(state.get("notion_synced_through"))
+        reconciled_at = self._parse_time(state.get("notion_reconciled_at"))
+        started_at = datetime.now(timezone.utc)
+        reconcile = reconciled_at is None or started_at - reconciled_at >= timedelta(
+            hours=settings.NOTION_RECONCILE_INTERVAL_HOURS
+        )
+
+        edited: List[Dict[str, Any]] = []
+        unedited: List[Dict[str, Any]] = []
+        live_ids = set()
+        async for page in self._search_pages_by_edit_time(access_token):
+            if page.get("archived") or page.get("in_trash"):
+                continue
+
+            edited_at = self._parse_time(page.get("last_edited_time"))
+            if synced_through and edited_at and edited_at < synced_through:
+                if not reconcile:
+                    break
+                unedited.append(page)
+            else:
+                edited.append(page)
+            live_ids.add(page["id"])
+
+        if unedited:
+            # Re-shared or restored pages come back without a new edit
+            edited.extend(await self._pages_without_active_document(user_id, unedited))
+
+        semaphore = asyncio.Semaphore(settings.NOTION_SYNC_PAGE_CONCURRENCY)
+
+        async def _sync(page: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.sync_page(user_id, page["id"], page=page)
+
+        results = await asyncio.gather(*(_sync(page) for page in edited), return_exceptions=True)
+
+        changed = 0
+        failed = 0
+        for page, result in zip(edited, results):
+            if isinstance(result, BaseException):
+                failed += 1
+                logger.error(f"Error syncing Notion page {page['id']} for user {user_id}: {result}")
+            elif result.get("changed"):
+                changed += 1
+
+        deactivated = await self._deactivate_missing_pages(user_id, live_ids) if reconcile else 0
+
+        update: Dict[str, Any] = {"last_sync_at": started_at.isoformat()}
+        if not failed:
+            edit_times = [t for t in (self._parse_time(p.get("last_edited_time")) for p in edited) if t]
+            if edit_times:
+                update["notion_synced_through"] = max(edit_times).isoformat()
+        if reconcile:
+            update["notion_reconciled_at"] = started_at.isoformat()
+        await run_blocking(
+            self.supabase.table("integrations").update(update)
+            .eq("user_id", user_id).eq("provider", "notion").execute
+        )
+
+        logger.info(
+            f"Notion sync for user {user_id}: {len(edited)} edited, {changed} changed, "
+            f"{failed} failed, {deactivated} deactivated"
+        )
+        return {
+            "pages_checked": len(edited),
+            "pages_changed": changed,
+            "pages_failed": failed,
+            "pages_deactivated": deactivated,
+        }
+
+    async def _search_pages_by_edit_time(self, access_token: str):
+        """Yield every page visible to the integration, most recently edited first."""
+        client = get_notion_client()
+        body: Dict[str, Any] = {
+            "filter": {"property": "object", "value": "page"},
+            "sort": {"direction": "descending", "timestamp": "last_edited_time"},
+            "page_size": 100,
+        }
+        while True:
+            data = await client.request(access_token, "POST", "/search", json=body)
+            for page in data.get("results", []):
+                yield page
+            if not data.get("has_more"):
+                return
+            body["start_cursor"] = data["next_cursor"]
+
+    async def _pages_without_active_document(
+        self, user_id: str, pages: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Pages whose stored document is missing or inactive."""
+        active = set()
+        for start in range(0, len(pages), IN_FILTER_CHUNK):
+            page_ids = [page["id"] for page in pages[start:start + IN_FILTER_CHUNK]]
+            result = await run_blocking(
+                self.supabase.table("context_documents")
+                .select("external_id")
+                .eq("user_id", user_id)
+                .eq("is_active", True)
+                .in_("external_id", page_ids)
+                .execute
+            )
+            active.update(row["external_id"] for row in result.data)
+        return [page for page in pages if page["id"] not in active]
+
+    async def _deactivate_missing_pages(self, user_id: str, live_ids: set) -> int:
+        """
+        Deactivate Notion documents whose page no longer shows up in search.
+
+        Returns:
+            Number of documents deactivated
+        """
+        source = await run_blocking(
+            self.supabase.table("knowledge_sources")
+            .select("id")
+            .eq("user_id", user_id)
+            .eq("type", "notion")
+            .execute
+        )
+        if not source.data:
+            return 0
+
+        page_size = settings.CONTEXT_INDEX_PAGE_SIZE
+        missing: List[str] = []
+        offset = 0
+        while True:
+            result = await run_blocking(
+                self.supabase.table("context_documents")
+                .select("id, external_id")
+                .eq("user_id", user_id)
+                .eq("source_id", source.data[0]["id"])
+                .eq("is_active", True)
+                .order("id")
+                .range(offset, offset + page_size - 1)
+                .execute
             )
-            page_data = page_resp.json()
-
-            # Get page blocks (content)
-            blocks_resp = await client.get(
-                f"https://api.notion.com/v1/blocks/{page_id}/children",
-                headers={
-                    "Authorization": f"Bearer {integration['access_token']}",
-                    "Notion-Version": "2022-06-28",
-                },
-                params={"page_size": 100},
+            missing.extend(row["id"] for row in result.data if row["external_id"] not in live_ids)
+            if len(result.data) < page_size:
+                break
+            offset += page_size
+
+        index_service = ContextIndexService()
+        for start in range(0, len(missing), IN_FILTER_CHUNK):
+            doc_ids = missing[start:start + IN_FILTER_CHUNK]
+            await run_blocking(
+                self.supabase.table("context_documents").update({"is_active": False})
+                .in_("id", doc_ids).execute
             )
-            blocks_data = blocks_resp.json()
+            await index_service.delete_sources("document", doc_ids)
 
-        return {"page": page_data, "blocks": blocks_data.get("results", [])}
+        return len(missing)
 
-    async def sync_page(self, user_id: str, page_id: str) -> Dict[str, Any]:
-        """Sync a Notion page to context documents."""
-        content_data = await self.get_page_content(user_id, page_id)
-        page = content_data["page"]
-        blocks = content_data["blocks"]
+    async def get_page_content(self, user_id: str, page_id: str) -> Dict[str, Any]:
+        """
+        Get content of a Notion page.
+
+        "blocks" holds every block in the page, nested ones included, in
+        document order; each has a "depth" key added.
+        """
+        integration = await get_credential_broker().get_integration(user_id, "notion")
+        if not integration:
+            raise Exception("Notion not connected")
+
+        client = get_notion_client()
+        page_data = await self._get_page(integration, page_id)
+        blocks = [
+            {**block, "depth": depth}
+            async for depth, block in client.walk_blocks(integration["access_token"], page_id)
+        ]
+
+        return {"page": page_data, "blocks": blocks}
+
+    async def _get_page(self, integration: Dict, page_id: str) -> Dict[str, Any]:
+        """Get page metadata (title, URL, last_edited_time)."""
+        return await get_notion_client().request(
+            integration["access_token"], "GET", f"/pages/{page_id}"
+        )
+
+    async def sync_page(
+        self, user_id: str, page_id: str, page: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Sync a Notion page to context documents.
+
+        A page object already fetched (e.g. from search) can be passed to
+        skip the /pages request.
+
+        Unchanged pages are skipped without writing: if last_edited_time
+        matches the stored document and the blocks were last read after
+        that minute ended, the blocks aren't even fetched (Notion rounds
+        last_edited_time to the minute, so a read within the same minute
+        may have missed later edits); and if the rendered content hashes to
+        the stored content_hash the upsert is skipped. Not touching the row
+        keeps updated_at (the context indexing watermark) from moving, so
+        unchanged pages cost no embedding calls.
+        The returned document has "changed" set accordingly.
+        """
+        integration = await get_credential_broker().get_integration(user_id, "notion")
+        if not integration:
+            raise Exception("Notion not connected")
+
+        existing = await self._get_existing_document(user_id, page_id)
+
+        if page is None:
+            page = await self._get_page(integration, page_id)
+
+        if existing and self._read_after_edit_minute(existing, page.get("last_edited_time")):
+            logger.debug(f"Notion page {page_id} not edited since last sync, skipping")
+            return {**existing, "changed": False}
 
         # Extract title
         title = self._extract_title(page)
 
-        # Convert blocks to text
-        text_content = self._blocks_to_text(blocks)
+        # Render the full block tree as it streams in
+        checked_at = datetime.now(timezone.utc)
+        text_content = await self._blocks_to_text(
+            get_notion_client().walk_blocks(integration["access_token"], page_id)
+        )
         content_hash = hashlib.sha256(text_content.encode()).hexdigest()
 
+        if (
+            existing
+            and existing.get("content_hash") == content_hash
+            and existing.get("title") == title
+        ):
+            # Edited but rendered the same (e.g. unsupported block types);
+            # only record the edit time and read time so a later sync can
+            # short-circuit
+            await run_blocking(
+                self.supabase.table("context_documents").update({
+                    "source_updated_at": page.get("last_edited_time"),
+                    "source_checked_at": checked_at.isoformat(),
+                }).eq("id", existing["id"]).execute
+            )
+            logger.debug(f"Notion page {page_id} content unchanged, skipping")
+            return {**existing, "changed": False}
+
         # Determine document type based on title/content
         doc_type = self._classify_document(title, text_content)
 
         # Get knowledge source
-        source = (
+        source = await run_blocking(
             self.supabase.table("knowledge_sources")
             .select("id")
             .eq("user_id", user_id)
             .eq("type", "notion")
-            .execute()
+            .execute
         )
         source_id = source.data[0]["id"] if source.data else None
 
@@ -196,14 +419,71 @@ class NotionService:
             "external_id": page_id,
             "external_url": page.get("url"),
             "source_updated_at": page.get("last_edited_time"),
+            "source_checked_at": checked_at.isoformat(),
+            "is_active": True,
         }
 
-        result = self.supabase.table("context_documents").upsert(
-            doc_data, on_conflict="user_id,external_id"
-        ).execute()
+        result = await run_blocking(
+            self.supabase.table("context_documents").upsert(
+                doc_data, on_conflict="user_id,external_id"
+            ).execute
+        )
 
         logger.info(f"Synced Notion page: {title}")
-        return result.data[0] if result.data else doc_data
+        return {**(result.data[0] if result.data else doc_data), "changed": True}
+
+    async def _get_existing_document(self, user_id: str, page_id: str) -> Optional[Dict[str, Any]]:
+        """Get the stored document for a page, if it was synced before."""
+        result = await run_blocking(
+            self.supabase.table("context_documents")
+            .select("id, title, content_hash, source_updated_at, source_checked_at, is_active")
+            .eq("user_id", user_id)
+            .eq("external_id", page_id)
+            .execute
+        )
+        # Inactive documents are re-synced in full so they get re-activated
+        if result.data and result.data[0].get("is_active", True):
+            return result.data[0]
+        return None
+
+    @staticmethod
+    def _parse_time(value: Optional[str]) -> Optional[datetime]:
+        """Parse a stored timestamptz or Notion ISO timestamp."""
+        if not value:
+            return None
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _same_timestamp(stored: Optional[str], current: Optional[str]) -> bool:
+        """Compare a stored timestamptz with a Notion ISO timestamp."""
+        if not stored or not current:
+            return False
+        try:
+            return datetime.fromisoformat(stored.replace("Z", "+00:00")) == datetime.fromisoformat(
+                current.replace("Z", "+00:00")
+            )
+        except ValueError:
+            return False
+
+    @classmethod
+    def _read_after_edit_minute(cls, existing: Dict[str, Any], last_edited_time: Optional[str]) -> bool:
+        """
+        Whether the stored content already reflects every edit up to last_edited_time.
+
+        Notion rounds last_edited_time down to the minute, so an unchanged
+        value only proves the page is unchanged if the previous read
+        happened after that minute was over.
+        """
+        if not cls._same_timestamp(existing.get("source_updated_at"), last_edited_time):
+            return False
+        edited_at = cls._parse_time(last_edited_time)
+        checked_at = cls._parse_time(existing.get("source_checked_at"))
+        if edited_at is None or checked_at is None:
+            return False
+        return checked_at - edited_at >= timedelta(seconds=60)
 
     def _extract_title(self, page: Dict) -> str:
         """Extract title from Notion page."""
@@ -215,26 +495,31 @@ class NotionService:
                     return title_arr[0].get("plain_text", "Untitled")
         return "Untitled"
 
-    def _blocks_to_text(self, blocks: List[Dict]) -> str:
-        """Convert Notion blocks to plain text."""
+    async def _blocks_to_text(self, blocks: AsyncIterator[Tuple[int, Dict]]) -> str:
+        """
+        Convert a stream of (depth, block) pairs to plain text.
+
+        Nested blocks (toggle contents, sub-lists, columns) are indented two
+        spaces per level.
+        """
         lines = []
-        for block in blocks:
+        async for depth, block in blocks:
             block_type = block.get("type")
-            if block_type in ["paragraph", "heading_1", "heading_2", "heading_3"]:
-                rich_text = block.get(block_type, {}).get("rich_text", [])
-                text = "".join(rt.get("plain_text", "") for rt in rich_text)
-                if text:
-                    lines.append(text)
+            rich_text = block.get(block_type, {}).get("rich_text", [])
+            text = "".join(rt.get("plain_text", "") for rt in rich_text)
+            if not text:
+                continue
+
+            indent = "  " * depth
+            if block_type in ["paragraph", "heading_1", "heading_2", "heading_3", "toggle", "quote", "callout"]:
+                lines.append(f"{indent}{text}")
             elif block_type == "bulleted_list_item":
-                rich_text = block.get(block_type, {}).get("rich_text", [])
-                text = "".join(rt.get("plain_text", "") for rt in rich_text)
-                if text:
-                    lines.append(f"• {text}")
+                lines.append(f"{indent}• {text}")
             elif block_type == "numbered_list_item":
-                rich_text = block.get(block_type, {}).get("rich_text", [])
-                text = "".join(rt.get("plain_text", "") for rt in rich_text)
-                if text:
-                    lines.append(f"- {text}")
+                lines.append(f"{indent}- {text}")
+            elif block_type == "to_do":
+                checked = "x" if block.get("to_do", {}).get("checked") else " "
+                lines.append(f"{indent}[{checked}] {text}")
         return "\n".join(lines)
 
     def _classify_document(self, title: str, content: str) -> str:
@@ -252,30 +537,30 @@ class NotionService:
             return "meeting_notes"
         return "general"
 
-    def _get_integration(self, user_id: str) -> Optional[Dict]:
-        """Get Notion integration for user."""
-        result = (
+    async def _get_integration(self, user_id: str) -> Optional[Dict]:
+        """Get the full Notion integration row (uncached, for status)."""
+        result = await run_blocking(
             self.supabase.table("integrations")
             .select("*")
             .eq("user_id", user_id)
             .eq("provider", "notion")
             .eq("is_active", True)
-            .execute()
+            .execute
         )
         return result.data[0] if result.data else None
 
-    def get_connection_status(self, user_id: str) -> Dict[str, Any]:
+    async def get_connection_status(self, user_id: str) -> Dict[str, Any]:
         """Get Notion connection status."""
-        integration = self._get_integration(user_id)
+        integration = await self._get_integration(user_id)
         if not integration:
             return {"connected": False}
 
-        source = (
+        source = await run_blocking(
             self.supabase.table("knowledge_sources")
             .select("*")
             .eq("user_id", user_id)
             .eq("type", "notion")
-            .execute()
+            .execute
         )
 
         return {
@@ -286,13 +571,15 @@ class NotionService:
 
     async def disconnect(self, user_id: str) -> bool:
         """Disconnect Notion integration."""
-        self.supabase.table("integrations").update({"is_active": False}).eq(
+        await run_blocking(self.supabase.table("integrations").update({"is_active": False}).eq(
             "user_id", user_id
-        ).eq("provider", "notion").execute()
+        ).eq("provider", "notion").execute)
 
-        self.supabase.table("knowledge_sources").update({"status": "disconnected"}).eq(
+        await run_blocking(self.supabase.table("knowledge_sources").update({"status": "disconnected"}).eq(
             "user_id", user_id
-        ).eq("type", "notion").execute()
+        ).eq("type", "notion").execute)
+
+        get_credential_broker().invalidate(user_id, "notion")
 
         logger.info(f"Disconnected Notion for user {user_id}")
         return True
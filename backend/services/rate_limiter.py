@@ -0,0 +1,55 @@
+"""Token bucket rate limiting and token keys shared by the API clients."""
+
+import asyncio
+import hashlib
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket limiter for one API token (or token and method).
+
+    Refills at a fixed requests-per-second rate up to a burst capacity, and
+    can be paused for a server-provided Retry-After period.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0  # set from Retry-After
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> float:
+        """
+        Wait for a request slot.
+
+        Returns:
+            Seconds spent waiting
+        """
+        waited = 0.0
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    delay = self.blocked_until - now
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                    self.updated_at = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return waited
+                    delay = (1 - self.tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+
+    def block_for(self, seconds: float):
+        """Pause requests after a 429 for the Retry-After period."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+
+def token_key(access_token: str) -> str:
+    """SHA-256 of an access token, for keying per-token state without holding the token."""
+    return hashlib.sha256(access_token.encode("utf-8")).hexdigest()
@@ -2,7 +2,8 @@
 Scheduler service for automated background jobs.
 
 This service handles:
-1. 30-minute sync loop (Gmail + Calendar)
+1. 30-minute sync loop (Gmail + Calendar + Linear, concurrent per user)
+   and separate Slack and Notion workspace syncs
 2. Daily brief generation (7am)
 3. Embedding generation (background)
 4. Retry logic for failed jobs
@@ -11,7 +12,7 @@ This service handles:
 import logging
 import asyncio
 from datetime import datetime, time, timezone
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Set, Coroutine
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
@@ -22,8 +23,15 @@ from database.client import get_supabase_client
 from services.gmail_service import GmailService
 from services.calendar_service import CalendarService
 from services.linear_service import LinearService
+from services.slack_service import SlackService
+from services.notion_service import NotionService
 from services.agent_service import AgentService
 from services.embedding_service import EmbeddingService
+from services.email_embedding_service import EmailEmbeddingService
+from services.context_index_service import ContextIndexService
+from services.credential_broker import get_credential_broker
+from services.google_client_factory import get_google_client_factory
+from services.executor_service import run_blocking
 
 logger = logging.getLogger(__name__)
 
@@ -38,11 +46,28 @@ class SchedulerService:
         self.gmail_service = GmailService()
         self.calendar_service = CalendarService()
         self.linear_service = LinearService()
+        self.slack_service = SlackService()
+        self.notion_service = NotionService()
         self.agent_service = AgentService()
         self.embedding_service = EmbeddingService()
+        self.email_embedding_service = EmailEmbeddingService()
+        self.context_index_service = ContextIndexService()
+        # Fire-and-forget tasks; the event loop only keeps weak references
+        self._tasks: Set[asyncio.Task] = set()
         
         # Job execution tracking
         self.job_stats: Dict[str, Dict[str, Any]] = {}
+
+        # Concurrency limits for the sync job: a global cap on users in
+        # flight, plus per-provider caps shared across all users
+        self.user_semaphore = asyncio.Semaphore(settings.SYNC_MAX_CONCURRENT_USERS)
+        self.provider_semaphores: Dict[str, asyncio.Semaphore] = {
+            "gmail": asyncio.Semaphore(settings.SYNC_GMAIL_CONCURRENCY),
+            "calendar": asyncio.Semaphore(settings.SYNC_CALENDAR_CONCURRENCY),
+            "linear": asyncio.Semaphore(settings.SYNC_LINEAR_CONCURRENCY),
+            "slack": asyncio.Semaphore(settings.SYNC_SLACK_CONCURRENCY),
+            "notion": asyncio.Semaphore(settings.SYNC_NOTION_CONCURRENCY),
+        }
         
         # Add event listeners
         self.scheduler.add_listener(
@@ -82,6 +107,30 @@ class SchedulerService:
             misfire_grace_time=300  # 5 minutes grace period
         )
         logger.info("✅ Registered sync job (every 30 minutes)")
+
+        # Slack workspace sync (all joined channels)
+        self.scheduler.add_job(
+            self._sync_slack_all_users,
+            trigger=IntervalTrigger(minutes=settings.SLACK_SYNC_INTERVAL_MINUTES),
+            id="sync_slack_all_users",
+            name="Sync Slack channels for all users",
+            replace_existing=True,
+            max_instances=1,
+            misfire_grace_time=300
+        )
+        logger.info(f"✅ Registered Slack sync job (every {settings.SLACK_SYNC_INTERVAL_MINUTES} minutes)")
+
+        # Notion workspace sync (pages edited since the last run)
+        self.scheduler.add_job(
+            self._sync_notion_all_users,
+            trigger=IntervalTrigger(minutes=settings.NOTION_SYNC_INTERVAL_MINUTES),
+            id="sync_notion_all_users",
+            name="Sync Notion pages for all users",
+            replace_existing=True,
+            max_instances=1,
+            misfire_grace_time=300
+        )
+        logger.info(f"✅ Registered Notion sync job (every {settings.NOTION_SYNC_INTERVAL_MINUTES} minutes)")
     
     def _register_brief_jobs(self):
         """Register daily brief generation jobs."""
@@ -104,64 +153,90 @@ class SchedulerService:
 
         This job runs every 30 minutes and:
         1. Fetches all active users with integrations
-        2. Syncs Gmail, Calendar, and Linear for each user
+        2. Syncs users concurrently (bounded by SYNC_MAX_CONCURRENT_USERS),
+           running Gmail, Calendar, and Linear in parallel for each user
         3. Generates embeddings in background
-        4. Handles errors gracefully (continues on failure)
+        4. Handles errors gracefully (one failing user never fails the job)
         """
         logger.info("🔄 Starting sync for all users...")
         start_time = datetime.now(timezone.utc)
+        client_factory = get_google_client_factory()
+        setup_before = (client_factory.leases, client_factory.builds, client_factory.setup_seconds)
         
         try:
             # Get all active users with Gmail integration
-            result = self.supabase.table("integrations").select(
+            result = await run_blocking(self.supabase.table("integrations").select(
                 "user_id, provider"
-            ).eq("is_active", True).eq("provider", "gmail").execute()
+            ).eq("is_active", True).eq("provider", "gmail").execute)
             
             users = result.data
             logger.info(f"Found {len(users)} users with active integrations")
             
-            success_count = 0
-            error_count = 0
-            
-            for user_data in users:
-                user_id = user_data["user_id"]
-
-                try:
-                    # Sync Gmail
-                    await self._sync_user_gmail(user_id)
-
-                    # Sync Calendar
-                    await self._sync_user_calendar(user_id)
-
-                    # Sync Linear (if connected)
-                    await self._sync_user_linear(user_id)
-
-                    success_count += 1
-                    logger.info(f"✅ Synced user {user_id}")
+            results = await asyncio.gather(
+                *(self._sync_user(user_data["user_id"]) for user_data in users),
+                return_exceptions=True
+            )
 
-                except Exception as e:
-                    error_count += 1
-                    logger.error(f"❌ Error syncing user {user_id}: {e}")
-                    # Continue to next user (don't fail entire job)
-                    continue
+            success_count = sum(1 for r in results if not isinstance(r, BaseException))
+            error_count = len(results) - success_count
             
             duration = (datetime.now(timezone.utc) - start_time).total_seconds()
+            users_per_second = len(users) / duration if duration > 0 else 0.0
             logger.info(
                 f"✅ Sync complete: {success_count} succeeded, {error_count} failed "
-                f"(took {duration:.2f}s)"
+                f"(took {duration:.2f}s, {users_per_second:.2f} users/s)"
             )
             
+            # Google client setup (discovery + transport) this run
+            leases = client_factory.leases - setup_before[0]
+            builds = client_factory.builds - setup_before[1]
+            setup_seconds = client_factory.setup_seconds - setup_before[2]
+
             # Update job stats
             self.job_stats["sync_all_users"] = {
                 "last_run": start_time.isoformat(),
                 "duration_seconds": duration,
                 "success_count": success_count,
-                "error_count": error_count
+                "error_count": error_count,
+                "users_per_second": users_per_second,
+                "max_concurrent_users": settings.SYNC_MAX_CONCURRENT_USERS,
+                "google_clients_built": builds,
+                "google_clients_reused": leases - builds,
+                "google_setup_ms_per_user": setup_seconds * 1000 / len(users) if users else 0.0,
             }
             
         except Exception as e:
             logger.error(f"❌ Fatal error in sync job: {e}")
             raise
+
+    async def _sync_user(self, user_id: str):
+        """
+        Sync all providers for a single user.
+
+        Gmail, Calendar, and Linear run in parallel. A Gmail or Calendar
+        failure marks the user as failed once all providers have finished;
+        Linear failures are swallowed by _sync_user_linear.
+
+        Args:
+            user_id: User ID
+        """
+        async with self.user_semaphore:
+            results = await asyncio.gather(
+                self._sync_user_gmail(user_id),
+                self._sync_user_calendar(user_id),
+                self._sync_user_linear(user_id),
+                return_exceptions=True
+            )
+
+        # Index whatever landed, even if one provider failed (don't wait)
+        self._spawn(self._index_context_for_user(user_id))
+
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            logger.error(f"❌ Error syncing user {user_id}: {errors[0]}")
+            raise errors[0]
+
+        logger.info(f"✅ Synced user {user_id}")
     
     async def _sync_user_gmail(self, user_id: str, max_retries: int = 3):
         """
@@ -173,15 +248,16 @@ class SchedulerService:
         """
         for attempt in range(max_retries):
             try:
-                synced_emails = await self.gmail_service.sync_emails(
-                    user_id=user_id,
-                    days_back=1,  # Only sync last 24 hours
-                    max_results=100
-                )
+                async with self.provider_semaphores["gmail"]:
+                    synced_emails = await self.gmail_service.sync_emails(
+                        user_id=user_id,
+                        days_back=1,  # Only sync last 24 hours
+                        max_results=100
+                    )
                 
                 # Generate embeddings in background (don't wait)
                 if synced_emails:
-                    asyncio.create_task(self._generate_embeddings_for_user(user_id))
+                    self._spawn(self._generate_embeddings_for_user(user_id))
                 
                 logger.debug(f"Synced {len(synced_emails)} emails for user {user_id}")
                 return synced_emails
@@ -208,11 +284,12 @@ class SchedulerService:
         """
         for attempt in range(max_retries):
             try:
-                synced_events = await self.calendar_service.sync_calendar(
-                    user_id=user_id,
-                    days_forward=7,  # Next 7 days
-                    days_back=1  # Last 24 hours
-                )
+                async with self.provider_semaphores["calendar"]:
+                    synced_events = await self.calendar_service.sync_calendar(
+                        user_id=user_id,
+                        days_forward=7,  # Next 7 days
+                        days_back=1  # Last 24 hours
+                    )
                 
                 logger.debug(f"Synced {len(synced_events)} events for user {user_id}")
                 return synced_events
@@ -238,28 +315,20 @@ class SchedulerService:
             max_retries: Maximum number of retry attempts
         """
         # Check if user has Linear integration
-        result = self.supabase.table("integrations").select("id").eq(
-            "user_id", user_id
-        ).eq("provider", "linear").eq("is_active", True).execute()
-
-        if not result.data:
+        if not await get_credential_broker().get_integration(user_id, "linear"):
             # User doesn't have Linear connected, skip silently
             return []
 
         for attempt in range(max_retries):
             try:
-                # Sync issues
-                synced_issues = await self.linear_service.sync_issues(
-                    user_id=user_id,
-                    days_back=7,  # Last 7 days
-                    max_results=100
-                )
-
-                # Sync projects
-                synced_projects = await self.linear_service.sync_projects(
-                    user_id=user_id,
-                    max_results=50
-                )
+                async with self.provider_semaphores["linear"]:
+                    # Issues and projects share round-trips
+                    synced = await self.linear_service.sync_workspace(
+                        user_id=user_id,
+                        issues_page_size=100,
+                        projects_page_size=50
+                    )
+                synced_issues, synced_projects = synced["issues"], synced["projects"]
 
                 logger.debug(
                     f"Synced {len(synced_issues)} issues and {len(synced_projects)} projects "
@@ -280,6 +349,168 @@ class SchedulerService:
                     # Don't raise - Linear is optional, continue with other syncs
                     return []
 
+    async def _sync_slack_all_users(self):
+        """
+        Sync all joined Slack channels for every user with Slack connected.
+
+        Users run concurrently under the shared user semaphore and the
+        "slack" provider semaphore; channels within a user are synced by
+        SlackService.sync_workspace. Users with new messages get their
+        Slack context re-indexed in the background.
+        """
+        logger.info("🔄 Starting Slack sync for all users...")
+        start_time = datetime.now(timezone.utc)
+
+        try:
+            result = await run_blocking(self.supabase.table("integrations").select(
+                "user_id"
+            ).eq("is_active", True).eq("provider", "slack").execute)
+
+            users = result.data
+            logger.info(f"Found {len(users)} users with Slack connected")
+
+            results = await asyncio.gather(
+                *(self._sync_user_slack(user_data["user_id"]) for user_data in users),
+                return_exceptions=True
+            )
+
+            success_count = sum(1 for r in results if not isinstance(r, BaseException))
+            error_count = len(results) - success_count
+            messages_synced = sum(r for r in results if not isinstance(r, BaseException))
+
+            duration = (datetime.now(timezone.utc) - start_time).total_seconds()
+            logger.info(
+                f"✅ Slack sync complete: {success_count} succeeded, {error_count} failed, "
+                f"{messages_synced} messages (took {duration:.2f}s)"
+            )
+
+            self.job_stats["sync_slack_all_users"] = {
+                "last_run": start_time.isoformat(),
+                "duration_seconds": duration,
+                "success_count": success_count,
+                "error_count": error_count,
+                "messages_synced": messages_synced,
+            }
+
+        except Exception as e:
+            logger.error(f"❌ Fatal error in Slack sync job: {e}")
+            raise
+
+    async def _sync_user_slack(self, user_id: str) -> int:
+        """
+        Sync all joined Slack channels for a single user.
+
+        Rate limiting is handled by the Slack client (tier pacing and
+        Retry-After), so there is no retry loop here.
+
+        Args:
+            user_id: User ID
+
+        Returns:
+            Number of new or changed messages
+        """
+        async with self.user_semaphore:
+            async with self.provider_semaphores["slack"]:
+                try:
+                    count = await self.slack_service.sync_workspace(user_id)
+                except Exception as e:
+                    logger.error(f"❌ Slack sync failed for user {user_id}: {e}")
+                    raise
+
+        if count:
+            self._spawn(self._index_slack_for_user(user_id))
+        return count
+
+    async def _index_slack_for_user(self, user_id: str):
+        """
+        Index newly synced Slack messages.
+
+        Args:
+            user_id: User ID
+        """
+        await self._index_context_for_user(user_id, ["slack_message"])
+
+    async def _sync_notion_all_users(self):
+        """
+        Sync edited Notion pages for every user with Notion connected.
+
+        Users run concurrently under the shared user semaphore and the
+        "notion" provider semaphore. Users with changed pages get their
+        documents re-indexed in the background.
+        """
+        logger.info("🔄 Starting Notion sync for all users...")
+        start_time = datetime.now(timezone.utc)
+
+        try:
+            result = await run_blocking(self.supabase.table("integrations").select(
+                "user_id"
+            ).eq("is_active", True).eq("provider", "notion").execute)
+
+            users = result.data
+            logger.info(f"Found {len(users)} users with Notion connected")
+
+            results = await asyncio.gather(
+                *(self._sync_user_notion(user_data["user_id"]) for user_data in users),
+                return_exceptions=True
+            )
+
+            succeeded = [r for r in results if not isinstance(r, BaseException)]
+            success_count = len(succeeded)
+            error_count = len(results) - success_count
+            pages_changed = sum(r["pages_changed"] for r in succeeded)
+            pages_deactivated = sum(r["pages_deactivated"] for r in succeeded)
+
+            duration = (datetime.now(timezone.utc) - start_time).total_seconds()
+            logger.info(
+                f"✅ Notion sync complete: {success_count} succeeded, {error_count} failed, "
+                f"{pages_changed} pages changed, {pages_deactivated} deactivated (took {duration:.2f}s)"
+            )
+
+            self.job_stats["sync_notion_all_users"] = {
+                "last_run": start_time.isoformat(),
+                "duration_seconds": duration,
+                "success_count": success_count,
+                "error_count": error_count,
+                "pages_changed": pages_changed,
+                "pages_deactivated": pages_deactivated,
+            }
+
+        except Exception as e:
+            logger.error(f"❌ Fatal error in Notion sync job: {e}")
+            raise
+
+    async def _sync_user_notion(self, user_id: str) -> Dict[str, Any]:
+        """
+        Sync edited Notion pages for a single user.
+
+        Args:
+            user_id: User ID
+
+        Returns:
+            Sync counts from NotionService.sync_workspace
+        """
+        async with self.user_semaphore:
+            async with self.provider_semaphores["notion"]:
+                try:
+                    counts = await self.notion_service.sync_workspace(user_id)
+                except Exception as e:
+                    logger.error(f"❌ Notion sync failed for user {user_id}: {e}")
+                    raise
+
+        # Deactivated pages already had their chunks removed
+        if counts["pages_changed"]:
+            self._spawn(self._index_documents_for_user(user_id))
+        return counts
+
+    async def _index_documents_for_user(self, user_id: str):
+        """
+        Index changed Notion documents.
+
+        Args:
+            user_id: User ID
+        """
+        await self._index_context_for_user(user_id, ["document"])
+
     async def _generate_embeddings_for_user(self, user_id: str):
         """
         Generate embeddings for emails without embeddings.
@@ -288,40 +519,32 @@ class SchedulerService:
             user_id: User ID
         """
         try:
-            # Get emails without embeddings
-            result = self.supabase.table("emails").select("*").eq(
-                "user_id", user_id
-            ).is_("content_embedding", "null").execute()
-            
-            emails = result.data
-            
-            if not emails:
-                return
-            
-            logger.info(f"Generating embeddings for {len(emails)} emails (user {user_id})")
-            
-            for email in emails:
-                try:
-                    # Generate embedding
-                    embedding = self.embedding_service.embed_email(
-                        subject=email.get('subject', ''),
-                        body=email.get('body_text', ''),
-                        from_email=email.get('from_email', '')
-                    )
-                    
-                    # Update email with embedding
-                    self.supabase.table("emails").update({
-                        "content_embedding": embedding
-                    }).eq("id", email["id"]).execute()
-                    
-                except Exception as e:
-                    logger.error(f"Error generating embedding for email {email['id']}: {e}")
-                    continue
-            
-            logger.info(f"✅ Generated embeddings for {len(emails)} emails (user {user_id})")
-            
+            await self.email_embedding_service.backfill_user(user_id)
         except Exception as e:
             logger.error(f"Error in embedding generation for user {user_id}: {e}")
+
+    def _spawn(self, coro: Coroutine[Any, Any, Any]) -> asyncio.Task:
+        """Run a coroutine in the background, keeping it referenced until done."""
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _index_context_for_user(self, user_id: str, source_types: Optional[List[str]] = None):
+        """
+        Chunk and embed newly synced data into context_embeddings.
+
+        Overlapping runs for the same user are coalesced by
+        ContextIndexService.index_user.
+
+        Args:
+            user_id: User ID
+            source_types: Sources to index (defaults to all)
+        """
+        try:
+            await self.context_index_service.index_user(user_id, source_types)
+        except Exception as e:
+            logger.error(f"Error indexing context for user {user_id}: {e}")
     
     async def _generate_briefs_for_all_users(self):
         """
@@ -337,7 +560,7 @@ class SchedulerService:
         
         try:
             # Get all active users
-            result = self.supabase.table("users").select("id").eq("is_active", True).execute()
+            result = await run_blocking(self.supabase.table("users").select("id").eq("is_active", True).execute)
             
             users = result.data
             logger.info(f"Found {len(users)} active users")
@@ -0,0 +1,309 @@
+"""Shared async client for the Slack Web API with a metadata cache."""
+
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+
+from config import settings
+from services.rate_limiter import TokenBucket, token_key
+
+logger = logging.getLogger(__name__)
+
+SLACK_API_URL = "https://slack.com/api"
+
+# Requests per minute for Slack's rate-limit tiers
+SLACK_TIER_LIMITS = {1: 1, 2: 20, 3: 50, 4: 100}
+
+# Tier of each Web API method we call; unlisted methods are treated as Tier 3
+SLACK_METHOD_TIERS = {
+    "conversations.list": 2,
+    "users.list": 2,
+    "conversations.history": 3,
+    "conversations.info": 3,
+    "users.conversations": 3,
+    "users.info": 4,
+    "chat.postMessage": 4,  # Really ~1/s per channel; never throttled in bulk
+}
+
+
+class SlackClient:
+    """
+    Pooled client for the Slack Web API.
+
+    One keep-alive connection pool is shared by every Slack call. Calls are
+    paced per token and method according to Slack's rate-limit tiers, and
+    HTTP 429 responses are retried after their Retry-After delay. Channel
+    names and the workspace user directory (users.list) are cached per token
+    for SLACK_METADATA_TTL_SECONDS, so syncs don't re-fetch them and
+    messages get a user_name even when Slack omits it.
+    """
+
+    def __init__(self):
+        self.http = httpx.AsyncClient(
+            base_url=SLACK_API_URL,
+            http2=True,
+            timeout=httpx.Timeout(settings.SLACK_HTTP_TIMEOUT_SECONDS),
+            limits=httpx.Limits(
+                max_connections=settings.SLACK_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.SLACK_HTTP_MAX_CONNECTIONS,
+            ),
+        )
+        self.metadata_ttl = settings.SLACK_METADATA_TTL_SECONDS
+
+        # (token key, kind, id) -> (expires_at, value)
+        self._cache: Dict[Tuple[str, str, str], Tuple[float, Any]] = {}
+        self._locks: Dict[Tuple[str, str, str], asyncio.Lock] = {}
+        self._limiters: Dict[Tuple[str, str], TokenBucket] = {}
+
+        self.requests = 0
+        self.rate_limited = 0
+        self.throttle_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    async def call(
+        self,
+        access_token: str,
+        method: str,
+        params: Optional[Dict[str, Any]] = None,
+        json: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Call a Web API method.
+
+        GET with query params, or POST when a JSON body is given. Slack
+        reports most failures as {"ok": false}, which is returned as-is for
+        the caller to check.
+
+        Args:
+            access_token: Slack token
+            method: API method, e.g. "conversations.history"
+            params: Query parameters
+            json: JSON body
+
+        Returns:
+            Parsed response body
+        """
+        headers = {"Authorization": f"Bearer {access_token}"}
+        limiter = self._get_limiter(access_token, method)
+
+        for attempt in range(settings.SLACK_MAX_RETRIES):
+            self.throttle_seconds += await limiter.acquire()
+
+            if json is not None:
+                response = await self.http.post(f"/{method}", headers=headers, json=json)
+            else:
+                response = await self.http.get(f"/{method}", headers=headers, params=params)
+            self.requests += 1
+
+            if response.status_code != 429:
+                return response.json()
+
+            self.rate_limited += 1
+            retry_after = float(response.headers.get("Retry-After", 2 ** attempt))
+            logger.warning(
+                f"Slack {method} rate limited (attempt {attempt + 1}/{settings.SLACK_MAX_RETRIES}), "
+                f"retrying in {retry_after:.0f}s"
+            )
+            limiter.block_for(retry_after)
+
+        return {"ok": False, "error": "ratelimited"}
+
+    async def post_form(self, method: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        POST form-encoded data without a token (used for oauth.v2.access).
+
+        Args:
+            method: API method
+            data: Form fields
+
+        Returns:
+            Parsed response body
+        """
+        response = await self.http.post(f"/{method}", data=data)
+        self.requests += 1
+        return response.json()
+
+    async def paginate(
+        self, access_token: str, method: str, params: Dict[str, Any]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield each page of a cursor-paginated method.
+
+        Stops after the last page or the first {"ok": false} response,
+        which is logged.
+
+        Args:
+            access_token: Slack token
+            method: API method
+            params: Query parameters (without cursor)
+        """
+        params = dict(params)
+        while True:
+            data = await self.call(access_token, method, params=params)
+            if not data.get("ok"):
+                logger.error(f"Slack {method} failed: {data.get('error')}")
+                return
+
+            yield data
+
+            cursor = data.get("response_metadata", {}).get("next_cursor")
+            if not cursor:
+                return
+            params["cursor"] = cursor
+
+    async def get_channel_name(self, access_token: str, channel_id: str) -> str:
+        """
+        Get a channel's name (cached).
+
+        Args:
+            access_token: Slack token
+            channel_id: Channel ID
+
+        Returns:
+            Channel name, or the ID if it can't be resolved
+        """
+
+        async def _load():
+            data = await self.call(access_token, "conversations.info", params={"channel": channel_id})
+            if data.get("ok"):
+                return data.get("channel", {}).get("name", channel_id)
+            return None
+
+        name = await self._cached(access_token, "channel", channel_id, _load)
+        return name or channel_id
+
+    async def get_user_names(self, access_token: str) -> Dict[str, str]:
+        """
+        Get the workspace directory as user ID -> display name (cached).
+
+        Args:
+            access_token: Slack token
+
+        Returns:
+            Mapping of Slack user ID to name
+        """
+
+        async def _load():
+            names: Dict[str, str] = {}
+            async for page in self.paginate(access_token, "users.list", {"limit": 200}):
+                for member in page.get("members", []):
+                    names[member["id"]] = self._display_name(member)
+            return names
+
+        return await self._cached(access_token, "users", "", _load) or {}
+
+    async def resolve_user_names(
+        self, access_token: str, user_ids: List[str]
+    ) -> Dict[str, str]:
+        """
+        Resolve user IDs to names.
+
+        IDs missing from the cached directory (e.g. users who joined after it
+        was loaded) are looked up with users.info and added to it.
+
+        Args:
+            access_token: Slack token
+            user_ids: Slack user IDs
+
+        Returns:
+            Mapping of resolvable IDs to names
+        """
+        names = await self.get_user_names(access_token)
+        for user_id in {u for u in user_ids if u and u not in names}:
+            data = await self.call(access_token, "users.info", params={"user": user_id})
+            if data.get("ok"):
+                names[user_id] = self._display_name(data["user"])
+        return {user_id: names[user_id] for user_id in user_ids if user_id in names}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get request and metadata cache counters.
+
+        Returns:
+            Dictionary of counters
+        """
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "requests": self.requests,
+            "rate_limited": self.rate_limited,
+            "throttle_seconds": round(self.throttle_seconds, 3),
+            "cached_entries": len(self._cache),
+            "metadata_cache_hits": self.cache_hits,
+            "metadata_cache_misses": self.cache_misses,
+            "metadata_cache_hit_rate": self.cache_hits / lookups if lookups else 0.0,
+        }
+
+    async def close(self):
+        """Close pooled connections."""
+        await self.http.aclose()
+        logger.info("✅ Slack client closed")
+
+    async def _cached(self, access_token: str, kind: str, key: str, loader):
+        """
+        Return a cached value, loading it at most once concurrently.
+
+        None results aren't cached so failed lookups are retried.
+        """
+        cache_key = (token_key(access_token), kind, key)
+
+        entry = self._cache.get(cache_key)
+        if entry and entry[0] > time.monotonic():
+            self.cache_hits += 1
+            return entry[1]
+
+        lock = self._locks.setdefault(cache_key, asyncio.Lock())
+        async with lock:
+            # Another caller may have loaded it while we waited
+            entry = self._cache.get(cache_key)
+            if entry and entry[0] > time.monotonic():
+                self.cache_hits += 1
+                return entry[1]
+
+            self.cache_misses += 1
+            value = await loader()
+            if value is not None:
+                self._cache[cache_key] = (time.monotonic() + self.metadata_ttl, value)
+            return value
+
+    def _get_limiter(self, access_token: str, method: str) -> TokenBucket:
+        """Get the limiter for a token and method, creating it on first use."""
+        key = (token_key(access_token), method)
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            tier = SLACK_METHOD_TIERS.get(method, 3)
+            limiter = TokenBucket(SLACK_TIER_LIMITS[tier] / 60.0, burst=settings.SLACK_RATE_LIMIT_BURST)
+            self._limiters[key] = limiter
+        return limiter
+
+    @staticmethod
+    def _display_name(member: Dict[str, Any]) -> str:
+        """Best available human-readable name for a Slack user."""
+        profile = member.get("profile", {})
+        return (
+            profile.get("display_name")
+            or profile.get("real_name")
+            or member.get("real_name")
+            or member.get("name")
+            or member["id"]
+        )
+
+
+# Global client instance
+_slack_client: Optional[SlackClient] = None
+
+
+def get_slack_client() -> SlackClient:
+    """
+    Get the global Slack client instance.
+
+    Returns:
+        SlackClient instance
+    """
+    global _slack_client
+    if _slack_client is None:
+        _slack_client = SlackClient()
+    return _slack_client
@@ -0,0 +1,166 @@
+"""In-process queue for Slack Events API deliveries."""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+EventHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# submit() outcomes
+QUEUED = "queued"
+DUPLICATE = "duplicate"
+DROPPED = "dropped"
+
+
+class SlackEventQueue:
+    """
+    Decouples acknowledging Slack events from processing them.
+
+    Slack expects a response within 3 seconds and re-delivers the event
+    otherwise, so the webhook only verifies, de-duplicates and enqueues;
+    a small pool of workers started on first use runs the handlers.
+    Re-deliveries (same event_id) seen within SLACK_EVENT_DEDUP_TTL_SECONDS
+    are dropped.
+    """
+
+    def __init__(self, max_size: int, workers: int, dedup_ttl: float):
+        self.max_size = max_size
+        self.worker_count = workers
+        self.dedup_ttl = dedup_ttl
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        # event_id -> expires_at, oldest first
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+
+        self.received = 0
+        self.duplicates = 0
+        self.dropped = 0
+        self.processed = 0
+        self.failed = 0
+
+    def submit(self, payload: Dict[str, Any], handler: EventHandler) -> str:
+        """
+        Enqueue an event callback for background processing.
+
+        Args:
+            payload: Event callback body from Slack
+            handler: Coroutine function called with the payload
+
+        Returns:
+            QUEUED, DUPLICATE (already seen, safe to ack) or DROPPED (queue
+            full; the caller should answer with an error so Slack retries)
+        """
+        self.received += 1
+
+        event_id = payload.get("event_id")
+        if event_id and self._is_duplicate(event_id):
+            self.duplicates += 1
+            logger.debug(f"Skipping duplicate Slack event {event_id}")
+            return DUPLICATE
+
+        self._ensure_workers()
+        try:
+            self._queue.put_nowait((handler, payload))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning(f"⚠️  Slack event queue full, dropping event {event_id}")
+            # Let Slack's retry deliver it again
+            if event_id:
+                self._seen.pop(event_id, None)
+            return DROPPED
+        return QUEUED
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get queue counters.
+
+        Returns:
+            Dictionary of counters
+        """
+        return {
+            "received": self.received,
+            "duplicates": self.duplicates,
+            "dropped": self.dropped,
+            "processed": self.processed,
+            "failed": self.failed,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "workers": len(self._workers),
+        }
+
+    async def close(self, timeout: float = 10.0):
+        """Drain queued events (up to timeout) and stop the workers."""
+        if self._queue is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"⚠️  {self._queue.qsize()} Slack events still queued at shutdown")
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info("✅ Slack event queue closed")
+
+    def _is_duplicate(self, event_id: str) -> bool:
+        """Check and record an event_id, expiring old entries."""
+        now = time.monotonic()
+        while self._seen:
+            if next(iter(self._seen.values())) > now:
+                break
+            self._seen.popitem(last=False)
+
+        if event_id in self._seen:
+            return True
+        self._seen[event_id] = now + self.dedup_ttl
+        return False
+
+    def _ensure_workers(self):
+        """Start the queue and workers on the running event loop."""
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._worker(), name=f"slack-events-{i}")
+                for i in range(self.worker_count)
+            ]
+
+    async def _worker(self):
+        """Run handlers for queued events until cancelled."""
+        while True:
+            handler, payload = await self._queue.get()
+            try:
+                await handler(payload)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"❌ Error processing Slack event {payload.get('event_id')}: {e}")
+            finally:
+                self._queue.task_done()
+
+
+# Global queue instance
+_slack_event_queue: Optional[SlackEventQueue] = None
+
+
+def get_slack_event_queue() -> SlackEventQueue:
+    """
+    Get the global Slack event queue instance.
+
+    Returns:
+        SlackEventQueue instance
+    """
+    global _slack_event_queue
+    if _slack_event_queue is None:
+        _slack_event_queue = SlackEventQueue(
+            max_size=settings.SLACK_EVENT_QUEUE_SIZE,
+            workers=settings.SLACK_EVENT_WORKERS,
+            dedup_ttl=settings.SLACK_EVENT_DEDUP_TTL_SECONDS,
+        )
+    return _slack_event_queue
@@ -0,0 +1,166 @@
+"""Micro-batching writer for Slack messages received through the Events API."""
+
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from config import settings
+from services.bulk_upsert import bulk_upsert
+from services.context_index_service import ContextIndexService
+from services.credential_broker import get_credential_broker
+from services.slack_client import get_slack_client
+from services.slack_service import SlackService
+
+logger = logging.getLogger(__name__)
+
+
+class SlackMessageWriter:
+    """
+    Buffers channel message events and writes them in batches.
+
+    A batch is flushed when SLACK_EVENT_BATCH_SIZE messages are buffered or
+    SLACK_EVENT_FLUSH_MS after the first message arrived, whichever comes
+    first. Each flush does one bulk upsert into slack_messages and indexes
+    the new messages for Q&A in the background. Channel sync watermarks are
+    left to the polling sync, so it still recovers events that were dropped
+    or missed (e.g. during a deploy); messages it re-reads are unchanged
+    rows and are not rewritten.
+    """
+
+    def __init__(self, batch_size: int, flush_ms: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000
+        self.slack_service = SlackService()
+        self.context_index_service = ContextIndexService()
+
+        # (user_id, channel_id, message event)
+        self._buffer: List[Tuple[str, str, Dict[str, Any]]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._index_tasks: Set[asyncio.Task] = set()
+
+        self.received = 0
+        self.flushes = 0
+        self.written = 0
+        self.failed = 0
+
+    async def add(self, user_id: str, channel_id: str, message: Dict[str, Any]):
+        """
+        Buffer a message event, flushing if the batch is full.
+
+        Args:
+            user_id: User who connected the workspace
+            channel_id: Slack channel ID
+            message: The "message" event payload
+        """
+        self.received += 1
+        self._buffer.append((user_id, channel_id, message))
+
+        if len(self._buffer) >= self.batch_size:
+            await self.flush()
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def flush(self):
+        """Write everything buffered so far."""
+        async with self._flush_lock:
+            batch, self._buffer = self._buffer, []
+            if not batch:
+                return
+
+            self.flushes += 1
+            by_user: Dict[str, List[Tuple[str, Dict[str, Any]]]] = defaultdict(list)
+            for user_id, channel_id, message in batch:
+                by_user[user_id].append((channel_id, message))
+
+            for user_id, messages in by_user.items():
+                try:
+                    self.written += await self._write_user(user_id, messages)
+                except Exception as e:
+                    self.failed += len(messages)
+                    logger.error(f"❌ Failed to write {len(messages)} Slack messages for user {user_id}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get batching counters.
+
+        Returns:
+            Dictionary of counters
+        """
+        return {
+            "received": self.received,
+            "flushes": self.flushes,
+            "written": self.written,
+            "failed": self.failed,
+            "buffered": len(self._buffer),
+            "avg_batch_size": self.received / self.flushes if self.flushes else 0.0,
+        }
+
+    async def close(self):
+        """Flush remaining messages and wait for indexing to finish."""
+        await self.flush()
+        if self._flush_task is not None:
+            await self._flush_task
+        if self._index_tasks:
+            await asyncio.gather(*self._index_tasks, return_exceptions=True)
+        logger.info("✅ Slack message writer closed")
+
+    async def _flush_later(self):
+        """Flush once the batch window has elapsed."""
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+
+    async def _write_user(self, user_id: str, messages: List[Tuple[str, Dict[str, Any]]]) -> int:
+        """Store one user's messages."""
+        integration = await get_credential_broker().get_integration(user_id, "slack")
+        if not integration:
+            return 0
+
+        client = get_slack_client()
+        access_token = integration["access_token"]
+        user_names = await client.resolve_user_names(
+            access_token, [message.get("user") for _, message in messages]
+        )
+
+        rows = []
+        for channel_id, message in messages:
+            channel_name = await client.get_channel_name(access_token, channel_id)
+            rows.append(
+                self.slack_service._message_row(user_id, channel_id, channel_name, message, user_names)
+            )
+
+        stored = await bulk_upsert("slack_messages", rows, ("user_id", "slack_ts", "channel_id"))
+
+        if stored:
+            task = asyncio.create_task(self._index_user(user_id))
+            self._index_tasks.add(task)
+            task.add_done_callback(self._index_tasks.discard)
+        return len(stored)
+
+    async def _index_user(self, user_id: str):
+        """Index new Slack messages (coalesced with any run in progress)."""
+        try:
+            await self.context_index_service.index_user(user_id, ["slack_message"])
+        except Exception as e:
+            logger.error(f"Error indexing Slack context for user {user_id}: {e}")
+
+
+# Global writer instance
+_slack_message_writer: Optional[SlackMessageWriter] = None
+
+
+def get_slack_message_writer() -> SlackMessageWriter:
+    """
+    Get the global Slack message writer instance.
+
+    Returns:
+        SlackMessageWriter instance
+    """
+    global _slack_message_writer
+    if _slack_message_writer is None:
+        _slack_message_writer = SlackMessageWriter(
+            batch_size=settings.SLACK_EVENT_BATCH_SIZE,
+            flush_ms=settings.SLACK_EVENT_FLUSH_MS,
+        )
+    return _slack_message_writer
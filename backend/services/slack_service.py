@@ -1,16 +1,25 @@
 """Slack integration service for OAuth and message sync."""
 
+import asyncio
 import logging
-import httpx
+import time
 from datetime import datetime, timezone, timedelta
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from urllib.parse import urlencode
 
 from config import settings
 from database.client import get_supabase_client
+from services.bulk_upsert import bulk_upsert
+from services.context_index_service import ContextIndexService
+from services.credential_broker import get_credential_broker
+from services.executor_service import run_blocking
+from services.slack_client import get_slack_client
 
 logger = logging.getLogger(__name__)
 
+# team_id -> (expires_at, user_id or None), shared by all SlackService instances
+_team_user_cache: Dict[str, Tuple[float, Optional[str]]] = {}
+
 
 class SlackService:
     """Service for Slack OAuth and message synchronization."""
@@ -37,17 +46,15 @@ class SlackService:
 
     async def handle_oauth_callback(self, code: str, user_id: str) -> Dict[str, Any]:
         """Exchange authorization code for access tokens and store integration."""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://slack.com/api/oauth.v2.access",
-                data={
-                    "client_id": self.client_id,
-                    "client_secret": self.client_secret,
-                    "code": code,
-                    "redirect_uri": self.redirect_uri,
-                },
-            )
-            data = response.json()
+        data = await get_slack_client().post_form(
+            "oauth.v2.access",
+            {
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+                "code": code,
+                "redirect_uri": self.redirect_uri,
+            },
+        )
 
         if not data.get("ok"):
             error = data.get("error", "Unknown error")
@@ -76,9 +83,9 @@ class SlackService:
             "is_active": True,
         }
 
-        result = self.supabase.table("integrations").upsert(
+        result = await run_blocking(self.supabase.table("integrations").upsert(
             integration_data, on_conflict="user_id,provider"
-        ).execute()
+        ).execute)
 
         # Store bot integration separately (for responding)
         if bot_access_token:
@@ -92,17 +99,20 @@ class SlackService:
                 "account_email": bot_user_id,
                 "is_active": True,
             }
-            self.supabase.table("integrations").upsert(
+            await run_blocking(self.supabase.table("integrations").upsert(
                 bot_data, on_conflict="user_id,provider"
-            ).execute()
+            ).execute)
 
         # Store team metadata in knowledge_sources
-        self._store_slack_workspace(user_id, team_info, bot_access_token or user_access_token, bot_user_id)
+        await self._store_slack_workspace(user_id, team_info, bot_access_token or user_access_token, bot_user_id)
+        _team_user_cache.pop(team_info.get("id"), None)
+        get_credential_broker().invalidate(user_id, "slack")
+        get_credential_broker().invalidate(user_id, "slack_bot")
 
         logger.info(f"Slack OAuth successful for user {user_id}, team {team_info.get('name')}, bot installed: {bool(bot_access_token)}")
         return result.data[0]
 
-    def _store_slack_workspace(self, user_id: str, team_info: Dict, access_token: str, bot_user_id: str = None):
+    async def _store_slack_workspace(self, user_id: str, team_info: Dict, access_token: str, bot_user_id: str = None):
         """Store Slack workspace as a knowledge source."""
         source_data = {
             "user_id": user_id,
@@ -117,119 +127,260 @@ class SlackService:
                 "bot_installed": bool(bot_user_id),
             },
         }
-        self.supabase.table("knowledge_sources").upsert(
+        await run_blocking(self.supabase.table("knowledge_sources").upsert(
             source_data, on_conflict="user_id,external_id"
-        ).execute()
+        ).execute)
+
+    async def get_user_for_team(self, team_id: str) -> Optional[str]:
+        """
+        Find the user who connected a Slack workspace.
+
+        Uses the indexed knowledge_sources.external_id (the team ID) and
+        caches the answer, including misses, for SLACK_TEAM_CACHE_TTL_SECONDS.
+        Connecting or disconnecting Slack invalidates the entry.
+
+        Args:
+            team_id: Slack team ID
+
+        Returns:
+            User ID, or None if no active workspace matches
+        """
+        entry = _team_user_cache.get(team_id)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+
+        result = await run_blocking(
+            self.supabase.table("knowledge_sources")
+            .select("user_id")
+            .eq("type", "slack")
+            .eq("external_id", team_id)
+            .eq("status", "active")
+            .limit(1)
+            .execute
+        )
+        user_id = result.data[0]["user_id"] if result.data else None
+
+        _team_user_cache[team_id] = (time.monotonic() + settings.SLACK_TEAM_CACHE_TTL_SECONDS, user_id)
+        return user_id
 
     async def get_channels(self, user_id: str) -> List[Dict[str, Any]]:
         """Get list of channels the bot has access to."""
-        integration = self._get_integration(user_id)
+        integration = await get_credential_broker().get_integration(user_id, "slack")
         if not integration:
             raise Exception("Slack not connected")
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                "https://slack.com/api/conversations.list",
-                headers={"Authorization": f"Bearer {integration['access_token']}"},
-                params={"types": "public_channel,private_channel", "limit": 200},
-            )
-            data = response.json()
+        data = await get_slack_client().call(
+            integration["access_token"],
+            "conversations.list",
+            params={"types": "public_channel,private_channel", "limit": 200},
+        )
 
         if not data.get("ok"):
             raise Exception(f"Failed to get channels: {data.get('error')}")
 
         return data.get("channels", [])
 
-    async def sync_messages(
-        self, user_id: str, channel_id: str, oldest: Optional[datetime] = None
-    ) -> int:
-        """Sync messages from a Slack channel."""
-        integration = self._get_integration(user_id)
+    async def sync_workspace(self, user_id: str) -> int:
+        """
+        Sync every channel the user has joined.
+
+        Channels come from users.conversations and are synced concurrently
+        (bounded by SLACK_SYNC_CHANNEL_CONCURRENCY); the shared client paces
+        requests per Slack rate-limit tier. Each channel resumes from its
+        stored watermark, and one failing channel doesn't stop the others.
+
+        Args:
+            user_id: User ID
+
+        Returns:
+            Number of new or changed messages stored
+        """
+        integration = await get_credential_broker().get_integration(user_id, "slack")
         if not integration:
             raise Exception("Slack not connected")
 
-        # Default to last 7 days
-        if oldest is None:
-            oldest = datetime.now(timezone.utc) - timedelta(days=7)
+        channel_ids = []
+        async for page in get_slack_client().paginate(
+            integration["access_token"],
+            "users.conversations",
+            {"types": "public_channel,private_channel", "exclude_archived": "true", "limit": 200},
+        ):
+            channel_ids.extend(channel["id"] for channel in page.get("channels", []))
+
+        semaphore = asyncio.Semaphore(settings.SLACK_SYNC_CHANNEL_CONCURRENCY)
+
+        async def _sync_channel(channel_id: str) -> int:
+            async with semaphore:
+                return await self.sync_messages(user_id, channel_id, integration=integration)
 
-        messages = await self._fetch_channel_messages(
-            integration["access_token"], channel_id, oldest
+        results = await asyncio.gather(
+            *(_sync_channel(channel_id) for channel_id in channel_ids),
+            return_exceptions=True,
         )
 
-        # Get channel info
-        channel_name = await self._get_channel_name(integration["access_token"], channel_id)
+        count = 0
+        for channel_id, result in zip(channel_ids, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Error syncing Slack channel {channel_id} for user {user_id}: {result}")
+            else:
+                count += result
+
+        logger.info(f"Synced {count} messages from {len(channel_ids)} Slack channels for user {user_id}")
+        return count
+
+    async def sync_messages(
+        self,
+        user_id: str,
+        channel_id: str,
+        oldest: Optional[datetime] = None,
+        integration: Optional[Dict] = None,
+    ) -> int:
+        """
+        Sync messages from a Slack channel.
+
+        Without an explicit oldest, only messages after the channel's stored
+        watermark are requested (the last 7 days on first sync). Each
+        conversations.history page is written with one bulk upsert as soon
+        as it arrives. Channel and user names come from the shared client's
+        metadata cache.
+
+        The watermark only advances once every page has been read: history
+        pages run newest-first, so a partial run must not skip older ones.
+        """
+        if integration is None:
+            integration = await get_credential_broker().get_integration(user_id, "slack")
+        if not integration:
+            raise Exception("Slack not connected")
+
+        if oldest is not None:
+            oldest_ts = str(oldest.timestamp())
+        else:
+            oldest_ts = await run_blocking(self._get_channel_watermark, user_id, channel_id)
+            if oldest_ts is None:
+                # Default to last 7 days
+                oldest_ts = str((datetime.now(timezone.utc) - timedelta(days=7)).timestamp())
+
+        client = get_slack_client()
+        access_token = integration["access_token"]
+        channel_name = await client.get_channel_name(access_token, channel_id)
 
-        # Store messages
         count = 0
-        for msg in messages:
-            if msg.get("type") == "message" and msg.get("text"):
-                self._store_message(user_id, channel_id, channel_name, msg)
-                count += 1
+        newest_ts = None
+        complete = False
+        async for page in client.paginate(
+            access_token,
+            "conversations.history",
+            {"channel": channel_id, "oldest": oldest_ts, "limit": 200},
+        ):
+            messages = [
+                msg for msg in page.get("messages", [])
+                if msg.get("type") == "message" and msg.get("text")
+            ]
+            user_names = await client.resolve_user_names(
+                access_token, [msg.get("user") for msg in messages]
+            )
+            rows = [
+                self._message_row(user_id, channel_id, channel_name, msg, user_names)
+                for msg in messages
+            ]
+            stored = await bulk_upsert("slack_messages", rows, ("user_id", "slack_ts", "channel_id"))
+            count += len(stored)
+
+            for msg in page.get("messages", []):
+                if msg.get("ts") and (newest_ts is None or float(msg["ts"]) > float(newest_ts)):
+                    newest_ts = msg["ts"]
+            complete = not page.get("response_metadata", {}).get("next_cursor")
+
+        # Slack's oldest is exclusive, so the newest ts seen is the next start
+        if complete and newest_ts and float(newest_ts) > float(oldest_ts):
+            await run_blocking(self._advance_channel_watermarks, user_id, {channel_id: newest_ts})
 
         # Update sync timestamp
-        self.supabase.table("integrations").update(
+        await run_blocking(self.supabase.table("integrations").update(
             {"last_sync_at": datetime.now(timezone.utc).isoformat()}
-        ).eq("user_id", user_id).eq("provider", "slack").execute()
+        ).eq("user_id", user_id).eq("provider", "slack").execute)
 
         logger.info(f"Synced {count} messages from channel {channel_name}")
         return count
 
-    async def _fetch_channel_messages(
-        self, access_token: str, channel_id: str, oldest: datetime
-    ) -> List[Dict]:
-        """Fetch messages from a channel."""
-        messages = []
-        cursor = None
-
-        async with httpx.AsyncClient() as client:
-            while True:
-                params = {
-                    "channel": channel_id,
-                    "oldest": str(oldest.timestamp()),
-                    "limit": 200,
-                }
-                if cursor:
-                    params["cursor"] = cursor
-
-                response = await client.get(
-                    "https://slack.com/api/conversations.history",
-                    headers={"Authorization": f"Bearer {access_token}"},
-                    params=params,
-                )
-                data = response.json()
-
-                if not data.get("ok"):
-                    logger.error(f"Failed to fetch messages: {data.get('error')}")
-                    break
-
-                messages.extend(data.get("messages", []))
-                cursor = data.get("response_metadata", {}).get("next_cursor")
-                if not cursor:
-                    break
-
-        return messages
-
-    async def _get_channel_name(self, access_token: str, channel_id: str) -> str:
-        """Get channel name from ID."""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                "https://slack.com/api/conversations.info",
-                headers={"Authorization": f"Bearer {access_token}"},
-                params={"channel": channel_id},
-            )
-            data = response.json()
+    async def delete_message(self, user_id: str, channel_id: str, slack_ts: str) -> int:
+        """
+        Delete a stored message and its context chunks.
 
-        if data.get("ok"):
-            return data.get("channel", {}).get("name", channel_id)
-        return channel_id
+        Args:
+            user_id: User ID
+            channel_id: Slack channel ID
+            slack_ts: ts of the deleted message
 
-    def _store_message(
-        self, user_id: str, channel_id: str, channel_name: str, msg: Dict
-    ):
-        """Store a single Slack message."""
+        Returns:
+            Number of rows deleted
+        """
+        result = await run_blocking(
+            self.supabase.table("slack_messages").delete()
+            .eq("user_id", user_id)
+            .eq("channel_id", channel_id)
+            .eq("slack_ts", slack_ts)
+            .execute
+        )
+        deleted_ids = [row["id"] for row in result.data or []]
+        await ContextIndexService().delete_sources("slack_message", deleted_ids)
+        return len(deleted_ids)
+
+    def _get_channel_watermark(self, user_id: str, channel_id: str) -> Optional[str]:
+        """Get the newest synced message ts for a channel."""
+        result = (
+            self.supabase.table("slack_channel_sync_state")
+            .select("last_ts")
+            .eq("user_id", user_id)
+            .eq("channel_id", channel_id)
+            .execute()
+        )
+        return result.data[0]["last_ts"] if result.data else None
+
+    def _advance_channel_watermarks(self, user_id: str, newest: Dict[str, str]):
+        """
+        Move channel watermarks forward to the given message ts values.
+
+        Channels whose stored watermark is already newer are left alone.
+
+        Args:
+            user_id: User ID
+            newest: Channel ID -> newest stored message ts
+        """
+        if not newest:
+            return
+
+        result = (
+            self.supabase.table("slack_channel_sync_state")
+            .select("channel_id, last_ts")
+            .eq("user_id", user_id)
+            .in_("channel_id", list(newest))
+            .execute()
+        )
+        stored = {row["channel_id"]: row["last_ts"] for row in result.data}
+
+        rows = [
+            {"user_id": user_id, "channel_id": channel_id, "last_ts": ts}
+            for channel_id, ts in newest.items()
+            if channel_id not in stored or float(ts) > float(stored[channel_id])
+        ]
+        if rows:
+            self.supabase.table("slack_channel_sync_state").upsert(
+                rows, on_conflict="user_id,channel_id"
+            ).execute()
+
+    def _message_row(
+        self,
+        user_id: str,
+        channel_id: str,
+        channel_name: str,
+        msg: Dict,
+        user_names: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, Any]:
+        """Build a slack_messages row from a Slack message."""
         message_at = datetime.fromtimestamp(float(msg.get("ts", 0)), tz=timezone.utc)
 
-        message_data = {
+        return {
             "user_id": user_id,
             "slack_ts": msg.get("ts"),
             "channel_id": channel_id,
@@ -237,42 +388,39 @@ class SlackService:
             "thread_ts": msg.get("thread_ts"),
             "text": msg.get("text", ""),
             "user_slack_id": msg.get("user"),
-            "user_name": msg.get("username"),
+            # "username" is only set for bot/legacy messages
+            "user_name": msg.get("username") or (user_names or {}).get(msg.get("user")),
             "message_type": msg.get("subtype", "message"),
             "has_attachments": bool(msg.get("attachments") or msg.get("files")),
             "reactions": msg.get("reactions"),
             "message_at": message_at.isoformat(),
         }
 
-        self.supabase.table("slack_messages").upsert(
-            message_data, on_conflict="user_id,slack_ts,channel_id"
-        ).execute()
-
-    def _get_integration(self, user_id: str) -> Optional[Dict]:
-        """Get Slack integration for user."""
-        result = (
+    async def _get_integration(self, user_id: str) -> Optional[Dict]:
+        """Get the full Slack integration row (uncached, for status)."""
+        result = await run_blocking(
             self.supabase.table("integrations")
             .select("*")
             .eq("user_id", user_id)
             .eq("provider", "slack")
             .eq("is_active", True)
-            .execute()
+            .execute
         )
         return result.data[0] if result.data else None
 
-    def get_connection_status(self, user_id: str) -> Dict[str, Any]:
+    async def get_connection_status(self, user_id: str) -> Dict[str, Any]:
         """Get Slack connection status for user."""
-        integration = self._get_integration(user_id)
+        integration = await self._get_integration(user_id)
         if not integration:
             return {"connected": False}
 
         # Get workspace info
-        source = (
+        source = await run_blocking(
             self.supabase.table("knowledge_sources")
             .select("*")
             .eq("user_id", user_id)
             .eq("type", "slack")
-            .execute()
+            .execute
         )
 
         return {
@@ -283,37 +431,32 @@ class SlackService:
 
     async def disconnect(self, user_id: str) -> bool:
         """Disconnect Slack integration."""
-        self.supabase.table("integrations").update({"is_active": False}).eq(
+        await run_blocking(self.supabase.table("integrations").update({"is_active": False}).eq(
             "user_id", user_id
-        ).eq("provider", "slack").execute()
+        ).eq("provider", "slack").execute)
 
         # Also disconnect the bot
-        self.supabase.table("integrations").update({"is_active": False}).eq(
+        await run_blocking(self.supabase.table("integrations").update({"is_active": False}).eq(
             "user_id", user_id
-        ).eq("provider", "slack_bot").execute()
+        ).eq("provider", "slack_bot").execute)
 
-        self.supabase.table("knowledge_sources").update({"status": "disconnected"}).eq(
+        await run_blocking(self.supabase.table("knowledge_sources").update({"status": "disconnected"}).eq(
             "user_id", user_id
-        ).eq("type", "slack").execute()
+        ).eq("type", "slack").execute)
+
+        for team_id, (_, cached_user_id) in list(_team_user_cache.items()):
+            if cached_user_id == user_id:
+                del _team_user_cache[team_id]
+
+        get_credential_broker().invalidate(user_id, "slack")
+        get_credential_broker().invalidate(user_id, "slack_bot")
 
         logger.info(f"Disconnected Slack for user {user_id}")
         return True
 
-    def _get_bot_integration(self, user_id: str) -> Optional[Dict]:
-        """Get Slack bot integration for user."""
-        result = (
-            self.supabase.table("integrations")
-            .select("*")
-            .eq("user_id", user_id)
-            .eq("provider", "slack_bot")
-            .eq("is_active", True)
-            .execute()
-        )
-        return result.data[0] if result.data else None
-
     async def send_message(self, user_id: str, channel_id: str, text: str, thread_ts: str = None) -> Dict[str, Any]:
         """Send a message as the Cosos bot."""
-        integration = self._get_bot_integration(user_id)
+        integration = await get_credential_broker().get_integration(user_id, "slack_bot")
         if not integration:
             raise Exception("Slack bot not installed")
 
@@ -324,13 +467,9 @@ class SlackService:
         if thread_ts:
             payload["thread_ts"] = thread_ts
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://slack.com/api/chat.postMessage",
-                headers={"Authorization": f"Bearer {integration['access_token']}"},
-                json=payload,
-            )
-            data = response.json()
+        data = await get_slack_client().call(
+            integration["access_token"], "chat.postMessage", json=payload
+        )
 
         if not data.get("ok"):
             error = data.get("error", "Unknown error")
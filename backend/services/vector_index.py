@@ -0,0 +1,445 @@
+"""Optional in-process index of users' context chunks for hot retrieval."""
+
+import asyncio
+import json
+import logging
+import re
+import time
+from collections import Counter, OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Set
+
+import numpy as np
+import snowballstemmer
+
+from config import settings
+from database.client import get_supabase_client
+from services.executor_service import run_blocking
+
+logger = logging.getLogger(__name__)
+
+CHUNK_COLUMNS = "id, source_type, source_id, chunk_text, metadata, embedding"
+
+# Close to Postgres' english stopword list; together with the Snowball
+# english stemmer (the one behind Postgres' english config) term matching
+# behaves like websearch_to_tsquery in match_context_hybrid. Tokenization
+# is simpler than Postgres' parser (no special handling of URLs, emails or
+# hyphenated words), so rare queries can still rank differently.
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been
+before being below between both but by can did do does doing down during each
+few for from further had has have having he her here hers herself him himself
+his how i if in into is it its itself just me more most my myself no nor not
+now of off on once only or other our ours ourselves out over own s same she
+should so some such t than that the their theirs them themselves then there
+these they this those through to too under until up very was we were what
+when where which while who whom why will with you your yours yourself
+yourselves
+""".split())
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+_stemmer = snowballstemmer.stemmer("english")
+
+# Rough CPython sizes used by _UserIndex.nbytes: a chunk dict with its
+# metadata and position entry, one chunk entry in a term's postings dict,
+# and a term string with its postings dict
+CHUNK_OVERHEAD_BYTES = 1000
+POSTING_BYTES = 100
+TERM_BYTES = 200
+
+IndexOp = Callable[["_UserIndex"], None]
+
+
+@lru_cache(maxsize=100_000)
+def _stem(word: str) -> str:
+    return _stemmer.stemWord(word)
+
+
+def _terms(text: str) -> List[str]:
+    """Stemmed lowercase words of a text, minus stopwords."""
+    return [_stem(word) for word in _WORD.findall(text.lower()) if word not in STOPWORDS]
+
+
+def _to_matrix(embeddings: List[Any]) -> np.ndarray:
+    """Stack embeddings (lists or pgvector strings) into unit-length float32 rows."""
+    matrix = np.array(
+        [json.loads(e) if isinstance(e, str) else e for e in embeddings], dtype=np.float32
+    )
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class _UserIndex:
+    """One user's chunks: a contiguous embedding matrix plus an inverted term index."""
+
+    def __init__(self):
+        self.chunks: List[Dict[str, Any]] = []
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self.position: Dict[str, int] = {}
+        # term -> chunk ID -> occurrences, built once per chunk write
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.posting_count = 0
+        self.text_bytes = 0
+        self.loaded_at = time.monotonic()
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the index, including chunk dicts and term postings."""
+        return (
+            self.matrix.nbytes
+            + self.text_bytes
+            + len(self.chunks) * CHUNK_OVERHEAD_BYTES
+            + self.posting_count * POSTING_BYTES
+            + len(self.postings) * TERM_BYTES
+        )
+
+    def upsert(self, chunks: List[Dict[str, Any]], vectors: np.ndarray):
+        """Replace chunks by ID in place and append new ones."""
+        new_chunks = []
+        new_vectors = []
+        for chunk, vector in zip(chunks, vectors):
+            index = self.position.get(chunk["id"])
+            if index is None:
+                new_chunks.append(chunk)
+                new_vectors.append(vector)
+                continue
+            self._unindex_terms(self.chunks[index])
+            self.text_bytes += len(chunk["chunk_text"]) - len(self.chunks[index]["chunk_text"])
+            self.chunks[index] = chunk
+            self._index_terms(chunk)
+            self.matrix[index] = vector
+
+        if not new_chunks:
+            return
+        start = len(self.chunks)
+        for offset, chunk in enumerate(new_chunks):
+            self.position[chunk["id"]] = start + offset
+            self._index_terms(chunk)
+        self.chunks.extend(new_chunks)
+        self.text_bytes += sum(len(chunk["chunk_text"]) for chunk in new_chunks)
+
+        stacked = np.vstack(new_vectors)
+        self.matrix = stacked if self.matrix.size == 0 else np.vstack([self.matrix, stacked])
+
+    def remove(self, predicate: Callable[[Dict[str, Any]], bool]):
+        """Drop chunks matching predicate."""
+        keep = []
+        for i, chunk in enumerate(self.chunks):
+            if predicate(chunk):
+                self._unindex_terms(chunk)
+            else:
+                keep.append(i)
+        if len(keep) == len(self.chunks):
+            return
+        self.chunks = [self.chunks[i] for i in keep]
+        self.matrix = self.matrix[keep] if keep else np.zeros((0, 0), dtype=np.float32)
+        self.position = {chunk["id"]: i for i, chunk in enumerate(self.chunks)}
+        self.text_bytes = sum(len(chunk["chunk_text"]) for chunk in self.chunks)
+
+    def _index_terms(self, chunk: Dict[str, Any]):
+        counts = Counter(_terms(chunk["chunk_text"]))
+        for term, count in counts.items():
+            self.postings.setdefault(term, {})[chunk["id"]] = count
+        self.posting_count += len(counts)
+
+    def _unindex_terms(self, chunk: Dict[str, Any]):
+        for term in set(_terms(chunk["chunk_text"])):
+            chunk_counts = self.postings.get(term)
+            if chunk_counts is None:
+                continue
+            if chunk_counts.pop(chunk["id"], None) is not None:
+                self.posting_count -= 1
+            if not chunk_counts:
+                del self.postings[term]
+
+    def search(
+        self, embedding: List[float], query: str, limit: int, candidates: int, rrf_k: int
+    ) -> List[Dict[str, Any]]:
+        """Hybrid top-k: vector and term rankings merged by reciprocal-rank fusion."""
+        if not self.chunks:
+            return []
+
+        query_vector = _to_matrix([embedding])[0]
+        similarities = self.matrix @ query_vector
+
+        k = min(candidates, len(self.chunks))
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+        vector_hits = {int(i) for i in top}
+
+        scores: Dict[int, float] = {}
+        for rank, i in enumerate(top, 1):
+            scores[int(i)] = 1.0 / (rrf_k + rank)
+        for rank, i in enumerate(self._lexical(query, candidates), 1):
+            scores[i] = scores.get(i, 0.0) + 1.0 / (rrf_k + rank)
+
+        results = []
+        for i in sorted(scores, key=scores.get, reverse=True)[:limit]:
+            chunk = self.chunks[i]
+            results.append({
+                "id": chunk["id"],
+                "type": chunk["source_type"],
+                "source_id": chunk["source_id"],
+                "text": chunk["chunk_text"],
+                "similarity": float(similarities[i]) if i in vector_hits else None,
+                "score": scores[i],
+                "metadata": chunk.get("metadata"),
+            })
+        return results
+
+    def _lexical(self, query: str, candidates: int) -> List[int]:
+        """Chunks containing every query term, most occurrences first."""
+        terms = set(_terms(query))
+        if not terms:
+            return []
+        lists = sorted((self.postings.get(term, {}) for term in terms), key=len)
+        matches = set(lists[0])
+        for chunk_counts in lists[1:]:
+            matches.intersection_update(chunk_counts)
+            if not matches:
+                return []
+
+        ranked = sorted(
+            matches, key=lambda chunk_id: sum(chunk_counts[chunk_id] for chunk_counts in lists), reverse=True
+        )
+        return [self.position[chunk_id] for chunk_id in ranked[:candidates]]
+
+
+class VectorIndexCache:
+    """
+    Per-user in-memory retrieval tier in front of match_context_hybrid.
+
+    A user's chunks are loaded in the background on their first query
+    (which is answered by pgvector meanwhile) into a unit-normalized
+    float32 matrix; later queries are answered with one matrix-vector
+    product plus a lookup in a stemmed term index, fused the same way as
+    the SQL function. ContextIndexService pushes its upserts and deletes
+    in, so indexes stay current without reloading; indexes older than
+    CONTEXT_VECTOR_INDEX_MAX_AGE_SECONDS are reloaded in the background to
+    pick up writes made by other processes. Users are evicted least
+    recently used first to stay under CONTEXT_VECTOR_INDEX_MAX_MB.
+    """
+
+    def __init__(self, max_bytes: int, max_age_seconds: float, page_size: int):
+        self.supabase = get_supabase_client()
+        self.max_bytes = max_bytes
+        self.max_age = max_age_seconds
+        self.page_size = page_size
+
+        self._indexes: "OrderedDict[str, _UserIndex]" = OrderedDict()
+        # user_id -> writes seen while the user's index was loading
+        self._loading: Dict[str, List[IndexOp]] = {}
+        self._oversized: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def search(
+        self, user_id: str, embedding: List[float], query: str, limit: int
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Answer a retrieval query from memory.
+
+        Args:
+            user_id: User ID
+            embedding: Query embedding
+            query: Query text
+            limit: Max items to return
+
+        Returns:
+            Context items, or None if the user isn't loaded yet
+        """
+        index = self._indexes.get(user_id)
+        if index is None:
+            self.misses += 1
+            self._load_in_background(user_id)
+            return None
+
+        self.hits += 1
+        self._indexes.move_to_end(user_id)
+        if time.monotonic() - index.loaded_at > self.max_age:
+            self._load_in_background(user_id)
+        return index.search(
+            embedding,
+            query,
+            limit,
+            max(limit, settings.CONTEXT_HYBRID_CANDIDATES),
+            settings.CONTEXT_RRF_K,
+        )
+
+    def upsert_chunks(self, user_id: str, rows: List[Dict[str, Any]]):
+        """
+        Apply chunks just written to context_embeddings.
+
+        Args:
+            user_id: User ID
+            rows: Written rows, including id and embedding
+        """
+        rows = [row for row in rows if row.get("embedding") is not None]
+        if not rows:
+            return
+        chunks = [
+            {column: row.get(column) for column in ("id", "source_type", "source_id", "chunk_text", "metadata")}
+            for row in rows
+        ]
+        vectors = _to_matrix([row["embedding"] for row in rows])
+        self._apply(user_id, lambda index: index.upsert(chunks, vectors))
+        self._evict()
+
+    def remove_chunks(self, user_id: str, chunk_ids: List[str]):
+        """
+        Drop deleted chunks.
+
+        Args:
+            user_id: User ID
+            chunk_ids: context_embeddings IDs
+        """
+        ids = set(chunk_ids)
+        self._apply(user_id, lambda index: index.remove(lambda chunk: chunk["id"] in ids))
+
+    def remove_sources(self, source_type: str, source_ids: List[str]):
+        """
+        Drop all chunks of deleted source rows, for whichever user has them.
+
+        Args:
+            source_type: Source type
+            source_ids: IDs of the source rows
+        """
+        ids = set(source_ids)
+
+        def _remove(index: _UserIndex):
+            index.remove(lambda chunk: chunk["source_type"] == source_type and chunk["source_id"] in ids)
+
+        for user_id in set(self._indexes) | set(self._loading):
+            self._apply(user_id, _remove)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters.
+
+        Returns:
+            Dictionary of counters
+        """
+        lookups = self.hits + self.misses
+        return {
+            "enabled": settings.CONTEXT_VECTOR_INDEX_ENABLED,
+            "users": len(self._indexes),
+            "chunks": sum(len(index.chunks) for index in self._indexes.values()),
+            "memory_mb": round(self._total_bytes() / 2 ** 20, 1),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "loads": self.loads,
+            "evictions": self.evictions,
+            "oversized_users": len(self._oversized),
+        }
+
+    def _apply(self, user_id: str, op: IndexOp):
+        """Apply a write to the user's index and queue it for an in-progress load."""
+        if user_id in self._loading:
+            self._loading[user_id].append(op)
+        index = self._indexes.get(user_id)
+        if index is not None:
+            op(index)
+
+    def _load_in_background(self, user_id: str):
+        if user_id in self._loading or user_id in self._oversized:
+            return
+        self._loading[user_id] = []
+        task = asyncio.create_task(self._load(user_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _load(self, user_id: str):
+        """Load a user's chunks, replay writes that raced the load, and evict."""
+        started = time.perf_counter()
+        try:
+            index = await run_blocking(self._fetch, user_id)
+            for op in self._loading.get(user_id, []):
+                op(index)
+
+            if index.nbytes > self.max_bytes:
+                self._oversized.add(user_id)
+                self._indexes.pop(user_id, None)
+                logger.warning(
+                    f"⚠️  Context index for user {user_id} ({index.nbytes / 2 ** 20:.0f}MB) "
+                    f"exceeds the in-memory cap, using pgvector"
+                )
+                return
+
+            self._indexes[user_id] = index
+            self._indexes.move_to_end(user_id)
+            self.loads += 1
+            self._evict()
+            logger.info(
+                f"🧮 Loaded {len(index.chunks)} context chunks for user {user_id} "
+                f"({index.nbytes / 2 ** 20:.1f}MB) in {time.perf_counter() - started:.2f}s"
+            )
+        except Exception as e:
+            logger.error(f"Error loading context index for user {user_id}: {e}")
+        finally:
+            self._loading.pop(user_id, None)
+
+    def _fetch(self, user_id: str) -> _UserIndex:
+        """Read all of a user's chunks (blocking; run via run_blocking)."""
+        rows: List[Dict[str, Any]] = []
+        offset = 0
+        while True:
+            result = (
+                self.supabase.table("context_embeddings")
+                .select(CHUNK_COLUMNS)
+                .eq("user_id", user_id)
+                .not_.is_("embedding", "null")
+                .order("id")
+                .range(offset, offset + self.page_size - 1)
+                .execute()
+            )
+            page = result.data or []
+            rows.extend(page)
+            if len(page) < self.page_size:
+                break
+            offset += self.page_size
+
+        index = _UserIndex()
+        if rows:
+            index.upsert(
+                [{k: v for k, v in row.items() if k != "embedding"} for row in rows],
+                _to_matrix([row["embedding"] for row in rows]),
+            )
+        return index
+
+    def _evict(self):
+        """Evict least recently used users until under the memory cap."""
+        while len(self._indexes) > 1 and self._total_bytes() > self.max_bytes:
+            user_id, _ = self._indexes.popitem(last=False)
+            self.evictions += 1
+            logger.debug(f"Evicted context index for user {user_id}")
+
+    def _total_bytes(self) -> int:
+        return sum(index.nbytes for index in self._indexes.values())
+
+
+# Global cache instance
+_vector_index: Optional[VectorIndexCache] = None
+
+
+def get_vector_index() -> VectorIndexCache:
+    """
+    Get the global vector index cache instance.
+
+    Returns:
+        VectorIndexCache instance
+    """
+    global _vector_index
+    if _vector_index is None:
+        _vector_index = VectorIndexCache(
+            max_bytes=settings.CONTEXT_VECTOR_INDEX_MAX_MB * 2 ** 20,
+            max_age_seconds=settings.CONTEXT_VECTOR_INDEX_MAX_AGE_SECONDS,
+            page_size=settings.CONTEXT_VECTOR_INDEX_PAGE_SIZE,
+        )
+    return _vector_index